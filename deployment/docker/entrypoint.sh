@@ -5,6 +5,8 @@ set -e
 if [[ $1 == 'api' ]] ; then
   echo "Running database migrations"
   flask db upgrade
+  echo "Provisioning the SES email templates"
+  flask email templates
   gunicorn -c ./src/config/gunicorn.py wsgi:app
   exit 0
 fi
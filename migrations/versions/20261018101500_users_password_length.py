@@ -0,0 +1,37 @@
+"""Users password length
+
+Revision ID: 4b7c1e9a2f30
+Revises: d2e510f2cf1d
+Create Date: 2026-10-18 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4b7c1e9a2f30"
+down_revision = "d2e510f2cf1d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # scrypt hashes are 162 characters long
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.alter_column(
+            "password",
+            existing_type=sa.String(length=128),
+            type_=sa.String(length=255),
+            existing_nullable=True,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("users", schema=None) as batch_op:
+        batch_op.alter_column(
+            "password",
+            existing_type=sa.String(length=255),
+            type_=sa.String(length=128),
+            existing_nullable=True,
+        )
@@ -0,0 +1,68 @@
+"""Users search index
+
+Revision ID: 7e2d9c41b8a5
+Revises: 4b7c1e9a2f30
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "7e2d9c41b8a5"
+down_revision = "4b7c1e9a2f30"
+branch_labels = None
+depends_on = None
+
+# Must match helpers.search.document_expression, otherwise the planner does not use the index
+DOCUMENT = "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '')"
+
+FTS_COLUMNS = "first_name, last_name, email"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"CREATE INDEX ix_users_search_trgm ON users USING gin (({DOCUMENT}) gin_trgm_ops)")
+
+    elif dialect == "sqlite":
+        op.execute(
+            f"CREATE VIRTUAL TABLE users_search USING fts5({FTS_COLUMNS}, content='users', content_rowid='id', "
+            "prefix='2 3')"
+        )
+        op.execute(
+            "CREATE TRIGGER users_search_ai AFTER INSERT ON users BEGIN "
+            f"INSERT INTO users_search(rowid, {FTS_COLUMNS}) "
+            "VALUES (new.id, new.first_name, new.last_name, new.email); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_search_ad AFTER DELETE ON users BEGIN "
+            f"INSERT INTO users_search(users_search, rowid, {FTS_COLUMNS}) "
+            "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+            "END"
+        )
+        op.execute(
+            f"CREATE TRIGGER users_search_au AFTER UPDATE OF {FTS_COLUMNS} ON users BEGIN "
+            f"INSERT INTO users_search(users_search, rowid, {FTS_COLUMNS}) "
+            "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+            f"INSERT INTO users_search(rowid, {FTS_COLUMNS}) "
+            "VALUES (new.id, new.first_name, new.last_name, new.email); "
+            "END"
+        )
+        op.execute("INSERT INTO users_search(users_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
+
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS users_search_au")
+        op.execute("DROP TRIGGER IF EXISTS users_search_ad")
+        op.execute("DROP TRIGGER IF EXISTS users_search_ai")
+        op.execute("DROP TABLE IF EXISTS users_search")
@@ -0,0 +1,58 @@
+"""Api keys digest
+
+Revision ID: a91f3c6d0e27
+Revises: 7e2d9c41b8a5
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a91f3c6d0e27"
+down_revision = "7e2d9c41b8a5"
+branch_labels = None
+depends_on = None
+
+api_keys = sa.table("api_keys", sa.column("id", sa.Integer), sa.column("key", sa.String))
+
+
+def upgrade():
+    with op.batch_alter_table("api_keys", schema=None) as batch_op:
+        batch_op.alter_column(
+            "key",
+            existing_type=sa.String(length=50),
+            type_=sa.String(length=64),
+            existing_nullable=True,
+        )
+        batch_op.add_column(sa.Column("request_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=True))
+
+    # keys are stored as their SHA-256 digest, existing clients keep using the same keys
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(api_keys.c.id, api_keys.c.key).where(api_keys.c.key.isnot(None))).all()
+
+    for row in rows:
+        connection.execute(
+            api_keys.update()
+            .where(api_keys.c.id == row.id)
+            .values(key=hashlib.sha256(row.key.encode()).hexdigest())
+        )
+
+
+def downgrade():
+    # the digests can not be turned back into keys, they do not fit the previous column either
+    op.execute(api_keys.update().values(key=None))
+
+    with op.batch_alter_table("api_keys", schema=None) as batch_op:
+        batch_op.drop_column("last_used_at")
+        batch_op.drop_column("request_count")
+        batch_op.alter_column(
+            "key",
+            existing_type=sa.String(length=64),
+            type_=sa.String(length=50),
+            existing_nullable=True,
+        )
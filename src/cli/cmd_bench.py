@@ -0,0 +1,1214 @@
+import time
+import timeit
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, request, url_for
+from flask.cli import with_appcontext
+from flask.json.provider import DefaultJSONProvider
+
+
+@click.group()
+def bench():
+    """
+    Micro-benchmarks for the framework hot paths.
+    """
+
+
+def report(label: str, seconds: float, number: int) -> None:
+    """
+    Prints the time per call of a benchmark.
+    """
+    click.echo(f"{label:<30} {seconds / number * 1_000_000:>10.2f} µs/call  ({number} calls)")
+
+
+def legacy_filter_expressions(model_class, conditions: list, request_args: dict, kwargs: dict) -> list:
+    """
+    Reference implementation of the per-call filter parsing that the compiled plans replaced.
+    """
+    from src.project.helpers.filter_plan import fuzzyboolean  # noqa: C0415
+
+    filters = []
+    expressions = []
+
+    for key, operator, value, source in conditions:
+        if source == "args":
+            if request_args.get(value) is not None:
+                if operator == "is":
+                    filters.append((key, operator, fuzzyboolean(request_args.get(value))))
+                else:
+                    filters.append((key, operator, request_args.get(value)))
+        elif source == "kwargs":
+            if kwargs.get(key) is not None:
+                filters.append((key.replace("__", "."), operator, kwargs.get(value)))
+        else:
+            filters.append((key, operator, value))
+
+    for key, operator, value in filters:
+        column = getattr(model_class, key, None)
+
+        if operator == "in":
+            expressions.append(column.in_(value if isinstance(value, list) else value.split(",")))
+            continue
+
+        attr = list(filter(lambda e: hasattr(column, e % operator), ["%s", "%s_", "__%s__"]))[0] % operator
+
+        if value == "null":
+            value = None
+
+        expressions.append(getattr(column, attr)(value))
+
+    return expressions
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=10000, help="Iterations per benchmark. Defaults to 10000")
+def filters(number: int) -> None:
+    """
+    Compares the compiled filter plans with the legacy per-call parsing.
+    """
+    from src.project.helpers.filter_plan import clear_filter_plans, get_filter_plan  # noqa: C0415
+    from src.project.models import User  # noqa: C0415
+
+    clear_filter_plans()
+    kwargs = {"is_active": True, "email": "john@doe.com"}
+
+    with current_app.test_request_context("/?is_active=true&id=1,2,3&email=john@doe.com"):
+        request_args = request.args.to_dict(flat=True)
+
+        legacy = timeit.timeit(
+            lambda: legacy_filter_expressions(User, User.filters(), request_args, kwargs),
+            number=number,
+        )
+        compiled = timeit.timeit(
+            lambda: get_filter_plan(User).bind(request_args, kwargs),
+            number=number,
+        )
+
+    report("legacy filter parsing", legacy, number)
+    report("compiled filter plan", compiled, number)
+    click.echo(f"speedup: {legacy / compiled:.2f}x")
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=1000, help="Iterations per benchmark. Defaults to 1000")
+@click.option("-p", "--per-page", "per_page", default=25, help="Users per page. Defaults to 25")
+def json(number: int, per_page: int) -> None:
+    """
+    Compares the stdlib and the orjson providers serializing a page of users.
+    """
+    from src.project.extensions import JSONProvider, schema  # noqa: C0415
+    from src.project.models import User  # noqa: C0415
+
+    now = datetime.utcnow()
+    users = []
+
+    for index in range(per_page):
+        user = User(email=f"user{index}@example.com", first_name=f"First {index}", last_name=f"Last {index}")
+        user.id = index + 1
+        user.created_at = now - timedelta(days=index)
+        user.updated_at = now
+        user.current_sign_in_at = now
+        user.last_sign_in_at = now - timedelta(hours=index)
+        user.current_sign_in_ip = "127.0.0.1"
+        user.last_sign_in_ip = "127.0.0.1"
+        user.sign_in_count = index
+        user.extra_attributes = {"plan": "free", "tags": ["a", "b"], "score": index / 3}
+        users.append(user)
+
+    page = {
+        "data": schema.dump(users, name="User", many=True),
+        "meta": {"generated_at": now},
+        "error": None,
+        "warning": None,
+        "pagination": {"page": 1, "per_page": per_page, "total": 1000},
+    }
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    stdlib_provider = DefaultJSONProvider(app)
+    orjson_provider = JSONProvider(app)
+
+    if not orjson_provider.use_orjson:
+        click.echo("orjson is not installed or JSON_USE_ORJSON is disabled, both providers use the stdlib")
+
+    stdlib = timeit.timeit(lambda: stdlib_provider.dumps(page, separators=(",", ":")), number=number)
+    fast = timeit.timeit(lambda: orjson_provider.dumps(page, separators=(",", ":")), number=number)
+
+    report("stdlib json provider", stdlib, number)
+    report("orjson json provider", fast, number)
+    click.echo(f"speedup: {stdlib / fast:.2f}x")
+
+
+AUTH_RULES = {
+    "first_name": ["required", "min:2", "max:150"],
+    "email": ["required", "max:150"],
+    "password": ["required", "min:8", "max:128"],
+    "code": ["required", "min:6", "max:10"],
+    "token": ["required"],
+}
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=10000, help="Iterations per benchmark. Defaults to 10000")
+def validator(number: int) -> None:
+    """
+    Compares the compiled validator pipelines with the legacy rule parsing on the auth rules.
+    """
+    from src.project.extensions import validator as engine  # noqa: C0415
+
+    payloads = {
+        "valid": {
+            "first_name": "John",
+            "email": "john@doe.com",
+            "password": "12345678",
+            "code": "123456",
+            "token": "abc",
+        },
+        "invalid": {"first_name": "J", "email": "", "password": "1234"},
+    }
+
+    pipeline = engine.compile(AUTH_RULES)
+
+    for label, payload in payloads.items():
+
+        def legacy_check():
+            engine.check_values(payload, AUTH_RULES)
+            errors = engine.errors
+            engine.reset()
+            return errors
+
+        def compiled_check():
+            return engine.run(payload, pipeline)
+
+        if legacy_check() != compiled_check():
+            raise click.ClickException(f"Legacy and compiled validators disagree on the {label} payload")
+
+        legacy = timeit.timeit(legacy_check, number=number)
+        compiled = timeit.timeit(compiled_check, number=number)
+
+        report(f"legacy rules ({label})", legacy, number)
+        report(f"compiled pipeline ({label})", compiled, number)
+        click.echo(f"speedup: {legacy / compiled:.2f}x")
+
+
+@bench.command()
+@with_appcontext
+@click.option("-t", "--threads", default=16, help="Concurrent threads. Defaults to 16")
+@click.option("-r", "--requests", "requests_per_thread", default=500, help="Requests per thread. Defaults to 500")
+def validator_threads(threads: int, requests_per_thread: int) -> None:
+    """
+    Stress test that validation errors never leak between concurrent requests.
+    """
+    from concurrent.futures import ThreadPoolExecutor  # noqa: C0415
+
+    from src.project.extensions import validator as engine  # noqa: C0415
+    from src.project.extensions.flask_validator_engine import ValidationError  # noqa: C0415
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+
+    @engine("json", AUTH_RULES)
+    def view():
+        return "OK"
+
+    def worker(index: int) -> int:
+        # every thread misses a different field, so any leak shows up as an unexpected error
+        payload = {
+            "first_name": "John",
+            "email": "john@doe.com",
+            "password": "12345678",
+            "code": "123456",
+            "token": "abc",
+        }
+        missing = list(payload)[index % len(payload)]
+        payload[missing] = ""
+        failures = 0
+
+        for _ in range(requests_per_thread):
+            with app.test_request_context(json=payload):
+                try:
+                    view()
+                    failures += 1
+                except ValidationError as error:
+                    if error.fields != {missing: "This field is required"}:
+                        failures += 1
+
+        return failures
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        failures = sum(executor.map(worker, range(threads)))
+
+    click.echo(f"{threads * requests_per_thread} requests, {failures} leaked or missing errors")
+
+    if failures:
+        raise click.ClickException("Validation errors leaked between requests")
+
+
+@bench.command()
+@with_appcontext
+@click.option("-m", "--messages", default=200, help="Messages to send. Defaults to 200")
+@click.option("--rate-limit-every", default=5, help="Answer 429 every N requests. Defaults to 5")
+def discord(messages: int, rate_limit_every: int) -> None:
+    """
+    Sends a registration burst to a local fake Discord webhook, one request per message vs batched,
+    then batched again with malformed rate limit headers. Fails if a message is not delivered.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # noqa: C0415
+    from threading import Thread  # noqa: C0415
+
+    from src.project.libs.discord import DiscordNotifier  # noqa: C0415
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    received = {"requests": 0, "rate_limited": 0, "lines": 0, "malformed": False}
+
+    class FakeWebhook(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            body = app.json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received["requests"] += 1
+
+            if rate_limit_every and received["requests"] % rate_limit_every == 0:
+                received["rate_limited"] += 1
+                self.send_response(429)
+                self.send_header("Retry-After", "0.05")
+                self.end_headers()
+                return
+
+            received["lines"] += len(body["content"].split("\n"))
+            self.send_response(204)
+            if received["malformed"]:
+                self.send_header("X-RateLimit-Remaining", "0")
+                self.send_header("X-RateLimit-Reset-After", "soon")
+            self.end_headers()
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWebhook)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/webhook"
+    burst = [f"user{index} has registered with email address user{index}@example.com" for index in range(messages)]
+
+    try:
+        for label, batched, malformed in (
+            ("one request per message", False, False),
+            ("batched notifier", True, False),
+            ("batched, malformed headers", True, True),
+        ):
+            received.update(requests=0, rate_limited=0, lines=0, malformed=malformed)
+            notifier = DiscordNotifier()
+            notifier.configure({"DISCORD_FLUSH_INTERVAL": 0.1, "DISCORD_MAX_RETRIES": 5})
+
+            started = time.perf_counter()
+            for message in burst:
+                notifier.send(url, message) if batched else notifier.post(url, message)
+            enqueued = time.perf_counter() - started
+
+            while received["lines"] < messages and time.perf_counter() - started < 30:
+                time.sleep(0.01)
+
+            click.echo(
+                f"{label:<27} caller blocked {enqueued * 1000:>8.1f} ms, delivered {received['lines']} messages "
+                f"in {received['requests']} requests ({received['rate_limited']} rate limited) "
+                f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+
+            if received["lines"] != messages:
+                raise click.ClickException(f"{label}: {messages - received['lines']} messages were not delivered")
+
+            if batched and not notifier.thread.is_alive():
+                raise click.ClickException(f"{label}: the notifier thread died")
+    finally:
+        server.shutdown()
+
+
+SES_RESPONSE = """<{action}Response xmlns="http://ses.amazonaws.com/doc/2010-12-01/">
+  <{action}Result>{result}</{action}Result>
+  <ResponseMetadata><RequestId>00000000-0000-0000-0000-000000000000</RequestId></ResponseMetadata>
+</{action}Response>"""
+
+
+def start_ses_stub():
+    """
+    Starts a local HTTP server that answers SES query API calls.
+
+    SendBulkTemplatedEmail gets a status per destination: addresses starting with "flaky" fail
+    with TransientFailure the first time they are seen. Any other action gets a MessageId.
+    `server.requests` counts the requests received.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # noqa: C0415
+    from threading import Thread  # noqa: C0415
+    from urllib.parse import parse_qs  # noqa: C0415
+
+    seen = set()
+
+    class SesStub(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            params = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+            action = params.get("Action", ["SendEmail"])[0]
+            server.requests += 1
+            result = "<MessageId>00000000-0000-0000-0000-000000000000</MessageId>"
+
+            if action == "SendBulkTemplatedEmail":
+                members = []
+                index = 1
+                while f"Destinations.member.{index}.Destination.ToAddresses.member.1" in params:
+                    address = params[f"Destinations.member.{index}.Destination.ToAddresses.member.1"][0]
+                    if address.startswith("flaky") and address not in seen:
+                        seen.add(address)
+                        members.append("<member><Status>TransientFailure</Status><Error>Try again</Error></member>")
+                    else:
+                        members.append(f"<member><Status>Success</Status><MessageId>{index}</MessageId></member>")
+                    index += 1
+                result = f"<Status>{''.join(members)}</Status>"
+
+            body = SES_RESPONSE.format(action=action, result=result).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SesStub)
+    server.requests = 0
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=200, help="Emails to send. Defaults to 200")
+def aws(number: int) -> None:
+    """
+    Sends emails to a local SES stub building a client per email vs using the cached AWSManager client.
+    """
+    import boto3  # noqa: C0415
+
+    from src.project.extensions.flask_aws_manager import AWSManager  # noqa: C0415
+
+    server = start_ses_stub()
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    manager = AWSManager()
+    manager.init_app(app)
+    manager.endpoint_url = endpoint_url
+    manager.clear()
+
+    credentials = {
+        "region_name": "us-east-1",
+        "aws_access_key_id": "testing",
+        "aws_secret_access_key": "testing",
+    }
+    manager.region_name = credentials["region_name"]
+    manager.aws_access_key_id = credentials["aws_access_key_id"]
+    manager.aws_secret_access_key = credentials["aws_secret_access_key"]
+
+    def send(client):
+        client.send_email(
+            Source="no-reply@example.com",
+            Destination={"ToAddresses": ["john@doe.com"]},
+            Message={
+                "Subject": {"Charset": "UTF-8", "Data": "Hello"},
+                "Body": {"Text": {"Charset": "UTF-8", "Data": "Hello"}},
+            },
+        )
+
+    try:
+        uncached = timeit.timeit(
+            lambda: send(boto3.client("ses", endpoint_url=endpoint_url, **credentials)),
+            number=number,
+        )
+        cached = timeit.timeit(lambda: send(manager.get_client("ses")), number=number)
+    finally:
+        server.shutdown()
+
+    report("client per email", uncached, number)
+    report("cached AWSManager client", cached, number)
+    click.echo(f"speedup: {uncached / cached:.2f}x")
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=500, help="Recipients. Defaults to 500")
+def email(number: int) -> None:
+    """
+    Sends a templated email to a local SES stub one request per recipient vs BulkEmail chunks.
+    """
+    import json as jsonlib  # noqa: C0415
+
+    import boto3  # noqa: C0415
+
+    from src.project.libs.email import BulkEmail  # noqa: C0415
+
+    server = start_ses_stub()
+    client = boto3.client(
+        "ses",
+        endpoint_url=f"http://127.0.0.1:{server.server_port}",
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    # One every ten recipients fails on the first attempt
+    addresses = [f"{'flaky' if i % 10 == 0 else 'user'}{i}@example.com" for i in range(number)]
+
+    try:
+        started = time.perf_counter()
+        for address in addresses:
+            client.send_templated_email(
+                Source="no-reply@example.com",
+                Destination={"ToAddresses": [address]},
+                Template="welcome",
+                TemplateData=jsonlib.dumps({"name": address}),
+            )
+        single = time.perf_counter() - started
+        single_requests, server.requests = server.requests, 0
+
+        bulk = BulkEmail("welcome", {"name": "there"})
+        for address in addresses:
+            bulk.add(address, {"name": address})
+
+        started = time.perf_counter()
+        results = bulk.send(client=client, backoff=0.01)
+        batched = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    delivered = sum(1 for result in results if result["status"] == "Success")
+    retried = sum(1 for result in results if result["attempts"] > 1)
+
+    report(f"send_templated_email ({single_requests} req)", single, number)
+    report(f"BulkEmail ({server.requests} req)", batched, number)
+    click.echo(f"delivered {delivered}/{number}, {retried} after a retry, speedup: {single / batched:.2f}x")
+
+
+@bench.command("email-render")
+@with_appcontext
+@click.option("-n", "--number", default=2000, help="Renders. Defaults to 2000")
+def email_render(number: int) -> None:
+    """
+    Renders emails/base.html with a plain Jinja environment vs the EmailRenderer extension.
+    """
+    from jinja2 import Environment, PackageLoader  # noqa: C0415
+
+    from src.project.app import emails  # noqa: C0415
+    from src.project.helpers import get_default_email_template_params  # noqa: C0415
+
+    env = Environment(loader=PackageLoader("src.project", "templates"))
+    env.globals["url_for"] = url_for
+    context = {
+        "TITLE": "Activate your account",
+        "BODY": "Hello,<br>please activate your account.",
+        "CTA_TEXT": "Activate account",
+        "CTA_LINK": "https://app.example.com",
+    }
+
+    with current_app.test_request_context():
+        expected = env.get_template("emails/base.html").render({**get_default_email_template_params(), **context})
+        if emails.render("emails/base.html", context) != expected:
+            raise click.ClickException("EmailRenderer output differs from the plain Jinja one")
+
+        plain = timeit.timeit(
+            lambda: env.get_template("emails/base.html").render({**get_default_email_template_params(), **context}),
+            number=number,
+        )
+        cached = timeit.timeit(lambda: emails.render("emails/base.html", context), number=number)
+
+    report("plain Jinja environment", plain, number)
+    report("EmailRenderer", cached, number)
+    click.echo(f"speedup: {plain / cached:.2f}x")
+
+
+def start_redis_stub(scripts: dict = None):
+    """
+    Starts a local single process stand-in of Redis speaking RESP2.
+
+    It implements the strings, sorted sets and pub/sub commands used by the app, enough to
+    benchmark round trips without a Redis server. `server.commands` counts the commands received.
+
+    It can not run Lua: `scripts` maps the source of each script sent with EVAL/EVALSHA to a
+    function emulating it, called with a `call(command, *args)` function, the keys and the args.
+    """
+    import hashlib  # noqa: C0415
+    import socketserver  # noqa: C0415
+    from threading import Lock, Thread  # noqa: C0415
+
+    emulations = {hashlib.sha1(source.encode()).hexdigest(): function for source, function in (scripts or {}).items()}
+    data = {}
+    expires = {}
+    subscribers = {}
+    lock = Lock()
+
+    def encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, bool):
+            return b"+OK\r\n" if value else b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, (list, tuple)):
+            return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+        if isinstance(value, Exception):
+            # Exception("NOSCRIPT", message) replies with that error prefix instead of ERR
+            prefix = value.args[0] if len(value.args) > 1 else "ERR"
+            return f"-{prefix} {value.args[-1]}\r\n".encode()
+        value = value if isinstance(value, bytes) else str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def alive(key):
+        if key in expires and expires[key] <= time.time():
+            data.pop(key, None)
+            expires.pop(key, None)
+        return key in data
+
+    def score(value) -> float:
+        return float(value.decode().replace("inf", "Infinity").lstrip("("))
+
+    def execute(handler, name: str, args: list):
+        if name == "PING":
+            return ["pong", args[0] if args else b""] if handler.channels else "PONG"
+        if name in ("CLIENT", "SELECT"):
+            return True
+        if name == "GET":
+            return data.get(args[0]) if alive(args[0]) else None
+        if name in ("SET", "SETEX"):
+            if name == "SETEX":
+                args = [args[0], args[2], b"EX", args[1]]
+            options = [arg.upper() for arg in args[2:]]
+            if b"NX" in options and alive(args[0]):
+                return None
+            data[args[0]] = args[1]
+            expires.pop(args[0], None)
+            for option, ratio in ((b"EX", 1), (b"PX", 1000)):
+                if option in options:
+                    expires[args[0]] = time.time() + int(args[2:][options.index(option) + 1]) / ratio
+            return True
+        if name == "DEL":
+            return sum(data.pop(key, None) is not None for key in args)
+        if name == "EXPIRE":
+            if not alive(args[0]):
+                return 0
+            expires[args[0]] = time.time() + int(args[1])
+            return 1
+        if name in ("INCR", "INCRBY"):
+            value = int(data.get(args[0], b"0") if alive(args[0]) else 0) + (int(args[1]) if args[1:] else 1)
+            data[args[0]] = str(value).encode()
+            return value
+        if name == "ZADD":
+            zset = data.setdefault(args[0], {})
+            added = 0
+            for index in range(1, len(args), 2):
+                added += args[index + 1] not in zset
+                zset[args[index + 1]] = score(args[index])
+            return added
+        if name in ("ZRANGEBYSCORE", "ZREMRANGEBYSCORE"):
+            zset = data.get(args[0], {})
+            low, high = score(args[1]), score(args[2])
+            members = [
+                member for member, value in sorted(zset.items(), key=lambda item: item[1]) if low <= value <= high
+            ]
+            if name == "ZRANGEBYSCORE":
+                return members
+            for member in members:
+                del zset[member]
+            return len(members)
+        if name == "PUBLISH":
+            receivers = list(subscribers.get(args[0], ()))
+            for receiver in receivers:
+                receiver.send(encode(["message", args[0], args[1]]))
+            return len(receivers)
+        if name == "SCRIPT" and args[0].upper() == b"LOAD":
+            sha = hashlib.sha1(args[1]).hexdigest()
+            return sha if sha in emulations else Exception("no emulation of the script")
+        if name in ("EVAL", "EVALSHA"):
+            sha = hashlib.sha1(args[0]).hexdigest() if name == "EVAL" else args[0].decode()
+            if sha not in emulations:
+                return Exception("NOSCRIPT", "No matching script.")
+            count = int(args[1])
+
+            def call(command, *command_args):
+                return execute(handler, command, list(command_args))
+
+            return emulations[sha](call, args[2 : 2 + count], args[2 + count :])
+        if name == "SUBSCRIBE":
+            for channel in args:
+                subscribers.setdefault(channel, set()).add(handler)
+                handler.channels.add(channel)
+                handler.send(encode(["subscribe", channel, len(handler.channels)]))
+            return ...
+        return Exception(f"unknown command '{name}'")
+
+    class RedisStub(socketserver.StreamRequestHandler):
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            self.channels = set()
+            self.write_lock = Lock()
+
+        def send(self, payload: bytes):
+            with self.write_lock:
+                self.wfile.write(payload)
+                self.wfile.flush()
+
+        def handle(self):
+            try:
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    args = []
+                    for _ in range(int(line[1:])):
+                        size = int(self.rfile.readline()[1:])
+                        args.append(self.rfile.read(size + 2)[:-2])
+
+                    with lock:
+                        server.commands += 1
+                        reply = execute(self, args[0].decode().upper(), args[1:])
+
+                    if reply is not ...:
+                        self.send(encode(reply))
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                with lock:
+                    for channel in self.channels:
+                        subscribers.get(channel, set()).discard(self)
+
+    class ThreadingServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    server = ThreadingServer(("127.0.0.1", 0), RedisStub)
+    server.commands = 0
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=2000, help="Requests. Defaults to 2000")
+def blocklist(number: int) -> None:
+    """
+    Verifies a JWT like @jwt_required() does against a local Redis stand-in, with and
+    without the local blocklist tier.
+    """
+    from flask_jwt_extended import create_access_token, decode_token, verify_jwt_in_request  # noqa: C0415
+
+    from src.project.app import blocklist as token_blocklist  # noqa: C0415
+    from src.project.app import rediscache  # noqa: C0415
+
+    server = start_redis_stub()
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    rediscache.init_app(
+        app,
+        config={"CACHE_TYPE": "RedisCache", "CACHE_REDIS_PORT": server.server_address[1], "CACHE_KEY_PREFIX": "BENCH_"},
+    )
+
+    token = create_access_token(identity="1")
+    revoked = create_access_token(identity="2")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def verify():
+        with app.test_request_context(headers=headers):
+            verify_jwt_in_request()
+
+    try:
+        for enabled in (False, True):
+            token_blocklist.init_app(app, rediscache)
+            token_blocklist.enabled = enabled
+            token_blocklist.revoke(decode_token(revoked, allow_expired=True)["jti"], timedelta(minutes=5))
+
+            started = time.perf_counter()
+            while enabled and not token_blocklist.is_fresh() and time.perf_counter() - started < 5:
+                verify()
+
+            server.commands = 0
+            seconds = timeit.timeit(verify, number=number)
+            report(f"{'local tier' if enabled else 'redis only'} ({server.commands} cmds)", seconds, number)
+
+        with app.test_request_context(headers={"Authorization": f"Bearer {revoked}"}):
+            try:
+                verify_jwt_in_request()
+                raise click.ClickException("A revoked token was accepted")
+            except Exception as error:  # pylint: disable=broad-except
+                if isinstance(error, click.ClickException):
+                    raise
+                click.echo(f"revoked token rejected: {type(error).__name__}")
+
+        click.echo(f"blocklist metrics: {token_blocklist.metrics()}")
+    finally:
+        server.shutdown()
+
+
+@bench.command()
+@with_appcontext
+@click.option("-s", "--seconds", default=2.0, help="Seconds per scheme. Defaults to 2")
+def passwords(seconds: float) -> None:
+    """
+    Reports single thread (per core) hashes/sec of each password scheme with the configured costs.
+    """
+    from src.project.extensions.flask_password_hasher import (  # noqa: C0415
+        SCHEME_ARGON2,
+        SCHEME_PBKDF2,
+        SCHEME_SCRYPT,
+        PasswordHasher,
+        argon2,
+    )
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    hasher = PasswordHasher()
+
+    for scheme in (SCHEME_PBKDF2, SCHEME_SCRYPT, SCHEME_ARGON2):
+        if scheme == SCHEME_ARGON2 and argon2 is None:
+            click.echo(f"{scheme:<8} skipped, argon2-cffi is not installed")
+            continue
+
+        app.config["PASSWORD_HASHER"], previous = scheme, app.config.get("PASSWORD_HASHER")
+        try:
+            hasher.init_app(app)
+        finally:
+            app.config["PASSWORD_HASHER"] = previous
+
+        pwhash = hasher.hash_sync("correct horse battery staple")
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            hasher.verify_sync(pwhash, "correct horse battery staple")
+            count += 1
+        elapsed = time.perf_counter() - started
+
+        click.echo(f"{scheme:<8} {count / elapsed:>10.1f} hashes/sec/core  ({hasher.method}, {len(pwhash)} chars)")
+
+
+@bench.command("logging")
+@with_appcontext
+@click.option("-n", "--number", default=5000, help="Records. Defaults to 5000")
+def logging_(number: int) -> None:
+    """
+    Time spent in the request thread logging an access record: synchronous text handler
+    vs the queued JSON handler. Records are written to /dev/null.
+    """
+    import logging  # noqa: C0415
+    import os  # noqa: C0415
+
+    from flask import g  # noqa: C0415
+
+    from src.project.app import api  # noqa: C0415
+    from src.project.extensions.flask_api import AsyncHandler, JsonFormatter  # noqa: C0415
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    devnull = open(os.devnull, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    text_handler = logging.StreamHandler(devnull)
+    text_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    json_handler = logging.StreamHandler(devnull)
+    json_handler.setFormatter(JsonFormatter())
+    queued_handler = AsyncHandler(json_handler)
+
+    logger = logging.getLogger("bench.access")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    def text():
+        date, duration = datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round(time.time() - time.time(), 2)
+        logger.info(
+            f"""
+>>>>>>>>  START REQUEST >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+   REQUEST: {g.request_id}
+   DATE   : {date} DURATION: {duration}s IP: {g.remote_ip}
+   METHOD : {request.method}
+   URL    : {request.url}
+   STATUS : 200
+   JSON   : {request.get_json(silent=True)}
+
+<<<<<<<<<  END REQUEST  <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
+"""
+        )
+
+    response = app.response_class('{"status": true}', mimetype="application/json")
+
+    with app.test_request_context("/users?page=1", method="POST", json={"email": "john@doe.com"}):
+        g.request_id, g.remote_ip, g.start = "bench", "127.0.0.1", time.perf_counter_ns()
+        previous = api.logger
+
+        try:
+            logger.addHandler(text_handler)
+            sync_text = timeit.timeit(text, number=number)
+            logger.removeHandler(text_handler)
+
+            logger.addHandler(queued_handler)
+            api.logger = logger
+            started = time.perf_counter()
+            queued_json = timeit.timeit(lambda: api.log_access(response), number=number)
+            queued_handler.stop()
+            drained = time.perf_counter() - started
+        finally:
+            api.logger = previous
+            logger.removeHandler(queued_handler)
+            queued_handler.stop()
+            devnull.close()
+
+    report("sync text handler", sync_text, number)
+    report("queued JSON, request thread", queued_json, number)
+    report("queued JSON, until written", drained, number)
+    click.echo("the queued handler also keeps slow sinks (syslog, blocked pipes) out of the request thread")
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=20000, help="Requests. Defaults to 20000")
+def metrics(number: int) -> None:
+    """
+    Cost of the metrics hooks per request, compared to a whole /health request through the
+    test client. With PROMETHEUS_MULTIPROC_DIR set the samples go to memory mapped files.
+    """
+    from flask import g  # noqa: C0415
+
+    from src.project.app import metrics as metrics_extension  # noqa: C0415
+    from src.project.extensions.flask_metrics import START_KEY  # noqa: C0415
+
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+
+    if not metrics_extension.enabled:
+        raise click.ClickException("Metrics are disabled (METRICS_ENABLED or prometheus-client missing)")
+
+    def hooks():
+        g.setdefault(START_KEY, time.perf_counter_ns())
+        metrics_extension.in_flight.inc()
+        metrics_extension.observe(200, (time.perf_counter_ns() - g.get(START_KEY)) / 1e9)
+        g.pop(START_KEY)
+        metrics_extension.in_flight.dec()
+
+    with app.test_request_context("/health"):
+        request.url_rule = app.url_map.bind("localhost").match("/health", return_rule=True)[0]
+        hooks_time = timeit.timeit(hooks, number=number)
+
+    client = app.test_client()
+    request_time = timeit.timeit(lambda: client.get("/health"), number=number // 10)
+
+    click.echo(f"mode: {'multiprocess' if metrics_extension.multiprocess else 'single process'}")
+    report("metrics hooks", hooks_time, number)
+    report("GET /health", request_time, number // 10)
+    started = time.perf_counter()
+    body, _ = metrics_extension.render()
+    report(f"scrape ({len(body)} bytes)", time.perf_counter() - started, 1)
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=1_000_000, help="Users. Defaults to 1000000")
+@click.option("-r", "--repeat", default=5, help="Searches per term. Defaults to 5")
+def search(number: int, repeat: int) -> None:
+    """
+    Users page search on a temporary SQLite database: ILIKE plus a COUNT query vs FTS5 with
+    the total in the same query.
+    """
+    import functools  # noqa: C0415
+    import os  # noqa: C0415
+    import random  # noqa: C0415
+    import tempfile  # noqa: C0415
+
+    from sqlalchemy import create_engine, func  # noqa: C0415
+    from sqlalchemy.orm import Session  # noqa: C0415
+
+    from src.project.helpers.search import Fts5Search, LikeSearch  # noqa: C0415
+    from src.project.models import User  # noqa: C0415
+
+    first_names = ["john", "jane", "maria", "jose", "lucia", "pedro", "ana", "carlos", "sofia", "diego"]
+    last_names = ["doe", "smith", "garcia", "lopez", "perez", "gomez", "diaz", "romero", "alvarez", "torres"]
+
+    path = os.path.join(tempfile.mkdtemp(), "search.sqlite")
+    engine = create_engine(f"sqlite:///{path}")
+    User.__table__.create(engine)
+    columns = [column.key for column in User.search_columns()]
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        rows = (
+            (
+                random.choice(first_names) + str(i % 997),
+                random.choice(last_names),
+                f"user{i}@example{i % 50}.com",
+            )
+            for i in range(number)
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO users (first_name, last_name, email, sign_in_count) VALUES (?, ?, ?, 0)", list(rows)
+        )
+    click.echo(f"{number} users inserted in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for statement in Fts5Search.ddl(User.__table__.name, columns):
+            connection.exec_driver_sql(statement)
+    click.echo(f"FTS5 index built in {time.perf_counter() - started:.1f}s")
+
+    like = LikeSearch(User, User.search_columns())
+    fts5 = Fts5Search(User, User.search_columns())
+
+    def legacy_page(session, term):
+        query, _ = like.apply(session.query(User), term.split())
+        total = query.count()
+        return query.order_by(User.id.desc()).limit(10).all(), total
+
+    def fts5_page(session, term):
+        query, rank = fts5.apply(session.query(User), term.split())
+        rows = query.add_columns(func.count().over()).order_by(rank, User.id).limit(10).all()
+        return rows, rows[0][1] if rows else 0
+
+    with Session(engine) as session:
+        for term in ("jo", "maria12", "garcia", "user4242", "sofia romero"):
+            legacy_rows, legacy_total = legacy_page(session, term)
+            fts5_rows, fts5_total = fts5_page(session, term)
+
+            legacy = timeit.timeit(functools.partial(legacy_page, session, term), number=repeat)
+            indexed = timeit.timeit(functools.partial(fts5_page, session, term), number=repeat)
+
+            click.echo(f'"{term}": ILIKE {legacy_total} rows, FTS5 {fts5_total} rows')
+            report("  ILIKE + COUNT", legacy, repeat)
+            report("  FTS5 + window count", indexed, repeat)
+
+    engine.dispose()
+    os.remove(path)
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=200_000, help="Users. Defaults to 200000")
+@click.option("-r", "--repeat", default=20, help="Pages per count mode. Defaults to 20")
+def count(number: int, repeat: int) -> None:
+    """
+    Users listing on a temporary, analyzed SQLite database with each count mode. Fails if the
+    estimate mode runs a COUNT query.
+    """
+    import functools  # noqa: C0415
+    import os  # noqa: C0415
+    import tempfile  # noqa: C0415
+
+    from flask_sqlalchemy.query import Query  # noqa: C0415
+    from sqlalchemy import create_engine, event as sqlalchemy_event  # noqa: C0415
+    from sqlalchemy.orm import Session  # noqa: C0415
+
+    from src.project.helpers.pagination import COUNT_MODES  # noqa: C0415
+    from src.project.models import User  # noqa: C0415
+    from src.project.repositories import AuthRepository  # noqa: C0415
+
+    path = os.path.join(tempfile.mkdtemp(), "count.sqlite")
+    engine = create_engine(f"sqlite:///{path}")
+    User.__table__.create(engine)
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO users (email, sign_in_count, is_deleted) VALUES (?, 0, 0)",
+            [(f"user{i}@example.com",) for i in range(number)],
+        )
+        connection.exec_driver_sql("ANALYZE")
+
+    statements = []
+    sqlalchemy_event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    try:
+        with Session(engine, query_cls=Query) as session:
+            for mode in COUNT_MODES:
+                query = AuthRepository.filter(session.query(User), User)
+
+                page = functools.partial(AuthRepository.paginate, query, count=mode, page=2, per_page=25)
+
+                statements.clear()
+                _, pagination = page()
+                queries = len(statements)
+                counted = [statement for statement in statements if "count(" in statement.lower()]
+
+                if mode == "estimate" and counted:
+                    raise click.ClickException(f"the estimate mode ran a COUNT query: {counted[0]}")
+
+                seconds = timeit.timeit(page, number=repeat)
+                report(f"{mode} (total {pagination.total}, {queries} queries)", seconds, repeat)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+@bench.command()
+@with_appcontext
+@click.option("-s", "--sizes", default="1000,100000", help="Comma separated row counts. Defaults to 1000,100000")
+def stream(sizes: str) -> None:
+    """
+    Peak memory (tracemalloc) of an unpaginated users listing (?all) on a temporary SQLite database,
+    serialized as one list versus streamed by FlaskApi.response. Fails if the streamed peak of the
+    largest listing is over twice the one of the smallest.
+    """
+    import os  # noqa: C0415
+    import tempfile  # noqa: C0415
+    import tracemalloc  # noqa: C0415
+
+    from flask_sqlalchemy.query import Query  # noqa: C0415
+    from sqlalchemy import create_engine  # noqa: C0415
+    from sqlalchemy.orm import Session  # noqa: C0415
+
+    from src.project.extensions import api, schema  # noqa: C0415
+    from src.project.models import User  # noqa: C0415
+    from src.project.repositories import AuthRepository  # noqa: C0415
+
+    def listed(query) -> int:
+        response, _ = api.response(schema.dump(query.all(), name="User", many=True))
+        return len(response.get_data())
+
+    def streamed(query) -> int:
+        response, _ = api.response(query, name="User")
+        return sum(len(chunk) for chunk in response.response)
+
+    def measure(run, query) -> tuple:
+        tracemalloc.start()
+        try:
+            size = run(query)
+            return size, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    peaks = []
+
+    for rows in [int(size) for size in sizes.split(",")]:
+        path = os.path.join(tempfile.mkdtemp(), "stream.sqlite")
+        engine = create_engine(f"sqlite:///{path}")
+        User.__table__.create(engine)
+
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO users (email, first_name, sign_in_count, is_deleted) VALUES (?, 'Name', 0, 0)",
+                [(f"user{i}@example.com",) for i in range(rows)],
+            )
+
+        try:
+            with Session(engine, query_cls=Query) as session, current_app.test_request_context("/users?all"):
+                for label, run in (("list", listed), ("stream", streamed)):
+                    query, _ = AuthRepository.paginate(AuthRepository.filter(session.query(User), User))
+                    started = time.perf_counter()
+                    size, peak = measure(run, query)
+                    seconds = time.perf_counter() - started
+                    session.expunge_all()
+
+                    click.echo(
+                        f"{label} {rows} rows: peak {peak / 1024 / 1024:.1f} MiB, "
+                        f"{size / 1024 / 1024:.1f} MiB of JSON in {seconds:.2f}s"
+                    )
+
+                peaks.append(peak)
+        finally:
+            engine.dispose()
+            os.remove(path)
+
+    if len(peaks) > 1 and peaks[-1] > 2 * peaks[0]:
+        raise click.ClickException("the streamed peak memory grows with the number of rows")
+
+
+def sliding_window_stub(call, keys: list, args: list) -> list:
+    """
+    Python port of the rate limiter Lua script for the Redis stand-in, issuing the same commands.
+    """
+    cost = int(args[0])
+    counts = [1]
+
+    for i in range(len(keys) // 2):
+        current = int(call("GET", keys[2 * i]) or 0)
+        previous = int(call("GET", keys[2 * i + 1]) or 0)
+        limit, window, elapsed = int(args[3 * i + 1]), float(args[3 * i + 2]), float(args[3 * i + 3])
+
+        if previous * (window - elapsed) / window + current + cost > limit:
+            counts[0] = 0
+
+        counts += [current, previous]
+
+    if counts[0] == 1:
+        for i in range(len(keys) // 2):
+            counts[2 * i + 1] = call("INCRBY", keys[2 * i], str(cost).encode())
+            call("EXPIRE", keys[2 * i], str(2 * int(args[3 * i + 2])).encode())
+
+    return counts
+
+
+@bench.command()
+@with_appcontext
+@click.option("-n", "--number", default=5000, help="Requests per scenario. Defaults to 5000")
+@click.option("-t", "--threads", default=8, help="Concurrent clients of the flood. Defaults to 8")
+@click.option("-l", "--limit", "limit_", default=100, help="Requests per minute and IP. Defaults to 100")
+def ratelimit(number: int, threads: int, limit_: int) -> None:
+    """
+    Load test of the rate limiter against a local Redis stand-in: a credential stuffing flood from
+    one address with and without the local tier, the same flood rotating a forged X-Forwarded-For,
+    and requests from distinct addresses, which all reach Redis. Fails if a flood gets more than
+    the limit through.
+    """
+    from concurrent.futures import ThreadPoolExecutor  # noqa: C0415
+
+    from src.project.app import limiter as rate_limiter  # noqa: C0415
+    from src.project.app import rediscache  # noqa: C0415
+    from src.project.exceptions import CustomException  # noqa: C0415
+    from src.project.extensions.flask_rate_limiter import SLIDING_WINDOW_SCRIPT  # noqa: C0415
+
+    server = start_redis_stub({SLIDING_WINDOW_SCRIPT: sliding_window_stub})
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    rediscache.init_app(
+        app,
+        config={"CACHE_TYPE": "RedisCache", "CACHE_REDIS_PORT": server.server_address[1], "CACHE_KEY_PREFIX": "BENCH_"},
+    )
+    # hour long windows: a run crossing a window boundary would let the decayed estimate through again
+    defaults = {"ip": (limit_, 3600), "email": (limit_ * 10, 3600)}
+
+    def attempt(scope: str, address: str, forwarded: str, email: str) -> bool:
+        with app.test_request_context(
+            "/auth/tokens",
+            method="POST",
+            json={"email": email},
+            headers={"X-Forwarded-For": forwarded},
+            environ_base={"REMOTE_ADDR": address},
+        ):
+            try:
+                rate_limiter.check(scope, defaults)
+                return True
+            except CustomException:
+                return False
+
+    def run(label: str, local: bool, addresses, forwarded) -> int:
+        rate_limiter.local_enabled = local
+        rate_limiter.cache_clear()
+        server.commands = 0
+
+        def request_(i: int) -> bool:
+            return attempt(label, addresses(i), forwarded(i), f"user{i % 50}@example.com")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            allowed = sum(executor.map(request_, range(number)))
+        seconds = time.perf_counter() - started
+
+        report(f"{label} ({allowed} allowed, {server.commands} cmds)", seconds, number)
+        return allowed
+
+    def rotating(i: int) -> str:
+        return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+    try:
+        floods = [
+            run("flood, redis only", False, lambda i: "203.0.113.7", lambda i: "203.0.113.7"),
+            run("flood, local tier", True, lambda i: "203.0.113.7", lambda i: "203.0.113.7"),
+            run("flood, forged x-forwarded-for", True, lambda i: "203.0.113.7", rotating),
+        ]
+        run("distinct addresses", True, rotating, rotating)
+    finally:
+        rate_limiter.local_enabled = app.config.get("RATE_LIMIT_LOCAL", True)
+        rate_limiter.cache_clear()
+        server.shutdown()
+
+    if any(allowed > limit_ for allowed in floods):
+        raise click.ClickException(f"a flood from one address got more than {limit_} requests through")
@@ -0,0 +1,28 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.group()
+def email():
+    """
+    Email utilities
+    """
+
+
+@email.command()
+@with_appcontext
+def templates() -> None:
+    """
+    Creates or updates the SES templates sent by the email listeners.
+
+    Runs on deploy, it does nothing unless EMAIL_BACKEND is "ses".
+    """
+    from src.project.libs.email import SesTemplates  # noqa: C0415
+
+    if current_app.config.get("EMAIL_BACKEND", "console") != "ses":
+        click.echo("EMAIL_BACKEND is not ses, no templates to provision")
+        return
+
+    for template_name, action in SesTemplates.sync().items():
+        click.echo(f"SES template {template_name} {action}")
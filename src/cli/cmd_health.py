@@ -1,6 +1,6 @@
 import click
 from flask.cli import with_appcontext
-from src.project.extensions import memcachedcache, rediscache, filecache
+from src.project.extensions import filecache, healthcheck, memcachedcache, rediscache
 
 
 @click.group()
@@ -38,3 +38,22 @@ def cache(cache_type) -> None:
         click.echo("OK")
     else:
         click.echo("Invalid cache backend")
+
+
+@health.command("all")
+@with_appcontext
+def check_all() -> None:
+    """
+    Probes the database and every cache backend in parallel and reports their latency.
+    """
+
+    report = healthcheck.check(use_cache=False)
+
+    for name, check in report["checks"].items():
+        latency = f"{check['latency_ms']:.2f} ms" if check["latency_ms"] is not None else "-"
+        click.echo(f"{name:<12} {check['status']:<8} {latency:>12}  {check['error'] or ''}")
+
+    if report["status"] != "ok":
+        raise click.ClickException("Not ready")
+
+    click.echo("OK")
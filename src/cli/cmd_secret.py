@@ -66,3 +66,19 @@ def token_urlsafe(num_bytes: int) -> None:
     """
     created_token = secrets.token_urlsafe(num_bytes)
     click.echo(f"Token generated: {created_token}")
+
+
+@secret.command()
+@click.option("-p", "--permissions", "permissions", default=0, help="Permissions of the key. Defaults to 0")
+@with_appcontext
+def api_key(permissions: int) -> None:
+    """
+    Creates an active api key. It is shown once, only its SHA-256 digest is stored.
+
+    Args:
+        permissions (int): permissions of the key. Defaults to 0
+    """
+    from src.project.services import ApiKeyService  # noqa: C0415
+
+    instance, created_key = ApiKeyService.create_key(permissions)
+    click.echo(f"Api key {instance.id} generated: {created_key}")
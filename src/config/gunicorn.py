@@ -19,9 +19,27 @@ bind = "0.0.0.0:8000"
 # reload = True
 
 import multiprocessing
+import os
+import shutil
+
+# Workers write their Prometheus samples in this directory and /metrics aggregates them.
+# It must be set before prometheus_client is imported, ie: before the app is loaded.
+prometheus_multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
 
 # workers = int(multiprocessing.cpu_count() * 2)
 
 access_log_format = "%(h)s %(l)s %(u)s %(t)s '%(r)s' %(s)s %(b)s '%(f)s' '%(a)s' in %(D)sµs"  # noqa: E501
 errorlog = None
 accesslog = None
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    # samples of a previous run would be aggregated too
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    from prometheus_client import multiprocess  # noqa: C0415
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -14,11 +14,129 @@ class DefaultConfig:
 
     ENV = "production"
 
+    # Number of proxies (load balancers) in front of the app that append to X-Forwarded-For. The client
+    # address is read from the entry added by the outermost one, 0 ignores the header: a client can
+    # forge it, the rate limits and the sign in tracking would trust any address it sends.
+    PROXY_FIX_X_FOR = 0
+
     # JWT Extended
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=2)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=1)
     JWT_ERROR_MESSAGE_KEY = "description"
 
+    # JWT blocklist: per process Bloom filter of revoked tokens kept up to date via redis pub/sub.
+    # A local miss is trusted for JWT_BLOCKLIST_MAX_STALENESS seconds since the last confirmed sync.
+    JWT_BLOCKLIST_LOCAL = True
+    JWT_BLOCKLIST_CHANNEL = "jwt-blocklist"
+    JWT_BLOCKLIST_MAX_STALENESS = 5.0
+    JWT_BLOCKLIST_CAPACITY = 100_000
+    JWT_BLOCKLIST_ERROR_RATE = 0.001
+    JWT_BLOCKLIST_RESYNC_INTERVAL = 600
+
+    # Password hashing: "pbkdf2", "scrypt" or "argon2" (requires argon2-cffi). Hashes made with
+    # another scheme or cost are upgraded on login. PASSWORD_HASH_WORKERS > 0 runs hashing on a
+    # bounded thread pool, callers wait PASSWORD_HASH_TIMEOUT seconds for a slot before a 503.
+    PASSWORD_HASHER = "scrypt"
+    PASSWORD_PBKDF2_ITERATIONS = 600000
+    PASSWORD_SCRYPT_N = 32768
+    PASSWORD_SCRYPT_R = 8
+    PASSWORD_SCRYPT_P = 1
+    PASSWORD_ARGON2_TIME_COST = 3
+    PASSWORD_ARGON2_MEMORY_COST = 65536
+    PASSWORD_ARGON2_PARALLELISM = 4
+    PASSWORD_HASH_WORKERS = 0
+    PASSWORD_HASH_QUEUE_SIZE = 64
+    PASSWORD_HASH_TIMEOUT = 5
+
+    # Sign in tracking columns are buffered per process and flushed in bulk every
+    # ACTIVITY_FLUSH_INTERVAL seconds. False writes them synchronously on each login.
+    ACTIVITY_TRACKING_BUFFERED = True
+    ACTIVITY_FLUSH_INTERVAL = 5.0
+    ACTIVITY_MAX_BUFFER = 10000
+
+    # SQL statements count and time per request, sent as a Server-Timing header and in the
+    # access log. Statements repeated SQL_N_PLUS_ONE_THRESHOLD times in a request are logged (0 disables).
+    SQL_TRACKING = True
+    SQL_SERVER_TIMING = True
+    SQL_N_PLUS_ONE_THRESHOLD = 10
+
+    # Prometheus metrics at /metrics. Under gunicorn the workers share PROMETHEUS_MULTIPROC_DIR
+    # (see src/config/gunicorn.py). Pool and cache gauges are refreshed every METRICS_REFRESH_INTERVAL seconds.
+    METRICS_ENABLED = True
+    METRICS_REFRESH_INTERVAL = 5.0
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # /health/ready probes the database and caches in parallel, each within HEALTH_PROBE_TIMEOUT seconds.
+    # Reports are cached HEALTH_CACHE_TTL seconds. Failed optional probes do not make the instance unready.
+    HEALTH_PROBE_TIMEOUT = 2.0
+    HEALTH_CACHE_TTL = 5.0
+    HEALTH_OPTIONAL_PROBES = ()
+
+    # Response cache of the read endpoints (rediscache). Entries are invalidated by model tags
+    # when a session writing those models commits. Concurrent misses wait RESPONSE_CACHE_LOCK_TIMEOUT
+    # seconds for the request building the entry.
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_TIMEOUT = 60
+    RESPONSE_CACHE_LOCK_TIMEOUT = 5.0
+
+    # Near cache of hot reference data: a per process LRU in front of rediscache. Versions of the
+    # model tags are checked every NEAR_CACHE_CHECK_INTERVAL seconds, writes by other workers show up then.
+    NEAR_CACHE_MAXSIZE = 1024
+    NEAR_CACHE_LOCAL_TTL = 60.0
+    NEAR_CACHE_TIMEOUT = 3600
+    NEAR_CACHE_CHECK_INTERVAL = 1.0
+
+    # Api keys: each process keeps the digests of the active keys in memory, reloaded when a key is
+    # written (seen within NEAR_CACHE_CHECK_INTERVAL) or after API_KEY_INDEX_TTL seconds.
+    # Uses are added to the request_count of the keys every API_KEY_FLUSH_INTERVAL seconds.
+    API_KEY_INDEX_TTL = 60.0
+    API_KEY_FLUSH_INTERVAL = 10.0
+
+    # Rate limits: sliding window counters in rediscache, per IP, email and api key. RATE_LIMITS overrides
+    # the limits of a scope, ie: {"auth.tokens": {"ip": (20, 60), "email": (5, 300)}} for (requests, seconds).
+    # Each process remembers up to RATE_LIMIT_LOCAL_MAXSIZE keys to reject floods without asking Redis.
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_LOCAL = True
+    RATE_LIMITS = {}
+    RATE_LIMIT_LOCAL_MAXSIZE = 100_000
+
+    # User search: "auto" uses the full text index of the database (pg_trgm on PostgreSQL, FTS5 on SQLite)
+    # when the migration created it, "like" always runs ILIKE '%term%'.
+    SEARCH_BACKEND = "auto"
+
+    # JSON (uses orjson when it is installed)
+    JSON_USE_ORJSON = True
+
+    # Event Manager: async subscribers run on a thread pool ("thread"), as Celery tasks ("celery")
+    # or inline ("sync", ie: for tests)
+    EVENT_DISPATCH_MODE = "thread"
+    EVENT_MAX_WORKERS = 4
+    EVENT_MAX_QUEUE_SIZE = 100
+
+    # Discord webhook notifier
+    DISCORD_BATCHING = True
+    DISCORD_FLUSH_INTERVAL = 1.0
+    DISCORD_TIMEOUT = 5
+    DISCORD_MAX_RETRIES = 3
+    DISCORD_MAX_QUEUE_SIZE = 1000
+
+    # AWS clients connection pool
+    AWS_MAX_POOL_CONNECTIONS = 10
+    AWS_MAX_ATTEMPTS = 3
+    AWS_RETRY_MODE = "standard"
+    AWS_CONNECT_TIMEOUT = 5
+    AWS_READ_TIMEOUT = 10
+
+    # Email: "console" prints the emails, "ses" sends them from a Celery task. Templated emails are
+    # queued per template and sent in bulk every EMAIL_BULK_FLUSH_INTERVAL seconds or by chunks.
+    EMAIL_BACKEND = "console"
+    EMAIL_BULK_FLUSH_INTERVAL = 1.0
+    EMAIL_BULK_CHUNK_SIZE = 50
+    EMAIL_BULK_MAX_ATTEMPTS = 3
+    EMAIL_BULK_BACKOFF = 0.5
+    # Jinja bytecode cache of the email templates, defaults to a folder in the temp dir
+    EMAIL_TEMPLATES_CACHE_DIR = None
+
     # BABEL
     BABEL_DEFAULT_LOCALE = "en"
     BABEL_DEFAULT_TIMEZONE = "UTC"
@@ -43,7 +161,13 @@ class DefaultConfig:
     GOOGLE_MAPS_API_KEY = None
 
     # Logging stuff
+    # LOG_FORMAT "text" (colored, development only) or "json" (JSON lines access log).
+    # LOG_QUEUE formats and writes records from a background thread.
+    # REQUEST_LOG_SAMPLE_RATE is the fraction of successful requests logged, errors are always logged.
     REQUEST_LOGGER = False
+    LOG_FORMAT = "text"
+    LOG_QUEUE = True
+    REQUEST_LOG_SAMPLE_RATE = 1.0
     LOG_LEVEL = logging.INFO
     STREAM_LOG_LEVEL = logging.INFO
     SYSLOG_LOG_LEVEL = logging.ERROR
@@ -2,6 +2,7 @@
 import os
 
 from flask import Flask, send_from_directory, render_template
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from src.cli import register_cli_commands
 from src.config import DefaultConfig
@@ -20,6 +21,18 @@ from src.project.extensions import (
     i18n,
     memcachedcache,
     api,
+    emails,
+    blocklist,
+    passwords,
+    activity,
+    queries,
+    metrics,
+    healthcheck,
+    responses,
+    near,
+    apikeys,
+    limiter,
+    JSONProvider,
 )
 from src.project.helpers.utils import make_celery
 from src.project.helpers.babel import get_locale, get_timezone
@@ -38,6 +51,13 @@ def create_app() -> "Flask":
     # Instance configuration value.
     app.config.from_pyfile("config.py", silent=True)
 
+    # request.remote_addr is the client address given by the trusted proxies
+    if app.config.get("PROXY_FIX_X_FOR", 0):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
+    # orjson backed JSON provider (falls back to the stdlib json module)
+    app.json = JSONProvider(app)
+
     with app.app_context():
         register_extensions(app)
 
@@ -101,6 +121,11 @@ def register_extensions(app):
     aws.init_app(app)
     api.init_app(app)
     i18n.init_app(app, timezone_selector=get_timezone, locale_selector=get_locale)
+    emails.init_app(app)
+    passwords.init_app(app)
+    activity.init_app(app, db)
+    queries.init_app(app)
+    metrics.init_app(app, db)
     filecache.init_app(
         app,
         config={
@@ -117,6 +142,11 @@ def register_extensions(app):
             "CACHE_KEY_PREFIX": "RESTAPI_",
         },
     )
+    blocklist.init_app(app, rediscache)
+    responses.init_app(app, rediscache, db)
+    near.init_app(app, responses)
+    apikeys.init_app(app, db, near)
+    limiter.init_app(app, rediscache)
     memcachedcache.init_app(
         app,
         config={
@@ -125,6 +155,10 @@ def register_extensions(app):
             "CACHE_KEY_PREFIX": "RESTAPI_",
         },
     )
+    healthcheck.init_app(
+        app,
+        {"database": db, "redis": rediscache, "memcached": memcachedcache, "filesystem": filecache},
+    )
 
 
 def register_event_handlers():
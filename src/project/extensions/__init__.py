@@ -18,6 +18,18 @@ from .flask_validator_engine import ValidatorEngine
 from .flask_event_manager import EventManager
 from .flask_aws_manager import AWSManager
 from .flask_api import FlaskApi
+from .flask_json_provider import JSONProvider
+from .flask_email_renderer import EmailRenderer
+from .flask_token_blocklist import TokenBlocklist
+from .flask_password_hasher import PasswordHasher
+from .flask_activity_tracker import ActivityTracker
+from .flask_query_tracker import QueryTracker
+from .flask_metrics import Metrics
+from .flask_health_checker import HealthChecker
+from .flask_response_cache import ResponseCache
+from .flask_near_cache import NearCache
+from .flask_api_keys import ApiKeyAuth
+from .flask_rate_limiter import RateLimiter
 
 metadata = MetaData(
     naming_convention={
@@ -43,3 +55,14 @@ rediscache = Cache()
 memcachedcache = Cache()
 i18n = Babel()
 api = FlaskApi()
+emails = EmailRenderer()
+blocklist = TokenBlocklist()
+passwords = PasswordHasher()
+activity = ActivityTracker()
+queries = QueryTracker()
+metrics = Metrics()
+healthcheck = HealthChecker()
+responses = ResponseCache()
+near = NearCache()
+apikeys = ApiKeyAuth()
+limiter = RateLimiter()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Flask Activity Tracker."""
+
+import atexit
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+from types import SimpleNamespace
+
+from flask import Flask
+from sqlalchemy import DateTime, Integer, String, bindparam, case, cast, column, update, values
+
+EXTENSION_NAME = "flask-activity-tracker"
+
+# Columns of a buffered row, in the order they are stored
+COLUMNS = (
+    ("id", Integer()),
+    ("logins", Integer()),
+    ("previous_at", DateTime(timezone=True)),
+    ("previous_ip", String(45)),
+    ("current_at", DateTime(timezone=True)),
+    ("current_ip", String(45)),
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker(object):
+    """Activity Tracker.
+
+    Write-behind buffer for the sign in tracking columns (sign_in_count, current_sign_in_*
+    and last_sign_in_*). Sign ins are coalesced per row in memory and flushed every
+    ACTIVITY_FLUSH_INTERVAL seconds, or as soon as ACTIVITY_MAX_BUFFER rows are pending,
+    in a single transaction: one `UPDATE ... FROM (VALUES ...)` on PostgreSQL and an
+    executemany UPDATE elsewhere. Concurrent sign ins of the same account no longer
+    serialize on its row lock during the request.
+
+    Pending sign ins of a process are lost if it is killed before a flush, the counters
+    are best effort. ACTIVITY_TRACKING_BUFFERED = False keeps the synchronous writes.
+    """
+
+    def __init__(self, app: Flask = None, db=None):
+        self.app = None
+        self.db = None
+        self.buffered = True
+        self.flush_interval = 5.0
+        self.max_buffer = 10000
+
+        self.pending = {}
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.pid = None
+        self.thread = None
+
+        atexit.register(self.flush)
+
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app: Flask, db):
+        """Initialize the app with the Flask-SQLAlchemy instance used to flush."""
+        self.app = app
+        self.db = db
+        self.buffered = app.config.get("ACTIVITY_TRACKING_BUFFERED", True)
+        self.flush_interval = app.config.get("ACTIVITY_FLUSH_INTERVAL", 5.0)
+        self.max_buffer = app.config.get("ACTIVITY_MAX_BUFFER", 10000)
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def track(self, table, row_id: int, signed_in_at, ip_address: str):
+        """
+        Buffers a sign in.
+
+        Several sign ins of the same row are coalesced: the counter adds up, current_* takes
+        the latest one and last_* the one before it.
+        """
+        self.start()
+
+        with self.lock:
+            entry = self.pending.get((table, row_id))
+
+            if entry is None:
+                self.pending[(table, row_id)] = [1, None, None, signed_in_at, ip_address]
+            else:
+                entry[0] += 1
+                entry[1], entry[2] = entry[3], entry[4]
+                entry[3], entry[4] = signed_in_at, ip_address
+
+            full = len(self.pending) >= self.max_buffer
+
+        if full:
+            self.wakeup.set()
+
+    def start(self):
+        """Start the flusher thread once per process (threads do not survive a fork)."""
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.pending = {}
+            self.thread = Thread(target=self.worker, name="activity-tracker", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def worker(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Activity tracking flush failed")
+
+    def flush(self) -> int:
+        """
+        Writes the pending sign ins.
+
+        Returns:
+            int: Number of rows updated
+        """
+        if self.app is None or self.pid != os.getpid():
+            return 0
+
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        tables = {}
+        for (table, row_id), entry in pending.items():
+            tables.setdefault(table, []).append((row_id, *entry))
+
+        started = time.perf_counter()
+
+        with self.app.app_context():
+            with self.db.engine.begin() as connection:
+                for table, rows in tables.items():
+                    self.write(connection, table, rows)
+
+        logger.debug(f"Flushed {len(pending)} sign ins in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return len(pending)
+
+    @staticmethod
+    def write(connection, table, rows: list):
+        """Updates the tracking columns of every row in one statement."""
+        postgresql = connection.dialect.name == "postgresql"
+
+        if postgresql:
+            source = values(*(column(name, type_) for name, type_ in COLUMNS), name="activity").data(rows)
+            columns = source.c
+        else:
+            columns = SimpleNamespace(**{name: bindparam(f"activity_{name}", type_=type_) for name, type_ in COLUMNS})
+
+        def typed(value, type_):
+            # VALUES columns holding only NULLs are text on PostgreSQL, bind parameters are already typed
+            return cast(value, type_) if postgresql else value
+
+        statement = (
+            update(table)
+            .where(table.c.id == columns.id)
+            .values(
+                sign_in_count=table.c.sign_in_count + columns.logins,
+                last_sign_in_at=case(
+                    (columns.logins > 1, typed(columns.previous_at, DateTime(timezone=True))),
+                    else_=table.c.current_sign_in_at,
+                ),
+                last_sign_in_ip=case(
+                    (columns.logins > 1, typed(columns.previous_ip, String(45))),
+                    else_=table.c.current_sign_in_ip,
+                ),
+                current_sign_in_at=typed(columns.current_at, DateTime(timezone=True)),
+                current_sign_in_ip=typed(columns.current_ip, String(45)),
+            )
+        )
+
+        if postgresql:
+            connection.execute(statement)
+        else:
+            names = [f"activity_{name}" for name, _ in COLUMNS]
+            connection.execute(statement, [dict(zip(names, row)) for row in rows])
+
+    def size(self) -> int:
+        """Number of rows waiting for a flush."""
+        return len(self.pending)
+
@@ -1,19 +1,39 @@
 """ This file contains the FlaskApi class
 which handles responses and exceptions for the framework."""
 
+import atexit
+import json
 import logging
+import os
+import random
+import threading
 import time
 import traceback
 import uuid
-from datetime import datetime
-from logging.handlers import SysLogHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
+from queue import SimpleQueue
 from typing import Union
 
-from flask import Flask, current_app, g, jsonify, make_response, request
+from flask import (
+    Flask,
+    Response,
+    current_app,
+    g,
+    has_request_context,
+    jsonify,
+    make_response,
+    request,
+    stream_with_context,
+)
 from flask.logging import default_handler
 from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy.orm import Query
 from werkzeug.exceptions import HTTPException
 
+from src.project.extensions.flask_query_tracker import STATS_KEY
+from src.project.helpers.pagination import COUNT_ESTIMATE, COUNT_EXACT, COUNT_NONE, KeysetPagination
+
 
 class Color:
     """
@@ -29,6 +49,75 @@ class Color:
     RESET = "\033[0m"
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines. Access log records carry their fields in `record.access`.
+    """
+
+    def __init__(self, prefix: str = ""):
+        super().__init__()
+        self.prefix = prefix
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+
+        access = getattr(record, "access", None)
+        if access is not None:
+            entry.update(access)
+        else:
+            entry["message"] = record.getMessage()
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return self.prefix + json.dumps(entry, default=str)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread that formats and writes them with the wrapped
+    handlers, so neither formatting nor I/O happen in the request thread. The listener is
+    started lazily once per process (threads do not survive a fork).
+    """
+
+    def __init__(self, *handlers: logging.Handler):
+        super().__init__(SimpleQueue())
+        self.handlers = handlers
+        self.listener = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatted by the listener handlers
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if self.pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+
+            self.queue = SimpleQueue()
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Writes the queued records and stops the listener."""
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.pid = None
+
+
 class FlaskApi:
     """
     This class handles responses, exceptions and logger for the framework.
@@ -48,6 +137,8 @@ class FlaskApi:
             app (Flask): Flask app
         """
         self.logger = logging.getLogger(app.name)
+        self.log_format = app.config.get("LOG_FORMAT", "text")
+        self.sample_rate = app.config.get("REQUEST_LOG_SAMPLE_RATE", 1.0)
 
         # configure exception handlers
         app.register_error_handler(Exception, self.handle_exception)
@@ -55,10 +146,8 @@ class FlaskApi:
         @app.before_request
         def befor_request():
             """This function handles the before request."""
-            g.start = time.time()
-            g.remote_ip = request.headers.get(
-                "X-Forwarded-For", request.remote_addr
-            ).split(",")[0]
+            g.start = time.perf_counter_ns()
+            g.remote_ip = request.remote_addr
             g.request_id = str(uuid.uuid4())
 
         @app.after_request
@@ -70,11 +159,19 @@ class FlaskApi:
 
             response.headers["X-Request-Id"] = g.request_id
 
+            # errors are always logged, successful requests are sampled
+            if response.status_code < 400 and random.random() >= self.sample_rate:
+                return response
+
+            if self.log_format == "json":
+                self.log_access(response)
+                return response
+
             # preparing the debug information message
             method = request.method
             url = request.url
             status_code = response.status_code
-            duration = round(time.time() - g.start, 2)
+            duration = round((time.perf_counter_ns() - g.start) / 1e9, 3)
             request_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             json_payload = request.get_json(silent=True)
             error_response = (
@@ -91,6 +188,9 @@ class FlaskApi:
 
             json_payload = f"JSON   : {json_payload}" if json_payload else ""
 
+            sql_stats = g.get(STATS_KEY)
+            sql = f"SQL    : {sql_stats.count} queries in {sql_stats.total_ms:.2f}ms" if sql_stats else ""
+
             message = f"""
 >>>>>>>>  START REQUEST >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 
@@ -99,6 +199,7 @@ class FlaskApi:
    METHOD : {method}
    URL    : {url}
    STATUS : {request_color}{status_code}{Color.RESET}
+   {sql}
    {json_payload}
    {error_response}
 
@@ -114,6 +215,7 @@ class FlaskApi:
             g.pop("remote_ip", None)
             g.pop("start", None)
             g.pop("request_id", None)
+            g.pop("error_code", None)
 
         # configure logging
         log_level = app.config.get("LOG_LEVEL", logging.INFO)
@@ -150,6 +252,8 @@ class FlaskApi:
         app.logger.removeHandler(default_handler)
         app.logger.setLevel(app_log_level)
 
+        handlers = []
+
         # setup stream handler
         stream_handler = logging.StreamHandler()
         stream_handler_formatter = logging.Formatter(
@@ -157,7 +261,7 @@ class FlaskApi:
         )
         stream_handler.setFormatter(stream_handler_formatter)
         stream_handler.setLevel(stream_log_level)
-        self.logger.addHandler(stream_handler)
+        handlers.append(stream_handler)
 
         # setup syslog handler
         if app.config.get("SYSLOG_ADDRESS") is not None:
@@ -167,7 +271,57 @@ class FlaskApi:
             )
             syslog_handler.setFormatter(syslog_handler_formatter)
             syslog_handler.setLevel(syslog_log_level)
-            self.logger.addHandler(syslog_handler)
+            handlers.append(syslog_handler)
+
+        if self.log_format == "json":
+            stream_handler.setFormatter(JsonFormatter())
+            for handler in handlers[1:]:
+                handler.setFormatter(JsonFormatter(prefix="MORFI "))
+
+        # format and write the records from a background thread
+        if app.config.get("LOG_QUEUE", True):
+            handlers = [AsyncHandler(*handlers)]
+
+        for handler in handlers:
+            self.logger.addHandler(handler)
+
+    def log_access(self, response: Response):
+        """
+        This function logs the request as a structured access record.
+        The request body is not parsed again and the record is built from plain values,
+        its formatting happens in the log handlers.
+
+        Args:
+            response (Response): response
+        """
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        # resolve the context locals once, each proxy access has a cost
+        req = request._get_current_object()  # pylint: disable=protected-access
+        ctx = g._get_current_object()  # pylint: disable=protected-access
+
+        access = {
+            "request_id": ctx.request_id,
+            "method": req.method,
+            "path": req.path,
+            "query": req.query_string.decode("latin-1"),
+            "status": response.status_code,
+            "duration_ms": (time.perf_counter_ns() - ctx.start) / 1_000_000,
+            "ip": ctx.remote_ip,
+            "user_agent": req.user_agent.string,
+            "size": response.content_length,
+        }
+
+        error_code = ctx.get("error_code")
+        if error_code is not None:
+            access["error"] = error_code
+
+        sql_stats = ctx.get(STATS_KEY)
+        if sql_stats is not None:
+            access.update(sql_stats.to_dict())
+
+        self.logger.info("access", extra={"access": access})
 
     def log(self, message: str, level: Union[str, int] = logging.ERROR):
         """
@@ -249,21 +403,32 @@ class FlaskApi:
     # RESPONSE STUFF BELOW #
 
     def response(
-        self, data, meta: dict = None, code: int = None, pagination: Pagination = None
+        self,
+        data,
+        meta: dict = None,
+        code: int = None,
+        pagination: Union[Pagination, KeysetPagination] = None,
+        **kwargs,
     ):
         """
         This function builds the response
 
+        Unpaginated queries, ie: the result of get_all() with ?all, are streamed (see stream).
+
         Args:
-            data (dict): data
+            data (dict): data, or the query of an unpaginated listing
             meta (dict, optional): meta. Defaults to None.
             code (int, optional): status code. Defaults to None.
-            pagination (Pagination, optional): pagination. Defaults to None.
+            pagination (Union[Pagination, KeysetPagination], optional): pagination. Defaults to None.
+            **kwargs: The keyword arguments to pass to the schema of a streamed query.
 
         Returns:
             json: response
         """
 
+        if isinstance(data, Query):
+            return self.stream(data, meta=meta, code=code, **kwargs)
+
         _response = {}
 
         _response["data"] = data
@@ -276,6 +441,53 @@ class FlaskApi:
 
         return make_response(jsonify(_response)), self.http_status_code(code)
 
+    def stream(self, query, name: str = None, meta: dict = None, code: int = None, **kwargs):
+        """
+        This function builds a streamed response for unpaginated queries
+
+        Rows are fetched in batches with yield_per, serialized one by one through the
+        SchemaManager schema and written as soon as a batch is ready, so the memory usage
+        does not grow with the number of rows. Once the first chunk is sent the status code
+        can not change, errors raised while streaming abort the response.
+
+        Args:
+            query (Query): SQLAlchemy query, ie: the result of get_all(all=True)
+            name (str, optional): schema name. Defaults to the query model name.
+            meta (dict, optional): meta. Defaults to None.
+            code (int, optional): status code. Defaults to None.
+            **kwargs: The keyword arguments to pass to the schema, ie: only, exclude.
+
+        Returns:
+            Response: streamed json response
+        """
+
+        model = query.column_descriptions[0]["entity"]
+        schema = current_app.extensions["flask-schema"].schema_for(model, name=name or model.__name__, **kwargs)
+        batch_size = current_app.config.get("API_STREAM_BATCH_SIZE", 500)
+        dumps = current_app.json.dumps
+
+        def generate():
+            yield '{"data": ['
+
+            chunk = []
+            separator = ""
+            for row in query.yield_per(batch_size):
+                chunk.append(separator + dumps(schema.dump(row)))
+                separator = ","
+
+                if len(chunk) >= batch_size:
+                    yield "".join(chunk)
+                    chunk = []
+
+            if chunk:
+                yield "".join(chunk)
+
+            yield f'], "meta": {dumps(meta)}, "error": null, "warning": null}}'
+
+        response = Response(stream_with_context(generate()), mimetype="application/json")
+
+        return response, self.http_status_code(code)
+
     def error(self, error, code: int = 500):
         """
         This function builds the error response
@@ -293,6 +505,9 @@ class FlaskApi:
         _response["warning"] = None
         _response["error"] = error
 
+        if has_request_context() and isinstance(error, dict):
+            g.error_code = error.get("code")
+
         return make_response(jsonify(_response)), code
 
     def build_pagination(self, pagination):
@@ -300,14 +515,26 @@ class FlaskApi:
         This function builds the pagination
 
         Args:
-            pagination (Pagination): pagination
+            pagination (Union[Pagination, KeysetPagination]): pagination
 
         Returns:
             dict: pagination
         """
 
         if isinstance(pagination, (Pagination,)):
-            return {
+            count_mode = getattr(pagination, "count_mode", COUNT_EXACT)
+
+            if count_mode == COUNT_NONE:
+                # without a total, a full page means there could be a next one
+                has_next = len(pagination.items) >= pagination.per_page
+                return {
+                    "prev_page": pagination.prev_num if pagination.prev_num else False,
+                    "next_page": pagination.page + 1 if has_next else False,
+                    "page": pagination.page,
+                    "per_page": pagination.per_page,
+                }
+
+            _pagination = {
                 "prev_page": pagination.prev_num if pagination.prev_num else False,
                 "next_page": pagination.next_num if pagination.next_num else False,
                 "page": pagination.page,
@@ -316,6 +543,18 @@ class FlaskApi:
                 "total": pagination.total,
             }
 
+            if count_mode == COUNT_ESTIMATE:
+                _pagination["total_estimated"] = True
+
+            return _pagination
+
+        if isinstance(pagination, (KeysetPagination,)):
+            return {
+                "prev_cursor": pagination.prev_cursor if pagination.prev_cursor else False,
+                "next_cursor": pagination.next_cursor if pagination.next_cursor else False,
+                "per_page": pagination.per_page,
+            }
+
     # HELPER FUNCTIONS #
     def handle_custom_exceptions(self, error):
         """
@@ -407,7 +646,8 @@ class FlaskApi:
         if request.path.startswith("/favicon.ico"):
             return True
 
-        if current_app.config.get("ENV") == "production":
+        # the text format is meant for development, use LOG_FORMAT = "json" in production
+        if current_app.config.get("ENV") == "production" and self.log_format != "json":
             return True
 
         if request.method == "OPTIONS":
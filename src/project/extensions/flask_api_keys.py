@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Flask Api Keys."""
+
+import atexit
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+from flask import Flask
+from sqlalchemy import bindparam, select, update
+
+EXTENSION_NAME = "flask-api-keys"
+
+# Tag of the api_keys rows in the response and near caches, bumped when a session writes ApiKey
+TAG = "ApiKey"
+
+TABLE = "api_keys"
+
+ApiKeyIdentity = namedtuple("ApiKeyIdentity", ("id", "permissions"))
+
+logger = logging.getLogger(__name__)
+
+
+class ApiKeyAuth(object):
+    """Api Key Auth.
+
+    Keys are stored as SHA-256 hex digests in `api_keys.key`. Each process keeps an index
+    digest -> (id, permissions) of the active keys, so a check hashes the presented key,
+    looks it up and compares the digests with `hmac.compare_digest`, without a query.
+
+    The index is reloaded when the ApiKey tag version changes (any committed write to the
+    model, read through the near cache every NEAR_CACHE_CHECK_INTERVAL seconds) and at least
+    every API_KEY_INDEX_TTL seconds, which also bounds staleness while Redis is unreachable.
+
+    Uses are counted in memory and added to `request_count`/`last_used_at` by a background
+    thread every API_KEY_FLUSH_INTERVAL seconds. Counts of a killed process may be lost.
+    """
+
+    def __init__(self, app: Flask = None, db=None, near=None):
+        self.app = None
+        self.db = None
+        self.near = None
+        self.ttl = 60.0
+        self.flush_interval = 10.0
+
+        self.index = {}
+        self.version = None
+        self.expires_at = 0.0
+        self.index_lock = Lock()
+        # Approximate counters, they are not locked to keep the checks cheap
+        self.stats = {"accepted": 0, "rejected": 0, "reloads": 0}
+
+        self.pending = {}
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.pid = None
+        self.thread = None
+
+        atexit.register(self.flush)
+
+        if app is not None:
+            self.init_app(app, db, near)
+
+    def init_app(self, app: Flask, db, near):
+        """Initialize the app with the Flask-SQLAlchemy instance and the near cache providing the tag versions."""
+        self.app = app
+        self.db = db
+        self.near = near
+        self.ttl = app.config.get("API_KEY_INDEX_TTL", 60.0)
+        self.flush_interval = app.config.get("API_KEY_FLUSH_INTERVAL", 10.0)
+        self.expires_at = 0.0
+
+        # writes to ApiKey bump the tag once the session commits
+        near.responses.tagged.add(TAG)
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    @staticmethod
+    def digest(key: str) -> str:
+        """Value stored in `api_keys.key` for a key."""
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def authenticate(self, key: str):
+        """
+        Checks a key and counts its use.
+
+        Returns:
+            ApiKeyIdentity: id and permissions of the key, or None if it is unknown or inactive
+        """
+        if not key:
+            return None
+
+        presented = self.digest(key)
+        match = self.get_index().get(presented)
+
+        # the lookup is on the digest, never on the key: its timing tells nothing usable about a valid key
+        if match is None or not hmac.compare_digest(match[0], presented):
+            self.stats["rejected"] += 1
+            return None
+
+        self.stats["accepted"] += 1
+        self.count(match[1].id)
+        return match[1]
+
+    def get_index(self) -> dict:
+        """The index of the active keys, reloaded when the ApiKey tag changed or the TTL expired."""
+        try:
+            version = self.near.versions((TAG,))[0]
+        except Exception:  # pylint: disable=broad-except
+            # Redis is unreachable, the TTL bounds the staleness
+            version = self.version
+
+        if version == self.version and time.monotonic() < self.expires_at:
+            return self.index
+
+        with self.index_lock:
+            if version != self.version or time.monotonic() >= self.expires_at:
+                self.index = self.load()
+                self.version = version
+                self.expires_at = time.monotonic() + self.ttl
+                self.stats["reloads"] += 1
+
+        return self.index
+
+    def load(self) -> dict:
+        """Reads the active keys, the only query of the checks."""
+        table = self.db.metadata.tables[TABLE]
+        statement = select(table.c.id, table.c.key, table.c.permissions).where(table.c.is_active.is_(True))
+
+        with self.app.app_context():
+            with self.db.engine.connect() as connection:
+                rows = connection.execute(statement).all()
+
+        return {row.key: (row.key, ApiKeyIdentity(row.id, row.permissions)) for row in rows if row.key}
+
+    def count(self, key_id: int):
+        """Buffers a use of a key until the next flush."""
+        self.start()
+
+        with self.lock:
+            entry = self.pending.get(key_id)
+            self.pending[key_id] = (entry[0] + 1 if entry else 1, datetime.utcnow())
+
+    def start(self):
+        """Start the flusher thread once per process (threads do not survive a fork)."""
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.pending = {}
+            self.thread = Thread(target=self.worker, name="api-keys", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def size(self) -> int:
+        return len(self.pending)
+
+    def worker(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Api key usage flush failed")
+
+    def flush(self) -> int:
+        """
+        Adds the pending uses to the api_keys counters.
+
+        Returns:
+            int: Number of keys updated
+        """
+        if self.app is None or self.pid != os.getpid():
+            return 0
+
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        if not pending:
+            return 0
+
+        table = self.db.metadata.tables[TABLE]
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("key_id"))
+            .values(
+                request_count=table.c.request_count + bindparam("uses"),
+                last_used_at=bindparam("used_at"),
+            )
+        )
+
+        # a Core UPDATE: no session flush, the usage counters do not invalidate the cached keys
+        with self.app.app_context():
+            with self.db.engine.begin() as connection:
+                connection.execute(
+                    statement,
+                    [{"key_id": key, "uses": uses, "used_at": used_at} for key, (uses, used_at) in pending.items()],
+                )
+
+        return len(pending)
@@ -1,18 +1,35 @@
 # -*- coding: utf-8 -*-
 """Flask AWS Manager."""
+import os
+from threading import Lock
+
 import boto3
+from botocore.config import Config
 
 EXTENSION_NAME = "flask-aws-manager"
 
 
 class AWSManager(object):
-    """AWS Manager."""
+    """AWS Manager.
+
+    Clients are built once per process and service and then reused, boto3 clients are thread
+    safe. Each client keeps its own botocore connection pool tuned through AWS_MAX_POOL_CONNECTIONS,
+    AWS_MAX_ATTEMPTS, AWS_RETRY_MODE, AWS_CONNECT_TIMEOUT and AWS_READ_TIMEOUT. The cache is
+    dropped when the process id changes so forked workers never share sockets.
+    """
 
     def __init__(self, app=None):
 
         self.region_name = None
         self.aws_access_key_id = None
         self.aws_secret_access_key = None
+        self.endpoint_url = None
+        self.config = None
+
+        self.clients = {}
+        self.session = None
+        self.pid = None
+        self.lock = Lock()
 
         if app is not None:
             self.init_app(app)
@@ -22,6 +39,17 @@ class AWSManager(object):
         self.region_name = app.config.get("AWS_DEFAULT_REGION")
         self.aws_access_key_id = app.config.get("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = app.config.get("AWS_SECRET_ACCESS_KEY")
+        self.endpoint_url = app.config.get("AWS_ENDPOINT_URL")
+        self.config = Config(
+            max_pool_connections=app.config.get("AWS_MAX_POOL_CONNECTIONS", 10),
+            retries={
+                "max_attempts": app.config.get("AWS_MAX_ATTEMPTS", 3),
+                "mode": app.config.get("AWS_RETRY_MODE", "standard"),
+            },
+            connect_timeout=app.config.get("AWS_CONNECT_TIMEOUT", 5),
+            read_timeout=app.config.get("AWS_READ_TIMEOUT", 10),
+        )
+        self.clear()
 
         app.extensions = getattr(app, "extensions", {})
         app.extensions[EXTENSION_NAME] = self
@@ -34,11 +62,40 @@ class AWSManager(object):
     def reset(self):
         """Reset the AWS Manager."""
 
+    def clear(self):
+        """Drop every cached client."""
+        with self.lock:
+            self.clients = {}
+            self.session = None
+            self.pid = None
+
     def get_client(self, client_name):
         """Get AWS client."""
-        return boto3.client(
+        if self.pid != os.getpid():
+            self.clear()
+
+        client = self.clients.get(client_name)
+
+        if client is None:
+            with self.lock:
+                client = self.clients.get(client_name)
+                if client is None:
+                    client = self.create_client(client_name)
+                    self.clients[client_name] = client
+
+        return client
+
+    def create_client(self, client_name):
+        """Build a new client. boto3 sessions are not thread safe, the caller must hold the lock."""
+        if self.session is None:
+            self.session = boto3.session.Session()
+            self.pid = os.getpid()
+
+        return self.session.client(
             client_name,
             region_name=self.region_name,
             aws_access_key_id=self.aws_access_key_id,
             aws_secret_access_key=self.aws_secret_access_key,
+            endpoint_url=self.endpoint_url,
+            config=self.config,
         )
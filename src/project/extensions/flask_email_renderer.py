@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Flask Email Renderer."""
+
+import os
+import re
+import tempfile
+import uuid
+from threading import Lock
+
+from flask import Flask, url_for
+from flask_babel import force_locale, get_locale, gettext, ngettext
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, meta, nodes, select_autoescape
+from markupsafe import Markup, escape
+
+from src.project.helpers.utils import get_default_email_template_params
+
+EXTENSION_NAME = "flask-email-renderer"
+
+
+class Layout:
+    """
+    A template rendered once with a marker in place of each per message variable.
+
+    `parts` holds the static chunks between the markers and `names` the variable that goes
+    after each chunk, so rendering is a join of the memoized chunks and the escaped values.
+    """
+
+    __slots__ = ("parts", "names")
+
+    def __init__(self, parts: list, names: list):
+        self.parts = parts
+        self.names = names
+
+    def render(self, context: dict, autoescape: bool) -> str:
+        chunks = [self.parts[0]]
+
+        for name, part in zip(self.names, self.parts[1:]):
+            value = context.get(name, "")
+            chunks.append(str(escape(value)) if autoescape else str(value))
+            chunks.append(part)
+
+        return "".join(chunks)
+
+
+class EmailRenderer(object):
+    """Email Renderer.
+
+    Renders the `templates/emails` Jinja templates with a bytecode cache and a base context
+    that is built once from the APP_* settings. Templates whose per message variables are
+    only printed (ie: `{{ TITLE }}`) are rendered once per locale and memoized as a Layout,
+    any other template is rendered by Jinja on each call.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.env = None
+        self.auto_reload = False
+        self.base_context = {}
+        self.layouts = {}
+        self.lock = Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the app."""
+        directory = app.config.get("EMAIL_TEMPLATES_CACHE_DIR") or os.path.join(
+            tempfile.gettempdir(), f"{app.import_name}-email-templates"
+        )
+        os.makedirs(directory, exist_ok=True)
+        self.auto_reload = app.debug
+
+        self.env = Environment(
+            loader=PackageLoader("src.project", "templates"),
+            bytecode_cache=FileSystemBytecodeCache(directory),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=self.auto_reload,
+            extensions=["jinja2.ext.i18n"],
+        )
+        self.env.install_gettext_callables(gettext, ngettext, newstyle=True)
+        self.env.globals["url_for"] = url_for
+
+        with app.app_context():
+            self.base_context = get_default_email_template_params()
+
+        self.layouts = {}
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def render(self, filename: str, context: dict = None, locale: str = None) -> str:
+        """
+        Renders an email template.
+
+        Args:
+            filename: Template name relative to the templates folder, ie: emails/base.html
+            context: Per message variables, they override the base context
+            locale: Locale to render with, defaults to the current one
+
+        Returns:
+            str: Rendered template
+        """
+        if locale is not None:
+            with force_locale(locale):
+                return self.render(filename, context)
+
+        context = context or {}
+        layout = None
+
+        # Layouts have the base context baked in and go stale when templates are reloaded
+        if not self.auto_reload and not context.keys() & self.base_context.keys():
+            layout = self.get_layout(filename, str(get_locale() or ""))
+
+        if layout is None:
+            return self.env.get_template(filename).render({**self.base_context, **context})
+
+        return layout.render(context, self.autoescape(filename))
+
+    def get_layout(self, filename: str, locale: str):
+        """Memoized Layout of a template for a locale, None when it can not be memoized."""
+        key = (filename, locale)
+
+        if key in self.layouts:
+            return self.layouts[key]
+
+        with self.lock:
+            if key not in self.layouts:
+                self.layouts[key] = self.compile_layout(filename)
+
+        return self.layouts[key]
+
+    def compile_layout(self, filename: str):
+        """Renders a template with markers in place of the variables that are not part of the base context."""
+        source = self.env.loader.get_source(self.env, filename)[0]
+        ast = self.env.parse(source)
+
+        if any(isinstance(node, (nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport)) for node in ast.body):
+            return None
+
+        variables = meta.find_undeclared_variables(ast) - set(self.base_context) - set(self.env.globals)
+        if not printed_only(ast, variables):
+            return None
+
+        markers = {name: f"\x00{uuid.uuid4().hex}\x00" for name in variables}
+        output = self.env.get_template(filename).render(
+            {**self.base_context, **{name: Markup(marker) for name, marker in markers.items()}}
+        )
+
+        if not markers:
+            return Layout([output], [])
+
+        by_marker = {marker: name for name, marker in markers.items()}
+        chunks = re.split(f"({'|'.join(by_marker)})", output)
+
+        return Layout(chunks[::2], [by_marker[marker] for marker in chunks[1::2]])
+
+    def autoescape(self, filename: str) -> bool:
+        autoescape = self.env.autoescape
+        return autoescape(filename) if callable(autoescape) else bool(autoescape)
+
+    def cache_clear(self):
+        """Drop the memoized layouts, ie: after changing a template."""
+        with self.lock:
+            self.layouts = {}
+
+
+def printed_only(ast, variables: set) -> bool:
+    """True if the variables are only used as `{{ name }}` outside loops, conditions, macros or blocks."""
+    if not variables:
+        return True
+
+    printed = 0
+    for output in ast.body:
+        if isinstance(output, nodes.Output):
+            printed += sum(isinstance(node, nodes.Name) and node.name in variables for node in output.nodes)
+
+    return printed == sum(node.name in variables for node in ast.find_all(nodes.Name))
@@ -1,34 +1,217 @@
 # -*- coding: utf-8 -*-
 """Event Manager flask extension."""
 
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from threading import BoundedSemaphore, Lock
+from types import SimpleNamespace
+
+from celery import shared_task
+from flask import current_app
+
 EXTENSION_NAME = "event-manager"
 
+# Subscriber dispatch
+DISPATCH_SYNC = "sync"
+DISPATCH_ASYNC = "async"
+
+# Backends for async subscribers. "sync" runs everything inline, ie: for tests.
+MODE_SYNC = "sync"
+MODE_THREAD = "thread"
+MODE_CELERY = "celery"
+
 
 class EventManager(object):
-    """Event Manager."""
+    """Event Manager.
+
+    Subscribers are called inline unless they are subscribed with dispatch="async". Async
+    subscribers run on a bounded thread pool (EVENT_DISPATCH_MODE = "thread") or as a Celery
+    task (EVENT_DISPATCH_MODE = "celery") and receive a snapshot of the model's `event_fields`
+    instead of the model instance, so they never touch the request session from another thread.
+    """
 
     def __init__(self, app=None):
         self.subscribers = dict()
+        self.mode = MODE_THREAD
+        self.max_workers = 4
+        self.max_queue_size = 100
+        self.executor = None
+        self.executor_pid = None
+        self.slots = None
+        self.lock = Lock()
+        self.stats = dict()
+        self.queue_depth = 0
+        self.rejected = 0
 
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
         """Initialize the app."""
+        self.mode = app.config.get("EVENT_DISPATCH_MODE", MODE_THREAD)
+        self.max_workers = app.config.get("EVENT_MAX_WORKERS", 4)
+        self.max_queue_size = app.config.get("EVENT_MAX_QUEUE_SIZE", 100)
+
         app.extensions = getattr(app, "extensions", {})
         app.extensions[EXTENSION_NAME] = self
 
-    def subscribe(self, event_type: str, func):
+    def subscribe(self, event_type: str, func, dispatch: str = DISPATCH_SYNC):
         """Subscribe to an event."""
         if event_type not in self.subscribers:
             self.subscribers[event_type] = []
 
-        self.subscribers[event_type].append(func)
+        self.subscribers[event_type].append((func, dispatch))
 
     def post_event(self, event_type: str, data):
         """Post an event."""
         if event_type not in self.subscribers:
             return
 
-        for func in self.subscribers[event_type]:
+        shared_data = None
+
+        for func, dispatch in self.subscribers[event_type]:
+            if dispatch != DISPATCH_ASYNC or self.mode not in (MODE_THREAD, MODE_CELERY):
+                self.run(event_type, func, data, time.perf_counter())
+                continue
+
+            if shared_data is None:
+                shared_data = snapshot(data)
+
+            if self.mode == MODE_CELERY:
+                payload = vars(shared_data) if isinstance(shared_data, SimpleNamespace) else shared_data
+                dispatch_event.delay(event_type, f"{func.__module__}:{func.__qualname__}", payload, time.time())
+            else:
+                self.submit(event_type, func, shared_data)
+
+    def submit(self, event_type: str, func, data):
+        """Run a subscriber on the thread pool.
+
+        The number of queued and running subscribers is bounded by EVENT_MAX_QUEUE_SIZE, when
+        the pool is saturated the subscriber runs inline instead of piling up work.
+        """
+        executor = self.get_executor()
+        posted_at = time.perf_counter()
+
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            self.run(event_type, func, data, posted_at, propagate=False)
+            return
+
+        with self.lock:
+            self.queue_depth += 1
+
+        app = current_app._get_current_object()  # pylint: disable=protected-access
+
+        def task():
+            try:
+                with app.app_context():
+                    self.run(event_type, func, data, posted_at, propagate=False)
+            finally:
+                with self.lock:
+                    self.queue_depth -= 1
+                self.slots.release()
+
+        executor.submit(task)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool lazily, once per process (threads do not survive a fork)."""
+        if self.executor is None or self.executor_pid != os.getpid():
+            with self.lock:
+                if self.executor is None or self.executor_pid != os.getpid():
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="event")
+                    self.executor_pid = os.getpid()
+                    self.slots = BoundedSemaphore(self.max_queue_size)
+                    self.queue_depth = 0
+
+        return self.executor
+
+    def run(self, event_type: str, func, data, posted_at: float, propagate: bool = True):
+        """Call a subscriber and record its latency. Async subscribers errors are only logged."""
+        failed = False
+
+        try:
             func(data)
+        except Exception:  # pylint: disable=broad-except
+            failed = True
+            if propagate:
+                raise
+            current_app.logger.exception(f"Event subscriber {func.__qualname__} failed on {event_type}")
+        finally:
+            self.record(event_type, time.perf_counter() - posted_at, failed)
+
+    def record(self, event_type: str, latency: float, failed: bool = False):
+        """Record the latency of a subscriber call."""
+        with self.lock:
+            stats = self.stats.setdefault(event_type, {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total_time"] += latency
+            stats["max_time"] = max(stats["max_time"], latency)
+
+    def metrics(self) -> dict:
+        """Per event latency (seconds, from post to completion) and thread pool queue depth.
+
+        Celery dispatched subscribers are recorded by the worker process that ran them, their
+        latency includes the time spent in the broker queue."""
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "queue_depth": self.queue_depth,
+                "rejected": self.rejected,
+                "events": {
+                    event_type: {
+                        **stats,
+                        "avg_time": stats["total_time"] / stats["count"] if stats["count"] else 0.0,
+                    }
+                    for event_type, stats in self.stats.items()
+                },
+            }
+
+
+def snapshot(data):
+    """Copy the columns a model exposes to async subscribers into a namespace that can be shared
+    with other threads or serialized for Celery. Any other kind of data is returned as it is.
+
+    The columns are the ones named by the model's `event_fields` classmethod, only the primary
+    key when it has none: secrets such as password hashes or activation codes must not travel
+    through the broker and its result backend."""
+    table = getattr(data, "__table__", None)
+
+    if table is None:
+        return data
+
+    if hasattr(data, "event_fields"):
+        keys = data.event_fields()
+    else:
+        keys = [column.key for column in table.primary_key.columns]
+
+    values = {}
+    for key in keys:
+        value = getattr(data, key, None)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        values[key] = value
+
+    return SimpleNamespace(**values)
+
+
+@shared_task(name="event_manager.dispatch_event", ignore_result=True)
+def dispatch_event(event_type: str, func_path: str, data, posted_at: float = None):
+    """Celery task that runs an async subscriber, `posted_at` is the wall clock time of the post."""
+    module_name, func_name = func_path.split(":", 1)
+    func = getattr(importlib.import_module(module_name), func_name)
+
+    if isinstance(data, dict):
+        data = SimpleNamespace(**data)
+
+    event = current_app.extensions[EXTENSION_NAME]
+    # the latency is measured from the post in the web process, queue time included
+    queued = max(0.0, time.time() - posted_at) if posted_at is not None else 0.0
+    event.run(event_type, func, data, time.perf_counter() - queued, propagate=False)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Flask Health Checker."""
+
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from threading import Lock
+
+from flask import Flask
+from sqlalchemy import text
+
+EXTENSION_NAME = "flask-health-checker"
+
+STATUS_OK = "ok"
+STATUS_FAIL = "fail"
+STATUS_TIMEOUT = "timeout"
+
+logger = logging.getLogger(__name__)
+
+
+class HealthChecker(object):
+    """Health Checker.
+
+    Probes the database and the cache backends in parallel, each one bounded by
+    HEALTH_PROBE_TIMEOUT seconds. A probe still running from a previous check is not
+    started again, it keeps reporting a timeout until it returns, so a hung backend ties
+    up at most one thread per probe.
+
+    Reports are cached for HEALTH_CACHE_TTL seconds and concurrent callers wait for the
+    check in progress instead of starting their own, however often the orchestrator
+    polls, the backends see at most one probe per TTL and process. Failed probes listed
+    in HEALTH_OPTIONAL_PROBES are reported without making the instance unready.
+    """
+
+    def __init__(self, app: Flask = None, probes: dict = None):
+        self.app = None
+        self.probes = {}
+        self.optional = ()
+        self.timeout = 2.0
+        self.ttl = 5.0
+        self.started_at = time.time()
+
+        self.report = None
+        self.expires_at = 0.0
+        self.running = {}
+        self.executor = None
+        self.executor_pid = None
+        self.lock = Lock()
+
+        if app is not None:
+            self.init_app(app, probes)
+
+    def init_app(self, app: Flask, probes: dict):
+        """
+        Initialize the app with the dependencies to probe.
+
+        Args:
+            app (Flask): Flask app
+            probes (dict): name to a Flask-SQLAlchemy instance or a flask-caching Cache
+        """
+        self.app = app
+        self.probes = probes
+        self.optional = tuple(app.config.get("HEALTH_OPTIONAL_PROBES", ()))
+        self.timeout = app.config.get("HEALTH_PROBE_TIMEOUT", 2.0)
+        self.ttl = app.config.get("HEALTH_CACHE_TTL", 5.0)
+        self.report = None
+        self.expires_at = 0.0
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def check(self, use_cache: bool = True) -> dict:
+        """
+        Probes every dependency, or returns the cached report while it is fresh.
+
+        Returns:
+            dict: status ("ok" or "fail"), checked_at and the status, latency and error of each probe
+        """
+        if use_cache and time.monotonic() < self.expires_at:
+            return self.report
+
+        with self.lock:
+            # another thread may have refreshed the report while this one waited
+            if use_cache and time.monotonic() < self.expires_at:
+                return self.report
+
+            report = self.run()
+            self.report = report
+            self.expires_at = time.monotonic() + self.ttl
+
+        return report
+
+    def liveness(self) -> dict:
+        """The process serves requests. Dependencies are left to the readiness check."""
+        return {"status": STATUS_OK, "pid": os.getpid(), "uptime": round(time.time() - self.started_at, 3)}
+
+    def run(self) -> dict:
+        executor = self.get_executor()
+        started = {}
+        stuck = []
+
+        for name, target in self.probes.items():
+            future = self.running.get(name)
+
+            if future is None or future.done():
+                started[name] = self.running[name] = executor.submit(self.probe, target)
+            else:
+                stuck.append(name)
+
+        wait(started.values(), timeout=self.timeout)
+
+        checks = {}
+        for name in stuck:
+            checks[name] = {"status": STATUS_TIMEOUT, "latency_ms": None, "error": "previous probe still running"}
+
+        for name, future in started.items():
+            if not future.done():
+                checks[name] = {"status": STATUS_TIMEOUT, "latency_ms": None, "error": f"no answer in {self.timeout}s"}
+                continue
+
+            status, latency, error = future.result()
+            checks[name] = {"status": status, "latency_ms": round(latency * 1000, 3), "error": error}
+
+        failed = [name for name, check in checks.items() if check["status"] != STATUS_OK]
+        for name in failed:
+            logger.warning(f"Health probe {name} failed: {checks[name]['error']}")
+
+        return {
+            "status": STATUS_FAIL if set(failed) - set(self.optional) else STATUS_OK,
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "checks": checks,
+        }
+
+    def probe(self, target) -> tuple:
+        """Runs a probe in the app context, returns its status, latency in seconds and error."""
+        started = time.perf_counter()
+
+        try:
+            with self.app.app_context():
+                if hasattr(target, "engine"):
+                    self.probe_database(target)
+                else:
+                    self.probe_cache(target)
+        except Exception as error:  # pylint: disable=broad-except
+            return STATUS_FAIL, time.perf_counter() - started, f"{type(error).__name__}: {error}"
+
+        return STATUS_OK, time.perf_counter() - started, None
+
+    @staticmethod
+    def probe_database(db):
+        with db.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    @staticmethod
+    def probe_cache(cache):
+        # a key per process so concurrent workers do not read each other's value
+        key = f"health-check-{os.getpid()}"
+        value = uuid.uuid4().hex
+
+        cache.set(key, value, timeout=60)
+        if cache.get(key) != value:
+            raise RuntimeError("the value written was not read back")
+
+        cache.delete(key)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool lazily, once per process (threads do not survive a fork)."""
+        if self.executor is None or self.executor_pid != os.getpid():
+            self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.probes)), thread_name_prefix="health")
+            self.executor_pid = os.getpid()
+            self.running = {}
+
+        return self.executor
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Flask JSON Provider."""
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Datetimes are passed through to `default` so they keep the same format as the stdlib provider
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that uses orjson when it is installed.
+
+    The output matches the default provider: keys are sorted, datetimes are serialized as
+    RFC 822 strings and Decimals, UUIDs or dataclasses through Flask's default function.
+    Whenever orjson can not handle a value (ie: integers bigger than 64 bits) or a caller
+    asks for stdlib specific arguments, the stdlib encoder is used instead.
+    """
+
+    def __init__(self, app: Flask) -> None:
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get("JSON_USE_ORJSON", True)
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize data as JSON to a string."""
+        if not self.use_orjson or not kwargs.keys() <= {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+
+        option = ORJSON_OPTIONS
+
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Deserialize data as JSON from a string or bytes."""
+        if not self.use_orjson or kwargs:
+            return super().loads(s, **kwargs)
+
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return orjson.loads(s)
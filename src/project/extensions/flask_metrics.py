@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Flask Metrics."""
+
+import logging
+import os
+import time
+
+from flask import Flask, current_app, g, request
+
+from src.project.extensions.flask_activity_tracker import EXTENSION_NAME as ACTIVITY_EXTENSION
+from src.project.extensions.flask_api_keys import EXTENSION_NAME as API_KEYS_EXTENSION
+from src.project.extensions.flask_event_manager import EXTENSION_NAME as EVENT_EXTENSION
+from src.project.extensions.flask_near_cache import EXTENSION_NAME as NEAR_EXTENSION
+from src.project.extensions.flask_rate_limiter import EXTENSION_NAME as LIMITER_EXTENSION
+from src.project.extensions.flask_response_cache import EXTENSION_NAME as RESPONSES_EXTENSION
+from src.project.extensions.flask_schema_manager import EXTENSION_NAME as SCHEMA_EXTENSION
+from src.project.extensions.flask_token_blocklist import EXTENSION_NAME as BLOCKLIST_EXTENSION
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+EXTENSION_NAME = "flask-metrics"
+
+# Environment variable that switches prometheus_client to its multi-process mode, it must be
+# set before prometheus_client is imported (see src/config/gunicorn.py)
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Key of the request start time in `g`
+START_KEY = "metrics_start"
+
+# Label of the requests that matched no route, the raw paths would make the cardinality unbounded
+UNMATCHED = "<unmatched>"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics(object):
+    """Metrics.
+
+    Prometheus metrics of the API: request counters and latency histograms per route
+    template, error counters per status and error code, the in-flight requests and, at
+    most every METRICS_REFRESH_INTERVAL seconds, gauges of the database pool, the schema,
+    response and near caches, the token blocklist, the event manager, the activity
+    buffer, the api key checks and the rate limiter. They are exposed at `/metrics` in the
+    Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set (gunicorn), every worker writes its samples to
+    memory mapped files in that directory and a scrape served by any worker aggregates
+    the files of all of them. Otherwise the metrics of the current process are exposed.
+    """
+
+    def __init__(self, app: Flask = None, db=None):
+        self.db = None
+        self.enabled = False
+        self.multiprocess = False
+        self.refresh_interval = 5.0
+        self.refreshed_at = 0.0
+
+        self.registry = None
+        # label children by label values, `labels()` validates its arguments on every call
+        self.children = {}
+
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app: Flask, db):
+        """Initialize the app with the Flask-SQLAlchemy instance whose pool is reported."""
+        self.db = db
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.refresh_interval = app.config.get("METRICS_REFRESH_INTERVAL", 5.0)
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+        if self.enabled and prometheus_client is None:
+            logger.warning("prometheus-client is not installed, metrics are disabled")
+            self.enabled = False
+
+        if not self.enabled:
+            return
+
+        self.multiprocess = bool(os.environ.get(MULTIPROC_DIR_ENV))
+        self.create_metrics(app.config.get("METRICS_BUCKETS", DEFAULT_BUCKETS))
+
+        @app.before_request
+        def start_request():
+            g.setdefault(START_KEY, time.perf_counter_ns())
+            self.in_flight.inc()
+
+        @app.after_request
+        def count_request(response):
+            start = g.get(START_KEY)
+
+            if start is None:
+                return response
+
+            self.observe(response.status_code, (time.perf_counter_ns() - start) / 1e9)
+
+            if time.monotonic() - self.refreshed_at >= self.refresh_interval:
+                self.refresh()
+
+            return response
+
+        @app.teardown_request
+        def end_request(exception):  # pylint: disable=unused-argument
+            if g.pop(START_KEY, None) is not None:
+                self.in_flight.dec()
+
+    def create_metrics(self, buckets):
+        self.registry = prometheus_client.CollectorRegistry(auto_describe=True)
+        self.children = {}
+        self.refreshed_at = 0.0
+
+        def metric(cls, name, documentation, labels=(), **kwargs):
+            return cls(name, documentation, labels, registry=self.registry, **kwargs)
+
+        Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+
+        self.requests = metric(
+            Counter, "http_requests", "Requests by route and status", ("method", "endpoint", "status")
+        )
+        self.errors = metric(
+            Counter, "http_request_errors", "Error responses by error code", ("method", "endpoint", "status", "code")
+        )
+        self.latency = metric(
+            Histogram, "http_request_duration_seconds", "Request latency", ("method", "endpoint"), buckets=buckets
+        )
+        self.in_flight = metric(Gauge, "http_requests_in_flight", "Requests being served", multiprocess_mode="livesum")
+
+        # Gauges below mirror counters kept by other extensions, they are summed across live workers
+        self.db_pool = metric(
+            Gauge, "db_pool_connections", "Database pool connections", ("state",), multiprocess_mode="livesum"
+        )
+        self.cache_lookups = metric(
+            Gauge, "cache_lookups", "Cache lookups by result", ("cache", "result"), multiprocess_mode="livesum"
+        )
+        self.cache_hit_ratio = metric(
+            Gauge, "cache_hit_ratio", "Cache hit ratio per process", ("cache",), multiprocess_mode="liveall"
+        )
+        self.event_calls = metric(
+            Gauge, "event_subscriber_calls", "Async subscriber calls", ("event", "result"), multiprocess_mode="livesum"
+        )
+        self.event_queue = metric(Gauge, "event_queue_depth", "Queued async subscribers", multiprocess_mode="livesum")
+        self.activity_pending = metric(
+            Gauge, "activity_pending_rows", "Sign ins waiting for a flush", multiprocess_mode="livesum"
+        )
+        self.api_key_checks = metric(
+            Gauge, "api_key_checks", "Api key checks", ("result",), multiprocess_mode="livesum"
+        )
+        self.rate_limit_decisions = metric(
+            Gauge, "rate_limit_decisions", "Rate limited requests", ("result",), multiprocess_mode="livesum"
+        )
+
+    def observe(self, status_code: int, seconds: float):
+        """Counts a response of the current request."""
+        req = request._get_current_object()  # pylint: disable=protected-access
+        rule = req.url_rule
+        key = (req.method, rule.rule if rule is not None else UNMATCHED, status_code)
+
+        children = self.children.get(key)
+        if children is None:
+            method, endpoint, status = key
+            children = self.children[key] = (
+                self.requests.labels(method, endpoint, status),
+                self.latency.labels(method, endpoint),
+            )
+
+        children[0].inc()
+        children[1].observe(seconds)
+
+        if status_code >= 400:
+            code = g.get("error_code") or ""
+            self.errors.labels(key[0], key[1], status_code, code).inc()
+
+    def refresh(self):
+        """Copies the pool and cache statistics of this process to their gauges."""
+        self.refreshed_at = time.monotonic()
+        extensions = current_app.extensions
+
+        try:
+            pool = self.db.engine.pool
+            for state, attribute in (
+                ("size", "size"),
+                ("checked_in", "checkedin"),
+                ("checked_out", "checkedout"),
+                ("overflow", "overflow"),
+            ):
+                # SingletonThreadPool and NullPool (ie: SQLite) have no such counters, QueuePool's
+                # overflow is negative until the pool is full
+                if hasattr(pool, attribute):
+                    self.db_pool.labels(state).set(max(0, getattr(pool, attribute)()))
+
+            schema = extensions.get(SCHEMA_EXTENSION)
+            if schema is not None:
+                info = schema.cache_info()
+                self.set_cache("schema", info["hits"], info["misses"])
+
+            blocklist = extensions.get(BLOCKLIST_EXTENSION)
+            if blocklist is not None and blocklist.enabled:
+                self.set_cache("jwt_blocklist", blocklist.stats["local"], blocklist.stats["redis"])
+
+            responses = extensions.get(RESPONSES_EXTENSION)
+            if responses is not None and responses.enabled:
+                self.set_cache("responses", responses.stats["hits"], responses.stats["misses"])
+
+            near = extensions.get(NEAR_EXTENSION)
+            if near is not None:
+                self.set_cache("near", near.stats["local"] + near.stats["remote"], near.stats["misses"])
+
+            event = extensions.get(EVENT_EXTENSION)
+            if event is not None:
+                metrics = event.metrics()
+                self.event_queue.set(metrics["queue_depth"])
+                for event_type, stats in metrics["events"].items():
+                    self.event_calls.labels(event_type, "ok").set(stats["count"] - stats["errors"])
+                    self.event_calls.labels(event_type, "error").set(stats["errors"])
+
+            activity = extensions.get(ACTIVITY_EXTENSION)
+            if activity is not None:
+                self.activity_pending.set(activity.size())
+
+            apikeys = extensions.get(API_KEYS_EXTENSION)
+            if apikeys is not None:
+                for result in ("accepted", "rejected"):
+                    self.api_key_checks.labels(result).set(apikeys.stats[result])
+
+            limiter = extensions.get(LIMITER_EXTENSION)
+            if limiter is not None and limiter.enabled:
+                for result in ("allowed", "rejected", "shed"):
+                    self.rate_limit_decisions.labels(result).set(limiter.stats[result])
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Metrics refresh failed")
+
+    def set_cache(self, cache: str, hits: int, misses: int):
+        self.cache_lookups.labels(cache, "hit").set(hits)
+        self.cache_lookups.labels(cache, "miss").set(misses)
+        self.cache_hit_ratio.labels(cache).set(hits / (hits + misses) if hits + misses else 0.0)
+
+    def render(self) -> tuple:
+        """
+        Metrics in the Prometheus text format.
+
+        Returns:
+            tuple: body and content type
+        """
+        if not self.enabled:
+            return b"", "text/plain"
+
+        self.refresh()
+
+        if self.multiprocess:
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self.registry
+
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Flask Near Cache."""
+
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import Flask
+
+from src.project.extensions.flask_response_cache import tag_name
+
+EXTENSION_NAME = "flask-near-cache"
+
+logger = logging.getLogger(__name__)
+
+
+class NearCache(object):
+    """Near Cache.
+
+    Two level cache for hot reference data: a per process LRU of NEAR_CACHE_MAXSIZE
+    entries living NEAR_CACHE_LOCAL_TTL seconds in front of the response cache's Redis
+    backend (NEAR_CACHE_TIMEOUT seconds).
+
+    Entries are stamped with the versions of their model tags, the same tags the response
+    cache bumps when a session writing those models commits. Each process rereads the
+    versions of a tag at most every NEAR_CACHE_CHECK_INTERVAL seconds, so a write made by
+    another worker is seen within that interval and one made by this process immediately.
+    When Redis is unreachable values are built on every call.
+
+    Values are shared by every caller of the process and must not be mutated, ORM
+    instances are stored detached (see `detached`) and merged into the caller's session.
+    """
+
+    def __init__(self, app: Flask = None, responses=None):
+        self.responses = None
+        self.maxsize = 1024
+        self.local_ttl = 60.0
+        self.timeout = 3600
+        self.check_interval = 1.0
+
+        self.entries = OrderedDict()
+        self.tag_versions = {}
+        self.lock = Lock()
+        # Approximate counters, they are not locked to keep the lookups cheap
+        self.stats = {"local": 0, "remote": 0, "misses": 0, "errors": 0}
+
+        if app is not None:
+            self.init_app(app, responses)
+
+    def init_app(self, app: Flask, responses):
+        """Initialize the app with the response cache providing the Redis backend and the tag versions."""
+        self.responses = responses
+        self.maxsize = app.config.get("NEAR_CACHE_MAXSIZE", 1024)
+        self.local_ttl = app.config.get("NEAR_CACHE_LOCAL_TTL", 60.0)
+        self.timeout = app.config.get("NEAR_CACHE_TIMEOUT", 3600)
+        self.check_interval = app.config.get("NEAR_CACHE_CHECK_INTERVAL", 1.0)
+        self.cache_clear()
+
+        if self.forget_tags not in responses.invalidation_callbacks:
+            responses.invalidation_callbacks.append(self.forget_tags)
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def get_or_set(self, key: str, builder, tags: tuple = ()):
+        """
+        Returns the cached value of a key, building and storing it on a miss.
+
+        Args:
+            key (str): key, unique for the value
+            builder (callable): builds the value from the database
+            tags (tuple): models (or tag names) the value is built from, writes to them invalidate it
+        """
+        names = tuple(tag_name(tag) for tag in tags)
+        self.responses.tagged.update(names)
+
+        try:
+            versions = self.versions(names)
+        except Exception as error:  # pylint: disable=broad-except
+            self.stats["errors"] += 1
+            logger.warning(f"Near cache unavailable: {error}")
+            return builder()
+
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == versions and entry[2] > now:
+                self.entries.move_to_end(key)
+                self.stats["local"] += 1
+                return entry[0]
+
+        remote_key = f"near:{key}:{'.'.join(versions)}"
+
+        try:
+            value = self.responses.cache.get(remote_key)
+        except Exception:  # pylint: disable=broad-except
+            self.stats["errors"] += 1
+            value = None
+
+        if value is not None:
+            self.stats["remote"] += 1
+        else:
+            self.stats["misses"] += 1
+            value = builder()
+
+            if value is None:
+                return None
+
+            try:
+                self.responses.cache.set(remote_key, value, timeout=self.timeout)
+            except Exception:  # pylint: disable=broad-except
+                self.stats["errors"] += 1
+
+        with self.lock:
+            self.entries[key] = (value, versions, now + self.local_ttl)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def versions(self, tags: tuple) -> list:
+        """Versions of the tags, read from Redis at most every NEAR_CACHE_CHECK_INTERVAL seconds."""
+        now = time.monotonic()
+        known = [self.tag_versions.get(tag) for tag in tags]
+
+        if all(item is not None and item[1] > now for item in known):
+            return [item[0] for item in known]
+
+        versions = self.responses.versions(tags)
+
+        for tag, version in zip(tags, versions):
+            self.tag_versions[tag] = (version, now + self.check_interval)
+
+        return versions
+
+    def forget_tags(self, *tags):
+        """Forgets the versions of invalidated tags so this process reads the new ones right away."""
+        for tag in tags:
+            self.tag_versions.pop(tag, None)
+
+    def metrics(self) -> dict:
+        """Lookups answered by the process LRU, by Redis and built from the database."""
+        return {**self.stats, "size": len(self.entries), "maxsize": self.maxsize}
+
+    def cache_clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tag_versions.clear()
+
+
+def detached(instance):
+    """
+    A copy of an ORM instance that belongs to no session, safe to share between requests.
+    Use `db.session.merge(copy, load=False)` to get an instance of the current session without a query.
+    """
+    if instance is None:
+        return None
+
+    return pickle.loads(pickle.dumps(instance))
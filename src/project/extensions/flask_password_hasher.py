@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Flask Password Hasher."""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.project.exceptions import CustomException
+
+try:
+    import argon2
+except ImportError:  # pragma: no cover
+    argon2 = None
+
+EXTENSION_NAME = "flask-password-hasher"
+
+SCHEME_PBKDF2 = "pbkdf2"
+SCHEME_SCRYPT = "scrypt"
+SCHEME_ARGON2 = "argon2"
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher(object):
+    """Password Hasher.
+
+    Hashes passwords with the PASSWORD_HASHER scheme (pbkdf2, scrypt or argon2 when
+    argon2-cffi is installed) and its PASSWORD_* cost settings, and verifies hashes of
+    any of them, so the scheme or the costs can be changed per deployment and
+    `needs_rehash` tells which stored hashes are outdated.
+
+    With PASSWORD_HASH_WORKERS > 0 hashing and verification run on a bounded thread pool
+    (the three schemes release the GIL). A caller waits up to PASSWORD_HASH_TIMEOUT
+    seconds for a slot, then gets a 503 instead of piling up CPU bound work.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.scheme = SCHEME_SCRYPT
+        self.method = "scrypt:32768:8:1"
+        self.argon2 = None
+        self.workers = 0
+        self.queue_size = 0
+        self.timeout = 5
+
+        self.executor = None
+        self.executor_pid = None
+        self.slots = None
+        self.lock = Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the app."""
+        self.scheme = app.config.get("PASSWORD_HASHER", SCHEME_SCRYPT)
+
+        if self.scheme == SCHEME_ARGON2 and argon2 is None:
+            logger.warning("argon2-cffi is not installed, passwords are hashed with scrypt")
+            self.scheme = SCHEME_SCRYPT
+
+        if self.scheme == SCHEME_PBKDF2:
+            self.method = f"pbkdf2:sha256:{app.config.get('PASSWORD_PBKDF2_ITERATIONS', 600000)}"
+        elif self.scheme == SCHEME_SCRYPT:
+            self.method = "scrypt:{}:{}:{}".format(
+                app.config.get("PASSWORD_SCRYPT_N", 32768),
+                app.config.get("PASSWORD_SCRYPT_R", 8),
+                app.config.get("PASSWORD_SCRYPT_P", 1),
+            )
+        elif self.scheme == SCHEME_ARGON2:
+            self.method = SCHEME_ARGON2
+            self.argon2 = argon2.PasswordHasher(
+                time_cost=app.config.get("PASSWORD_ARGON2_TIME_COST", 3),
+                memory_cost=app.config.get("PASSWORD_ARGON2_MEMORY_COST", 65536),
+                parallelism=app.config.get("PASSWORD_ARGON2_PARALLELISM", 4),
+            )
+        else:
+            raise ValueError(f"Unknown PASSWORD_HASHER {self.scheme}")
+
+        if argon2 is not None and self.argon2 is None:
+            self.argon2 = argon2.PasswordHasher()
+
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", 0)
+        self.queue_size = app.config.get("PASSWORD_HASH_QUEUE_SIZE", 64)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 5)
+        self.executor = None
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def hash(self, password: str) -> str:
+        """Hashes a password with the configured scheme."""
+        return self.run(self.hash_sync, password)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Checks a password against a hash of any supported scheme."""
+        if not pwhash or password is None:
+            return False
+
+        return self.run(self.verify_sync, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True if the hash was not made with the configured scheme and costs."""
+        if not pwhash:
+            return False
+
+        if pwhash.startswith("$argon2"):
+            return self.scheme != SCHEME_ARGON2 or self.argon2.check_needs_rehash(pwhash)
+
+        return pwhash.split("$", 1)[0] != self.method
+
+    def hash_sync(self, password: str) -> str:
+        if self.scheme == SCHEME_ARGON2:
+            return self.argon2.hash(password)
+
+        return generate_password_hash(password, method=self.method)
+
+    def verify_sync(self, pwhash: str, password: str) -> bool:
+        if not pwhash.startswith("$argon2"):
+            return check_password_hash(pwhash, password)
+
+        if self.argon2 is None:
+            logger.error("An argon2 hash can not be verified, argon2-cffi is not installed")
+            return False
+
+        try:
+            return self.argon2.verify(pwhash, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+
+    def run(self, func, *args):
+        """Runs a hashing function on the pool, or inline when the pool is disabled."""
+        if not self.workers:
+            return func(*args)
+
+        executor = self.get_executor()
+
+        if not self.slots.acquire(timeout=self.timeout):
+            raise CustomException("Server busy, try again later", "PasswordHasherBusyError", 503)
+
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool lazily, once per process (threads do not survive a fork)."""
+        if self.executor is None or self.executor_pid != os.getpid():
+            with self.lock:
+                if self.executor is None or self.executor_pid != os.getpid():
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+                    self.executor_pid = os.getpid()
+                    self.slots = BoundedSemaphore(self.workers + self.queue_size)
+
+        return self.executor
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Flask Query Tracker."""
+
+import time
+from collections import Counter
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+EXTENSION_NAME = "flask-query-tracker"
+
+# Key of the per request statistics in `g`, also read by the FlaskApi access log
+STATS_KEY = "sql_stats"
+
+# Characters of a statement kept in the logs
+STATEMENT_LENGTH = 300
+
+
+class QueryStats:
+    """SQL statements executed during a request."""
+
+    __slots__ = ("count", "total_ns", "slowest_ns", "slowest", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.slowest_ns = 0
+        self.slowest = None
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed_ns: int):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.statements[statement] += 1
+
+        if elapsed_ns > self.slowest_ns:
+            self.slowest_ns = elapsed_ns
+            self.slowest = statement
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_ns / 1_000_000
+
+    def repeated(self, threshold: int) -> list:
+        """Statements executed at least `threshold` times, ie: lazy loads in a loop."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def to_dict(self) -> dict:
+        return {
+            "db_queries": self.count,
+            "db_ms": round(self.total_ms, 3),
+            "db_slowest_ms": round(self.slowest_ns / 1_000_000, 3),
+            "db_slowest": self.slowest[:STATEMENT_LENGTH] if self.slowest else None,
+        }
+
+
+class QueryTracker(object):
+    """Query Tracker.
+
+    Counts and times the SQL statements of each request with engine events and stores a
+    QueryStats in `g`. The totals are sent in a `Server-Timing: db` header and added to
+    the structured access log. Statements repeated SQL_N_PLUS_ONE_THRESHOLD times or more
+    in one request are logged as a possible N+1.
+    """
+
+    def __init__(self, app: Flask = None):
+        self.enabled = False
+        self.server_timing = True
+        self.threshold = 10
+        self.listening = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize the app."""
+        self.enabled = app.config.get("SQL_TRACKING", True)
+        self.server_timing = app.config.get("SQL_SERVER_TIMING", True)
+        self.threshold = app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 10)
+
+        if self.enabled and not self.listening:
+            event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+            event.listen(Engine, "handle_error", self.handle_error)
+            self.listening = True
+
+        @app.after_request
+        def add_query_stats(response):
+            stats = g.get(STATS_KEY)
+
+            if stats is None:
+                return response
+
+            if self.server_timing:
+                response.headers.add(
+                    "Server-Timing", f'db;dur={stats.total_ms:.3f};desc="{stats.count} queries"'
+                )
+
+            if self.threshold:
+                for statement, count in stats.repeated(self.threshold):
+                    current_app.logger.warning(
+                        f"Possible N+1 on {request.method} {request.path}: statement executed {count} times: "
+                        f"{statement[:STATEMENT_LENGTH]}"
+                    )
+
+            return response
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and has_request_context():
+            conn.info.setdefault("query_tracker_start", []).append(time.perf_counter_ns())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_tracker_start")
+
+        if not starts:
+            return
+
+        elapsed = time.perf_counter_ns() - starts.pop()
+
+        if not has_request_context():
+            return
+
+        stats = g.get(STATS_KEY)
+        if stats is None:
+            stats = QueryStats()
+            setattr(g, STATS_KEY, stats)
+
+        stats.record(statement, elapsed)
+
+    @staticmethod
+    def handle_error(exception_context):
+        """A failed statement never reaches after_cursor_execute, drop its start time."""
+        connection = exception_context.connection
+        starts = connection.info.get("query_tracker_start") if connection is not None else None
+
+        if starts:
+            starts.pop()
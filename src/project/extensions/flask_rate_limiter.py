@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""Flask Rate Limiter."""
+
+import hashlib
+import logging
+import math
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import Flask, g, request
+
+from src.project.exceptions import CustomException
+from src.project.helpers.utils import get_ip_address
+
+EXTENSION_NAME = "flask-rate-limiter"
+
+# Key of the decision of the current request in `g`, turned into headers after the request
+DECISION_KEY = "rate_limit"
+
+# Sliding window counters of several limits, checked and incremented atomically.
+# KEYS: the current and previous window counters of each limit.
+# ARGV: the cost, then the limit, the window and the seconds elapsed in the current window of each limit.
+# Returns 1 (allowed) or 0, then the current and previous counts of each limit. Nothing is counted
+# when a limit is exceeded, rejected requests do not extend the block.
+SLIDING_WINDOW_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local counts = {}
+local allowed = 1
+
+for i = 1, #KEYS / 2 do
+    local current = tonumber(redis.call("GET", KEYS[2 * i - 1]) or "0")
+    local previous = tonumber(redis.call("GET", KEYS[2 * i]) or "0")
+    local limit = tonumber(ARGV[3 * i - 1])
+    local window = tonumber(ARGV[3 * i])
+    local elapsed = tonumber(ARGV[3 * i + 1])
+
+    if previous * (window - elapsed) / window + current + cost > limit then
+        allowed = 0
+    end
+
+    counts[2 * i] = current
+    counts[2 * i + 1] = previous
+end
+
+if allowed == 1 then
+    for i = 1, #KEYS / 2 do
+        counts[2 * i] = redis.call("INCRBY", KEYS[2 * i - 1], cost)
+        redis.call("EXPIRE", KEYS[2 * i - 1], 2 * tonumber(ARGV[3 * i]))
+    end
+end
+
+counts[1] = allowed
+return counts
+"""
+
+# A limit of a request: `limit` requests per `window` seconds for the value of a keyer
+Limit = namedtuple("Limit", ("scope", "keyer", "value", "limit", "window"))
+
+# Outcome of the most restrictive limit of a request
+Decision = namedtuple("Decision", ("allowed", "limit", "remaining", "reset"))
+
+logger = logging.getLogger(__name__)
+
+
+def by_ip():
+    """The client address, X-Forwarded-For only counts through the trusted proxies (PROXY_FIX_X_FOR)."""
+    return get_ip_address()
+
+
+def by_email():
+    """The email of the JSON payload, hashed so no address is stored in Redis."""
+    payload = request.get_json(silent=True)
+    email = payload.get("email") if isinstance(payload, dict) else None
+
+    if not isinstance(email, str) or not email.strip():
+        return None
+
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=16).hexdigest()
+
+
+def by_api_key():
+    """The id of the key checked by requires_api_key, or the digest of the presented key."""
+    identity = g.get("api_key")
+    if identity is not None:
+        return str(identity.id)
+
+    key = request.headers.get("X_API_KEY")
+    return hashlib.sha256(key.encode()).hexdigest() if key else None
+
+
+KEYERS = {"ip": by_ip, "email": by_email, "api_key": by_api_key}
+
+
+class RateLimiter(object):
+    """Rate Limiter.
+
+    `limit` throttles a view with sliding window counters stored in Redis (the rediscache
+    backend): the count of a window is the count of the current fixed window plus the
+    previous one weighted by the part of it still inside the window. Every limit of a
+    request (ie: per IP, per email and per API key) is checked and incremented by one Lua
+    script, in a single round trip.
+
+    Each process also counts the requests it let through. Those counts never exceed the
+    shared ones, so a key over its limit locally is rejected without asking Redis, and a
+    key Redis rejected stays rejected locally until it can be retried. Floods coming to a
+    worker are shed from memory (RATE_LIMIT_LOCAL = False always asks Redis).
+
+    Responses carry RateLimit-Limit, RateLimit-Remaining and RateLimit-Reset headers of
+    the most restrictive limit, rejected ones get a 429 with Retry-After. When Redis is
+    unreachable requests are only checked against the local counts.
+    """
+
+    def __init__(self, app: Flask = None, cache=None):
+        self.cache = None
+        self.enabled = True
+        self.local_enabled = True
+        self.limits = {}
+        self.local_maxsize = 100_000
+        self.script = None
+
+        self.local = {}
+        self.blocked = {}
+        # Approximate counters, they are not locked to keep the checks cheap
+        self.stats = {"allowed": 0, "rejected": 0, "shed": 0, "errors": 0}
+
+        if app is not None:
+            self.init_app(app, cache)
+
+    def init_app(self, app: Flask, cache):
+        """Initialize the app with the flask-caching Redis cache storing the counters."""
+        self.cache = cache
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+        self.local_enabled = app.config.get("RATE_LIMIT_LOCAL", True)
+        self.limits = app.config.get("RATE_LIMITS", {})
+        self.local_maxsize = app.config.get("RATE_LIMIT_LOCAL_MAXSIZE", 100_000)
+        self.script = None
+        self.cache_clear()
+
+        @app.after_request
+        def after_request(response):
+            return self.set_headers(response)
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def limit(self, scope: str, **defaults):
+        """
+        Throttles a view.
+
+        Args:
+            scope (str): name of the counters, RATE_LIMITS[scope] overrides the defaults
+            defaults: (requests, seconds) per keyer, ie: ip=(20, 60), email=(5, 300)
+        """
+        for keyer in defaults:
+            if keyer not in KEYERS:
+                raise ValueError(f"Unknown rate limit keyer {keyer}, use one of {', '.join(KEYERS)}")
+
+        def decorator(view):
+            @wraps(view)
+            def decorated(*args, **kwargs):
+                if self.enabled:
+                    self.check(scope, defaults)
+
+                return view(*args, **kwargs)
+
+            return decorated
+
+        return decorator
+
+    def check(self, scope: str, defaults: dict, cost: int = 1) -> Decision:
+        """Counts a request against the limits of a scope, raises a 429 when one of them is exceeded."""
+        limits = self.resolve(scope, defaults)
+
+        if not limits:
+            return None
+
+        now = time.time()
+        decision = self.precheck(limits, now, cost) if self.local_enabled else None
+
+        if decision is not None:
+            self.stats["shed"] += 1
+        else:
+            decision = self.consume(limits, now, cost)
+            self.stats["allowed" if decision.allowed else "rejected"] += 1
+
+        g.setdefault(DECISION_KEY, []).append(decision)
+
+        if not decision.allowed:
+            raise CustomException("Too many requests", code="TooManyRequests", status_code=429)
+
+        return decision
+
+    def resolve(self, scope: str, defaults: dict) -> list:
+        configured = {**defaults, **self.limits.get(scope, {})}
+        limits = []
+
+        for keyer, (requests, window) in configured.items():
+            value = KEYERS[keyer]()
+            if value is not None:
+                limits.append(Limit(scope, keyer, value, requests, window))
+
+        return limits
+
+    def precheck(self, limits: list, now: float, cost: int):
+        """Rejects from the local counts, or returns None when Redis must decide."""
+        monotonic = time.monotonic()
+
+        for item in limits:
+            key = self.key(item)
+            until = self.blocked.get(key)
+
+            if until is not None:
+                if until > monotonic:
+                    return Decision(False, item.limit, 0, until - monotonic)
+                self.blocked.pop(key, None)
+
+            counts = self.local.get(key)
+
+            if counts is not None:
+                elapsed = now % item.window
+                current, previous = local_counts(counts, int(now // item.window))
+                if estimate(current, previous, item.window, elapsed) + cost > item.limit:
+                    return Decision(False, item.limit, 0, retry_after(current, previous, item, elapsed, cost))
+
+        return None
+
+    def consume(self, limits: list, now: float, cost: int) -> Decision:
+        """Checks and counts the request in Redis, or only locally when Redis is unreachable."""
+        windows = [(int(now // item.window), round(now % item.window, 3)) for item in limits]
+        keys = []
+        args = [cost]
+
+        for item, (index, elapsed) in zip(limits, windows):
+            key = self.key(item)
+            keys += [f"{key}:{index}", f"{key}:{index - 1}"]
+            args += [item.limit, item.window, f"{elapsed:.3f}"]
+
+        try:
+            reply = self.get_script()(keys=keys, args=args)
+        except Exception as error:  # pylint: disable=broad-except
+            self.stats["errors"] += 1
+            logger.warning(f"Rate limiter unavailable: {error}")
+
+            for item, (index, _) in zip(limits, windows):
+                self.count_locally(self.key(item), index, cost)
+
+            return Decision(True, min(item.limit for item in limits), None, None)
+
+        allowed = bool(reply[0])
+        decisions = []
+
+        for position, (item, (index, elapsed)) in enumerate(zip(limits, windows)):
+            current, previous = int(reply[2 * position + 1]), int(reply[2 * position + 2])
+            key = self.key(item)
+
+            if allowed:
+                self.count_locally(key, index, cost)
+                remaining = max(0, math.floor(item.limit - estimate(current, previous, item.window, elapsed)))
+                decisions.append(Decision(True, item.limit, remaining, item.window - elapsed))
+
+            elif estimate(current, previous, item.window, elapsed) + cost > item.limit:
+                reset = retry_after(current, previous, item, elapsed, cost)
+                self.block(key, reset)
+                decisions.append(Decision(False, item.limit, 0, reset))
+
+        if allowed:
+            return min(decisions, key=lambda decision: decision.remaining)
+
+        # the rejecting limit with the longest wait
+        return max(decisions, key=lambda decision: decision.reset, default=Decision(False, limits[0].limit, 0, 1.0))
+
+    def block(self, key: str, seconds: float):
+        """Rejects a key locally until it can be retried."""
+        if len(self.blocked) >= self.local_maxsize:
+            self.blocked = {}
+
+        self.blocked[key] = time.monotonic() + seconds
+
+    def count_locally(self, key: str, index: int, cost: int):
+        """Adds a request let through by Redis to the local counts, lost updates only make them lower."""
+        counts = self.local.get(key)
+
+        if counts is None:
+            if len(self.local) >= self.local_maxsize:
+                self.local = {}
+            self.local[key] = [index, cost, 0]
+            return
+
+        current, previous = local_counts(counts, index)
+        counts[:] = [index, current + cost, previous]
+
+    def get_script(self):
+        client = self.cache.cache._write_client  # pylint: disable=protected-access
+
+        if self.script is None or self.script.registered_client is not client:
+            self.script = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+        return self.script
+
+    def key(self, item: Limit) -> str:
+        return f"{self.cache.cache.key_prefix}rate:{item.scope}:{item.keyer}:{item.value}"
+
+    @staticmethod
+    def set_headers(response):
+        """RateLimit-* headers of the most restrictive limit checked by the request."""
+        decisions = g.get(DECISION_KEY)
+
+        if not decisions:
+            return response
+
+        rejected = [decision for decision in decisions if not decision.allowed]
+        decision = rejected[0] if rejected else min(decisions, key=lambda item: item.remaining or 0)
+
+        response.headers["RateLimit-Limit"] = str(decision.limit)
+
+        if decision.remaining is not None:
+            response.headers["RateLimit-Remaining"] = str(decision.remaining)
+            response.headers["RateLimit-Reset"] = str(math.ceil(decision.reset))
+
+        if not decision.allowed:
+            response.headers["Retry-After"] = str(math.ceil(decision.reset))
+
+        return response
+
+    def metrics(self) -> dict:
+        """Requests let through, rejected by Redis and shed locally."""
+        return {**self.stats, "local_keys": len(self.local), "blocked_keys": len(self.blocked)}
+
+    def cache_clear(self) -> None:
+        self.local = {}
+        self.blocked = {}
+
+
+def local_counts(counts: list, index: int) -> tuple:
+    """Current and previous window counts of a local entry at a window index."""
+    if counts[0] == index:
+        return counts[1], counts[2]
+    if counts[0] == index - 1:
+        return 0, counts[1]
+    return 0, 0
+
+
+def estimate(current: int, previous: int, window: float, elapsed: float) -> float:
+    """Requests in the sliding window ending now."""
+    return previous * (window - elapsed) / window + current
+
+
+def retry_after(current: int, previous: int, item: Limit, elapsed: float, cost: int) -> float:
+    """Seconds until the sliding window has room for `cost` requests, if no other request is counted."""
+    room = item.limit - cost
+
+    if room < 0:
+        return float(item.window)
+
+    if current <= room:
+        # the previous window has to slide out enough
+        return max(0.0, item.window * (1 - (room - current) / previous) - elapsed) if previous else 0.0
+
+    # the current window becomes the previous one
+    return item.window - elapsed + item.window * (1 - room / current)
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Flask Response Cache."""
+
+import hashlib
+import logging
+import time
+import uuid
+from functools import wraps
+from threading import Event, Lock
+
+from flask import Flask, Response, current_app, request
+from flask_babel import get_locale
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+
+EXTENSION_NAME = "flask-response-cache"
+
+# Tags of the instances flushed by a session, invalidated when it commits
+SESSION_TAGS_KEY = "response_cache_tags"
+
+# Headers stored with a cached response
+CACHED_HEADERS = ("Content-Type", "Content-Language")
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(object):
+    """Response Cache.
+
+    `cached` stores the successful responses of a read endpoint. The key is built from
+    the route, its view arguments, the sorted query args, the JWT identity and the locale.
+    Each entry is tagged with the models it was built from. A tag has a version stored in
+    the cache and the versions are part of the entry key, so invalidating a tag only
+    changes its version and the old entries become unreachable until they expire.
+
+    The tags of the models written by a session (BaseService.post/put/patch/delete or any
+    other flush) are invalidated when that session commits and dropped on rollback.
+    `?skip_cache` bypasses the cache.
+
+    Misses are single-flight: concurrent requests for the same key in a process wait for
+    the one building the response, and across processes a lock in the cache makes them
+    poll for RESPONSE_CACHE_LOCK_TIMEOUT seconds before building it themselves. Cache
+    errors never fail a request, the view is called instead.
+    """
+
+    def __init__(self, app: Flask = None, cache=None, db=None):
+        self.cache = None
+        self.enabled = True
+        self.default_timeout = 60
+        self.lock_timeout = 5.0
+        self.poll_interval = 0.05
+        self.tagged = set()
+        self.listening = False
+        # Called with the tag names after an invalidation, ie: by the near cache of this process
+        self.invalidation_callbacks = []
+
+        self.inflight = {}
+        self.lock = Lock()
+        # Approximate counters, they are not locked to keep the lookups cheap
+        self.stats = {"hits": 0, "misses": 0, "bypass": 0, "errors": 0, "invalidations": 0}
+
+        if app is not None:
+            self.init_app(app, cache, db)
+
+    def init_app(self, app: Flask, cache, db):
+        """Initialize the app with the flask-caching instance storing the entries and the db to watch."""
+        self.cache = cache
+        self.enabled = app.config.get("RESPONSE_CACHE_ENABLED", True)
+        self.default_timeout = app.config.get("RESPONSE_CACHE_TIMEOUT", 60)
+        self.lock_timeout = app.config.get("RESPONSE_CACHE_LOCK_TIMEOUT", 5.0)
+
+        if not self.listening:
+            event.listen(db.session, "after_flush", self.after_flush)
+            event.listen(db.session, "after_commit", self.after_commit)
+            event.listen(db.session, "after_rollback", self.after_rollback)
+            self.listening = True
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    def cached(self, tags: tuple = (), timeout: int = None, per_identity: bool = True):
+        """
+        Caches the successful responses of a view.
+
+        Args:
+            tags (tuple): models (or tag names) the response is built from
+            timeout (int, optional): seconds. Defaults to RESPONSE_CACHE_TIMEOUT.
+            per_identity (bool, optional): one entry per JWT identity. Defaults to True.
+        """
+        names = tuple(tag_name(tag) for tag in tags)
+        self.tagged.update(names)
+
+        def decorator(view):
+            @wraps(view)
+            def decorated(*args, **kwargs):
+                if not self.enabled or request.method != "GET":
+                    return view(*args, **kwargs)
+
+                if "skip_cache" in request.args:
+                    self.stats["bypass"] += 1
+                    return mark(current_app.make_response(view(*args, **kwargs)), "BYPASS")
+
+                try:
+                    key = self.make_key(names, per_identity)
+                    entry = self.cache.get(key)
+                except Exception as error:  # pylint: disable=broad-except
+                    self.stats["errors"] += 1
+                    logger.warning(f"Response cache unavailable: {error}")
+                    return view(*args, **kwargs)
+
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    return mark(restore(entry), "HIT")
+
+                result = self.single_flight(key, lambda: current_app.make_response(view(*args, **kwargs)), timeout)
+
+                if isinstance(result, Response):
+                    self.stats["misses"] += 1
+                    return mark(result, "MISS")
+
+                # another request built the entry while this one waited
+                self.stats["hits"] += 1
+                return mark(restore(result), "HIT")
+
+            return decorated
+
+        return decorator
+
+    def make_key(self, tags: tuple, per_identity: bool) -> str:
+        """Entry key: a hash of the request and the current version of every tag."""
+        rule = request.url_rule
+        args = sorted((name, value) for name, value in request.args.items(multi=True) if name != "skip_cache")
+        identity = None
+
+        if per_identity:
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:  # the view is not protected by jwt_required
+                identity = None
+
+        route = rule.rule if rule else request.path
+        parts = (route, sorted((request.view_args or {}).items()), args, identity, str(get_locale()))
+        digest = hashlib.sha1(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+        return f"response:{digest}:{'.'.join(self.versions(tags))}"
+
+    def versions(self, tags: tuple) -> list:
+        """
+        Current version of each tag. A missing version (never set or evicted) gets a new random one,
+        so an eviction can never make old entries reachable again.
+        """
+        if not tags:
+            return []
+
+        keys = [f"tag:{tag}" for tag in tags]
+        versions = list(self.cache.get_many(*keys))
+
+        for index, version in enumerate(versions):
+            if version is None:
+                self.cache.add(keys[index], uuid.uuid4().hex[:12], timeout=0)
+                versions[index] = self.cache.get(keys[index])
+
+        return [str(version) for version in versions]
+
+    def single_flight(self, key: str, build, timeout: int = None):
+        """
+        Builds and stores a response once per key.
+
+        Returns:
+            Response built by this request, or the entry stored by another one
+        """
+        with self.lock:
+            waiter = self.inflight.get(key)
+            if waiter is None:
+                self.inflight[key] = Event()
+
+        if waiter is not None:
+            waiter.wait(self.lock_timeout)
+            entry = self.safe_get(key)
+            return entry if entry is not None else build()
+
+        try:
+            return self.build_locked(key, build, timeout)
+        finally:
+            with self.lock:
+                self.inflight.pop(key).set()
+
+    def build_locked(self, key: str, build, timeout: int = None):
+        """Builds the response holding the cross process lock, or waits for the holder's entry."""
+        lock_key = f"{key}:lock"
+
+        try:
+            locked = self.cache.add(lock_key, 1, timeout=max(1, int(self.lock_timeout)))
+        except Exception:  # pylint: disable=broad-except
+            # the cache is unreachable, build without the lock
+            locked = None
+
+        if locked is False:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                entry = self.safe_get(key)
+                if entry is not None:
+                    return entry
+
+        try:
+            response = build()
+
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers]
+                entry = (response.status_code, headers, response.get_data())
+                self.safe_set(key, entry, timeout if timeout is not None else self.default_timeout)
+
+            return response
+        finally:
+            if locked:
+                self.safe_delete(lock_key)
+
+    def invalidate(self, *tags):
+        """Invalidates every entry tagged with one of the models or tag names."""
+        for tag in tags:
+            try:
+                self.cache.set(f"tag:{tag_name(tag)}", uuid.uuid4().hex[:12], timeout=0)
+                self.stats["invalidations"] += 1
+            except Exception as error:  # pylint: disable=broad-except
+                self.stats["errors"] += 1
+                logger.error(f"Response cache tag {tag_name(tag)} not invalidated: {error}")
+
+        for callback in self.invalidation_callbacks:
+            callback(*(tag_name(tag) for tag in tags))
+
+    def invalidate_on_commit(self, session, *tags):
+        """Invalidates the tags once the session commits, nothing happens if it rolls back."""
+        session.info.setdefault(SESSION_TAGS_KEY, set()).update(tag_name(tag) for tag in tags)
+
+    def after_flush(self, session, flush_context):  # pylint: disable=unused-argument
+        changed = {type(instance).__name__ for instance in (*session.new, *session.dirty, *session.deleted)}
+        changed &= self.tagged
+
+        if changed:
+            session.info.setdefault(SESSION_TAGS_KEY, set()).update(changed)
+
+    def after_commit(self, session):
+        tags = session.info.pop(SESSION_TAGS_KEY, None)
+
+        if tags:
+            self.invalidate(*tags)
+
+    @staticmethod
+    def after_rollback(session):
+        session.info.pop(SESSION_TAGS_KEY, None)
+
+    def metrics(self) -> dict:
+        """Lookups served from the cache vs built, bypassed and failed."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0}
+
+    def safe_get(self, key: str):
+        try:
+            return self.cache.get(key)
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+    def safe_set(self, key: str, value, timeout: int):
+        try:
+            self.cache.set(key, value, timeout=timeout)
+        except Exception as error:  # pylint: disable=broad-except
+            self.stats["errors"] += 1
+            logger.warning(f"Response not cached: {error}")
+
+    def safe_delete(self, key: str):
+        try:
+            self.cache.delete(key)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+def tag_name(tag) -> str:
+    """Tag of a model class, or the tag itself when it is a string."""
+    return tag if isinstance(tag, str) else tag.__name__
+
+
+def restore(entry: tuple) -> Response:
+    status, headers, body = entry
+    return Response(body, status=status, headers=headers)
+
+
+def mark(response: Response, status: str) -> Response:
+    response.headers["X-Cache"] = status
+    return response
@@ -2,21 +2,35 @@
 """Flask Schema Manager."""
 
 import importlib
+from collections import OrderedDict
 from copy import deepcopy
+from threading import Lock
 from typing import Optional
 
 from flask import Flask
-from marshmallow import fields
+from marshmallow import Schema, fields
 from marshmallow.exceptions import ValidationError
 
 EXTENSION_NAME = "flask-schema"
 
+SCHEMAS_MODULE = "src.project.schemas"
+
+# Only schemas built with these arguments are cached, anything else (ie: instance, context)
+# is state that must not be shared between requests.
+CACHEABLE_ARGUMENTS = frozenset(("only", "exclude", "partial", "many"))
+
 
 class SchemaManager(object):
     """Schema Manager."""
 
     def __init__(self, app: Optional[Flask] = None) -> None:
         self.errors = {}
+        self.registry = {}
+        self.instances = OrderedDict()
+        self.cache_size = 128
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
 
         if app is not None:
             self.init_app(app)
@@ -24,6 +38,9 @@ class SchemaManager(object):
     def init_app(self, app: Flask) -> None:
         """Initialize the app."""
 
+        self.cache_size = app.config.get("SCHEMA_CACHE_SIZE", 128)
+        self.registry = self.build_registry()
+
         app.extensions = getattr(app, "extensions", {})
         app.extensions[EXTENSION_NAME] = self
 
@@ -35,6 +52,22 @@ class SchemaManager(object):
     def reset(self):
         """Reset the Schema Manager."""
 
+    @staticmethod
+    def build_registry() -> dict:
+        """Resolve every schema class exported by the schemas module.
+
+        Returns:
+            dict: The schema classes by name.
+        """
+
+        schemas_module = importlib.import_module(SCHEMAS_MODULE)
+
+        return {
+            name: value
+            for name, value in vars(schemas_module).items()
+            if isinstance(value, type) and issubclass(value, Schema)
+        }
+
     def get_schema_class_by_name(self, schema_class: str):
         """Get a schema class by name.
 
@@ -45,8 +78,78 @@ class SchemaManager(object):
             object: The schema class.
         """
 
-        schemas_module = importlib.import_module("src.project.schemas")
-        return getattr(schemas_module, schema_class)
+        if schema_class not in self.registry:
+            schemas_module = importlib.import_module(SCHEMAS_MODULE)
+            self.registry[schema_class] = getattr(schemas_module, schema_class)
+
+        return self.registry[schema_class]
+
+    def get_cached_schema(self, schema_class, **kwargs):
+        """Get a prebuilt schema instance, building it on a cache miss.
+
+        The least recently used instance is dropped when the cache is full.
+
+        Args:
+            schema_class (object): The schema class.
+            **kwargs: only, exclude, partial and many.
+
+        Returns:
+            object: The schema.
+        """
+
+        key = (
+            schema_class.__name__,
+            *(self.freeze(kwargs.get(argument)) for argument in ("only", "exclude", "partial", "many")),
+        )
+
+        with self.lock:
+            schema = self.instances.get(key)
+            if schema is not None:
+                self.instances.move_to_end(key)
+                self.hits += 1
+                return schema
+            self.misses += 1
+
+        schema = schema_class(**kwargs)
+
+        with self.lock:
+            self.instances[key] = schema
+            while len(self.instances) > self.cache_size:
+                self.instances.popitem(last=False)
+
+        return schema
+
+    @staticmethod
+    def freeze(value):
+        """Make a schema argument hashable."""
+        if isinstance(value, (list, tuple)):
+            return tuple(value)
+        if isinstance(value, (set, frozenset)):
+            return tuple(sorted(value))
+        return value
+
+    def cache_info(self) -> dict:
+        """Schema instances cache statistics.
+
+        Returns:
+            dict: hits, misses, size and maxsize.
+        """
+
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.instances),
+                "maxsize": self.cache_size,
+            }
+
+    def cache_clear(self) -> None:
+        """Drop every cached schema instance and reset the statistics."""
+
+        with self.lock:
+            self.instances.clear()
+            self.hits = 0
+            self.misses = 0
 
     def schema_class_for(self, model, name=None):
         """Get a schema class for a model.
@@ -96,6 +199,9 @@ class SchemaManager(object):
             name = kwargs.pop("name")
         schema_class = self.schema_class_for(model, name=name)
 
+        if kwargs.keys() <= CACHEABLE_ARGUMENTS:
+            return self.get_cached_schema(schema_class, **kwargs)
+
         return schema_class(**kwargs)
 
     def dump(self, model: object, **kwargs: dict):
@@ -143,7 +249,8 @@ class SchemaManager(object):
                     self.schema_class_for(payload, name=name),
                 )
             else:
-                schema = self.schema_for(payload, name=name, **kwargs)
+                # loading mutates the schema (instance, context), never use a shared one
+                schema = self.schema_class_for(payload, name=name)(**kwargs)
 
             # kwargs 'many', 'partial' or 'unknown' must to be passed to load
             load_kwargs = {
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Flask Token Blocklist."""
+
+import hashlib
+import logging
+import math
+import os
+import time
+from datetime import timedelta
+from threading import Lock, Thread
+
+from flask import Flask
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+
+EXTENSION_NAME = "flask-token-blocklist"
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter of strings.
+
+    Membership tests may return false positives (about `error_rate` once `capacity` items
+    were added) but never false negatives. Adds are serialized: setting a bit is a read-modify-write
+    of its byte and two concurrent adds (request threads revoking and the subscriber thread) could
+    otherwise lose one of the bits. Membership tests do not lock.
+    """
+
+    __slots__ = ("size", "hashes", "bits", "count", "lock")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = Lock()
+
+    def positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        positions = list(self.positions(item))
+
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class TokenBlocklist(object):
+    """Token Blocklist.
+
+    Redis is the source of truth: revoked JTIs are cache keys that expire with the token.
+    When JWT_BLOCKLIST_LOCAL is on each process also keeps a Bloom filter of the revoked
+    JTIs, fed by a Redis pub/sub channel, so only the tokens that hit the filter (revoked
+    ones and false positives) are looked up in Redis.
+
+    Staleness is bounded: the subscriber pings Redis over the pub/sub connection and a
+    pong proves every revocation published before the ping was applied. A local miss is
+    trusted only if such a pong arrived within JWT_BLOCKLIST_MAX_STALENESS seconds,
+    otherwise (ie: while Redis is unreachable or before the first sync) every check goes
+    to Redis.
+    """
+
+    def __init__(self, app: Flask = None, cache=None):
+        self.cache = None
+        self.enabled = False
+        self.channel = "jwt-blocklist"
+        self.max_staleness = 5.0
+        self.capacity = 100_000
+        self.error_rate = 0.001
+        self.resync_interval = 600
+
+        self.bloom = None
+        self.synced_at = 0.0
+        self.confirmed_at = 0.0
+        self.pid = None
+        self.thread = None
+        self.lock = Lock()
+        # Approximate counters, they are not locked to keep the checks cheap
+        self.stats = {"local": 0, "redis": 0, "revoked": 0}
+
+        if app is not None:
+            self.init_app(app, cache)
+
+    def init_app(self, app: Flask, cache):
+        """Initialize the app with the flask-caching Redis cache that stores the revoked JTIs."""
+        self.cache = cache
+        self.enabled = app.config.get("JWT_BLOCKLIST_LOCAL", True)
+        self.channel = app.config.get("JWT_BLOCKLIST_CHANNEL", "jwt-blocklist")
+        self.max_staleness = app.config.get("JWT_BLOCKLIST_MAX_STALENESS", 5.0)
+        self.capacity = app.config.get("JWT_BLOCKLIST_CAPACITY", 100_000)
+        self.error_rate = app.config.get("JWT_BLOCKLIST_ERROR_RATE", 0.001)
+        self.resync_interval = app.config.get("JWT_BLOCKLIST_RESYNC_INTERVAL", 600)
+        self.pid = None
+        self.confirmed_at = 0.0
+
+        app.extensions = getattr(app, "extensions", {})
+        app.extensions[EXTENSION_NAME] = self
+
+    @property
+    def client(self):
+        """Redis client of the cache backend."""
+        return self.cache.cache._write_client  # pylint: disable=protected-access
+
+    @property
+    def index_key(self) -> str:
+        """Sorted set of revoked JTIs scored by expiration time, used to rebuild the filters."""
+        return f"{self.cache.cache.key_prefix}{self.channel}"
+
+    def revoke(self, jti: str, expires: timedelta):
+        """Revokes a JTI until it expires and notifies every process."""
+        if not jti:
+            return
+
+        seconds = expires.total_seconds() if isinstance(expires, timedelta) else expires
+
+        self.cache.set(jti, "", timeout=expires)
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.zadd(self.index_key, {jti: time.time() + seconds})
+        pipeline.publish(self.channel, jti)
+        pipeline.execute()
+
+        if self.bloom is not None:
+            self.bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        """Checks a JTI locally and falls back to Redis on a filter hit or when the filter is stale."""
+        if self.enabled:
+            self.start()
+
+            bloom = self.bloom
+            if bloom is not None and jti not in bloom and self.is_fresh():
+                self.stats["local"] += 1
+                return False
+
+        self.stats["redis"] += 1
+        revoked = self.cache.get(jti) is not None
+        self.stats["revoked"] += int(revoked)
+        return revoked
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.confirmed_at <= self.max_staleness
+
+    def metrics(self) -> dict:
+        """Checks answered by the local filter vs Redis and the filter state."""
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "fresh": self.enabled and self.is_fresh(),
+            "size": self.bloom.count if self.bloom is not None else 0,
+        }
+
+    def start(self):
+        """Start the subscriber thread once per process (threads do not survive a fork)."""
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.bloom = None
+            self.confirmed_at = 0.0
+            self.thread = Thread(target=self.subscriber, name="jwt-blocklist", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def subscriber(self):
+        """Keeps the filter up to date, reconnecting with a backoff when Redis is unreachable."""
+        backoff = 0.5
+
+        while True:
+            try:
+                self.listen()
+            except (RedisError, OSError) as error:
+                logger.error(f"Token blocklist subscriber disconnected: {error}")
+
+            # Start over with a short wait if the connection was healthy at some point
+            backoff = 0.5 if self.confirmed_at else min(backoff * 2, 30)
+            self.confirmed_at = 0.0
+            time.sleep(backoff)
+
+    def listen(self):
+        pubsub = self.client.pubsub()
+        ping_interval = self.max_staleness / 3
+        pinged_at = None
+
+        try:
+            # Subscribe before loading the index so no revocation falls in between
+            pubsub.subscribe(self.channel)
+            self.resync()
+
+            while True:
+                now = time.monotonic()
+
+                if now - self.synced_at > self.resync_interval:
+                    self.resync()
+
+                if pinged_at is None and now - self.confirmed_at >= ping_interval:
+                    pinged_at = now
+                    pubsub.ping()
+                elif pinged_at is not None and now - pinged_at > self.max_staleness:
+                    raise RedisConnectionError("no pong received from the pub/sub connection")
+
+                message = pubsub.get_message(timeout=ping_interval)
+                if message is None:
+                    continue
+
+                if message["type"] == "message":
+                    self.bloom.add(decode(message["data"]))
+                elif message["type"] == "pong" and pinged_at is not None:
+                    self.confirmed_at = pinged_at
+                    pinged_at = None
+        finally:
+            pubsub.close()
+
+    def resync(self):
+        """Rebuilds the filter from the index, dropping expired JTIs."""
+        now = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.zremrangebyscore(self.index_key, "-inf", now)
+        pipeline.zrangebyscore(self.index_key, now, "+inf")
+        _, revoked = pipeline.execute()
+
+        bloom = BloomFilter(max(self.capacity, len(revoked) * 2), self.error_rate)
+        for jti in revoked:
+            bloom.add(decode(jti))
+
+        self.bloom = bloom
+        self.synced_at = time.monotonic()
+
+
+def decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
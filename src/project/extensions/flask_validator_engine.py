@@ -3,7 +3,7 @@ import re
 from typing import Optional
 from datetime import datetime
 from functools import wraps
-from flask import request, Flask
+from flask import g, request, Flask
 from werkzeug.exceptions import HTTPException
 
 class ValidatorEngine(object):
@@ -104,8 +104,6 @@ class ValidatorEngine(object):
 
     def __init__(self, app: Optional[Flask] = None) -> None:
 
-        self.errors = {}
-
         if app is not None:
             self.init_app(app)
 
@@ -115,35 +113,89 @@ class ValidatorEngine(object):
         app.extensions = getattr(app, "extensions", {})
         app.extensions["validator_engine"] = self
 
-        @app.teardown_appcontext
-        def teardown_response_service(response_or_exc):  # pylint: disable=unused-variable
-            self.reset()
-            return response_or_exc
+    @property
+    def errors(self):
+        """Errors of the current request.
+
+        The extension instance is shared by every thread or greenlet of the worker, so errors live
+        in the request-local `g` object and never leak between concurrent requests.
+        """
+        return g.setdefault(ERRORS_KEY, {})
 
     def reset(self):
         """Empty errors dictionary"""
-        self.errors = {}
+        g.pop(ERRORS_KEY, None)
 
     def __call__(self, validation_type, rules):
+        if validation_type not in DATA_SOURCES:
+            raise Exception(
+                f"""AttributeError {validation_type} passed, expecting json or files or
+                query_string or headers"""
+            )
+
+        get_data = DATA_SOURCES[validation_type]
+        pipeline = self.compile(rules)
+
         def wrapper(func):
             @wraps(func)
             def inner_wrapper(*args, **kwargs):
-                try:
-                    validation_type_method = self.__getattribute__(validation_type)
-                    all_validation_passes = validation_type_method(rules)
-                    if not all_validation_passes:
-                        return self.response()
-                    return func(*args, **kwargs)
-                except AttributeError:
-                    raise Exception(
-                        f"""AttributeError {validation_type} passed, expecting json or form_data or
-                        query_string or headers"""
-                    ) from AttributeError
+                errors = self.run(get_data(), pipeline)
+                if errors:
+                    return self.response(errors)
+                return func(*args, **kwargs)
 
             return inner_wrapper
 
         return wrapper
 
+    def compile(self, validation_rules):
+        """Compile a rules dictionary into a pipeline of (field, checks) tuples.
+
+        Each check is a callable that receives the field value and returns None when the value is
+        valid or the error message otherwise. Rules are split, validators looked up and their
+        arguments (patterns, limits, reference dates) parsed only once, at decoration time.
+        """
+        return tuple(
+            (field, tuple(self.compile_rule(rule) for rule in rules)) for field, rules in validation_rules.items()
+        )
+
+    def compile_rule(self, rule):
+        """Compile a single rule string, ie: 'max:150', into a check callable."""
+        validator_name, validator_args = self.rule_splitter(rule)
+        validator_name = RULE_ALIASES.get(validator_name, validator_name)
+
+        compiler = getattr(RuleCompilers, validator_name, None)
+        if compiler is not None:
+            return compiler(*validator_args)
+
+        validator = getattr(Validators, validator_name, None)
+        if validator is None:
+            raise Exception(f"{validator_name} - Built-in validator specified not known")
+
+        def check(value):
+            validation_result = validator(value, *validator_args)
+            return None if validation_result["status"] else validation_result["message"]
+
+        return check
+
+    @staticmethod
+    def run(data, pipeline):
+        """Run a compiled pipeline against the data dictionary and return the errors found.
+
+        Errors are collected in a local dictionary, nothing is shared between requests.
+        """
+        errors = {}
+
+        for field, checks in pipeline:
+            value = data.get(field, None)
+            for check in checks:
+                message = check(value)
+                if message is not None:
+                    errors[field] = message
+                    break
+
+        return errors
+
     def check_values(self, data, validation_rules):
         """Check if the values in the data dictionary matches the validation rules"""
         for field, rules in validation_rules.items():
@@ -183,8 +235,8 @@ class ValidatorEngine(object):
         self.check_values(data, rules)
         return not self.has_errors()
 
-    def response(self):
-        raise ValidationError(fields=self.errors)
+    def response(self, errors=None):
+        raise ValidationError(fields=self.errors if errors is None else errors)
 
     def add_error(self, field, message):
         self.errors[field] = message
@@ -403,6 +455,153 @@ class Validators:
         return {"status": True}
 
 
+class RuleCompilers:
+    """Build checks with their arguments already parsed.
+
+    Every compiler returns a callable(value) that gives None when the value is valid or the same
+    error message as its Validators counterpart. Validators without a compiler are wrapped as is.
+    """
+
+    @staticmethod
+    def required(*validator_args):  # pylint: disable=unused-argument
+        def check(value):
+            return "This field is required" if value in (None, "") else None
+
+        return check
+
+    @staticmethod
+    def max(*validator_args):
+        limit = int(validator_args[0])
+        error_msg = f"This field must not be greater than {validator_args[0]}"
+
+        def check(value):
+            size = value if isinstance(value, int) else len(value)
+            return error_msg if size > limit else None
+
+        return check
+
+    @staticmethod
+    def min(*validator_args):
+        limit = int(validator_args[0])
+        error_msg = f"This field must not be less than {validator_args[0]}"
+
+        def check(value):
+            size = value if isinstance(value, int) else len(value)
+            return error_msg if size < limit else None
+
+        return check
+
+    @staticmethod
+    def email(*validator_args):  # pylint: disable=unused-argument
+        def check(value):
+            return None if EMAIL_PATTERN.search(value) else "This field must contain a valid email address"
+
+        return check
+
+    @staticmethod
+    def regex(*validator_args):
+        pattern = re.compile(validator_args[0])
+
+        def check(value):
+            return None if pattern.fullmatch(value) else "This field does not match required pattern"
+
+        return check
+
+    @staticmethod
+    def date(*args):
+        date_format = args[0]
+        error_msg = f"This field must be a date that match this format {date_format}"
+        expected = datetime.strptime(args[1], date_format) if len(args) == 2 else None
+
+        def check(value):
+            try:
+                date_value = datetime.strptime(value, date_format)
+            except ValueError:
+                return error_msg
+
+            if expected is not None and date_value != expected:
+                return error_msg + f"and value must be {args[1]}"
+
+            return None
+
+        return check
+
+    @staticmethod
+    def compare_dates(usage, error_msg, is_valid, args):
+        """Build a check that compares the value with a reference date parsed once."""
+        if len(args) != 2:
+            raise Exception(usage)
+
+        date_format = args[0]
+        reference = datetime.strptime(args[1], date_format)
+
+        def check(value):
+            try:
+                date_value = datetime.strptime(value, date_format)
+            except ValueError:
+                return f"This field must be a date that match this format {date_format}"
+
+            return None if is_valid(date_value, reference) else error_msg
+
+        return check
+
+    @staticmethod
+    def after(*args):
+        return RuleCompilers.compare_dates(
+            "ArgumentError - Usage should be date_after:<format>,<value>",
+            f"This field must be after this date {args[0] if args else ''}",
+            lambda value, reference: value > reference,
+            args,
+        )
+
+    @staticmethod
+    def after_or_equal(*args):
+        return RuleCompilers.compare_dates(
+            "ArgumentError Usage should be date_after_or_equal:<format>,<value>",
+            f"This field must be after or equal to this date {args[0] if args else ''}",
+            lambda value, reference: value >= reference,
+            args,
+        )
+
+    @staticmethod
+    def before(*args):
+        return RuleCompilers.compare_dates(
+            "ArgumentError - Usage should be date_before:<format>,<value>",
+            f"This field must be before this date {args[0] if args else ''}",
+            lambda value, reference: value < reference,
+            args,
+        )
+
+    @staticmethod
+    def before_or_equal(*args):
+        return RuleCompilers.compare_dates(
+            "ArgumentError - Usage should be date_before_or_equal:<format>,<value>",
+            f"This field must be before or equal to this date {args[0] if args else ''}",
+            lambda value, reference: value <= reference,
+            args,
+        )
+
+
+ERRORS_KEY = "validator_engine_errors"
+
+EMAIL_PATTERN = re.compile(r"^[a-z0-9]+[\._]?[a-z0-9]+[@]\w+[.]\w{2,3}$")
+
+# The documented date_* rule names
+RULE_ALIASES = {
+    "date_after": "after",
+    "date_after_or_equal": "after_or_equal",
+    "date_before": "before",
+    "date_before_or_equal": "before_or_equal",
+}
+
+DATA_SOURCES = {
+    "json": lambda: request.get_json(force=True),
+    "query_string": lambda: request.args.to_dict(),
+    "headers": lambda: request.headers,
+    "files": lambda: request.files.to_dict(),
+}
+
+
 class ValidationError(HTTPException):
     def __init__(self, fields=None):
         super().__init__()
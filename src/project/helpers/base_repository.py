@@ -5,6 +5,14 @@ from sqlalchemy import asc, desc
 from sqlalchemy.sql import text
 
 from src.project.app import db
+from src.project.helpers.filter_plan import compile_filter_plan, fuzzyboolean, get_filter_plan
+from src.project.helpers.pagination import (
+    COUNT_ESTIMATE,
+    COUNT_EXACT,
+    COUNT_MODES,
+    estimate_count,
+    keyset_paginate,
+)
 
 ORDER_OPTIONS = {"asc": asc, "desc": desc}
 
@@ -102,7 +110,8 @@ class BaseRepository:
 
             :param query: SQLAlchemy CustomBaseQuery
             :param model_class: is the model class you want to run the filter upon
-            :param conditions: It is a list of tuples, ie: [(key,operator,value)]
+            :param conditions: It is a list of tuples, ie: [(key,operator,value,source)]
+              When it is None the cached plan of the model filters() declaration is used.
               >>> operatorerator list:
               >>>   eq for ==
               >>>   ne for !=
@@ -124,65 +133,17 @@ class BaseRepository:
         :rtype: CustomBaseQuery
         """
 
-        filters = []
-
         try:
             request_args = request.args.to_dict(flat=True)
         except Exception:
             request_args = {}
 
-        for condition in conditions:
-            key, operator, value, source = condition
-            if source == "args":
-                if request_args.get(value) is not None:
-                    if operator == "is":
-                        filters.append((key, operator, cls.fuzzyboolean(request_args.get(value))))
-                    else:
-                        filters.append((key, operator, request_args.get(value)))
-            elif source == "kwargs":
-                if kwargs.get(key) is not None:
-                    filters.append((key.replace("__", "."), operator, kwargs.get(value)))
-            else:
-                filters.append((key, operator, value))
-
-        for condition in filters:
-            try:
-                key, operator, value = condition
-            except ValueError:
-                raise Exception("Invalid filter: %s" % condition) from ValueError
-            column = getattr(model_class, key, None)
-            if not column:
-                raise Exception("Invalid filter column: %s" % key)
-
-            if operator == "in":
-                if isinstance(value, list):
-                    _filter = column.in_(value)
-                else:
-                    _filter = column.in_(value.split(","))
-            else:
-                try:
-                    attr = (
-                        list(
-                            filter(
-                                lambda e: hasattr(column, e % operator),
-                                ["%s", "%s_", "__%s__"],
-                            )
-                        )[0]
-                        % operator
-                    )
-                except IndexError:
-                    raise Exception("Invalid filter operator(): %s" % operator) from IndexError
-
-                if value == "null":
-                    value = None
-
-                _filter = getattr(column, attr)(value)
-
-            # add filter to sqlalchemy CustomBaseQuery
+        if conditions is None:
+            plan = get_filter_plan(model_class)
+        else:
+            plan = compile_filter_plan(model_class, conditions)
 
-            query = query.filter(_filter)
-
-        return query
+        return plan.apply(query, request_args, kwargs)
 
     @classmethod
     def exists(cls, conditions: tuple) -> bool:
@@ -237,9 +198,15 @@ class BaseRepository:
         query = cls.filter(
             cls.model.query,
             cls.model,
-            cls.model.filters(),
             **kwargs,
         )
+
+        if cls.use_cursor(**kwargs):
+            return cls.keyset_paginate(
+                query,
+                **kwargs,
+            )
+
         query = cls.order(
             query,
             **kwargs,
@@ -275,8 +242,9 @@ class BaseRepository:
 
         return ordering
 
-    @classmethod
-    def order(cls, query, **kwargs):
+    @staticmethod
+    def get_order_by(**kwargs) -> list:
+        """Returns the requested order as a list of 'field,direction' strings."""
         try:
             # flat=False creates a list with all the values for example
             # ?order=id,asc&order=updated_at,desc results in
@@ -295,16 +263,99 @@ class BaseRepository:
             else:
                 order_by.append(order_in_kwargs)
 
+        return order_by
+
+    @classmethod
+    def order(cls, query, **kwargs):
+        order_by = cls.get_order_by(**kwargs)
         ordering = cls.order_generation(order_by, cls.get_model().mappings(), cls.get_model().default_order())
         return query if ordering is None else query.order_by(*ordering)
 
+    @classmethod
+    def keyset_keys(cls, **kwargs) -> list:
+        """Returns the keyset ordering as a list of (name, column, direction) tuples.
+
+        The requested order and the model default_order() are resolved through mappings().
+        The primary key is appended as a tie breaker so every row has a unique position.
+        """
+        model = cls.get_model()
+        mappings = model.mappings()
+        keys = []
+
+        for order_item in cls.get_order_by(**kwargs) + [model.default_order()]:
+            name, _, direction = order_item.partition(",")
+            if name in mappings and direction in ORDER_OPTIONS and name not in [key[0] for key in keys]:
+                keys.append((name, mappings[name], direction))
+
+        if "id" not in [key[0] for key in keys]:
+            keys.append(("id", model.id, keys[-1][2] if keys else "desc"))
+
+        return keys
+
+    @staticmethod
+    def use_cursor(**kwargs) -> bool:
+        """Returns True when the cursor pagination was requested, ie: ?cursor= or cursor kwarg."""
+        try:
+            request_args = request.args.to_dict()
+        except Exception:
+            request_args = {}
+
+        if "all" in request_args or "all" in kwargs:
+            return False
+
+        return "cursor" in request_args or "cursor" in kwargs
+
+    @staticmethod
+    def get_per_page(request_args: dict, **kwargs) -> int:
+        max_per_page = current_app.config.get("SQLALCHEMY_DEFAULT_MAX_PER_PAGE", 100)
+        default_per_page = current_app.config.get("SQLALCHEMY_DEFAULT_PER_PAGE", 25)
+
+        per_page = default_per_page
+
+        if kwargs.get("per_page", None):
+            try:
+                per_page = int(request_args.get("per_page", default_per_page))
+                if per_page > max_per_page:
+                    per_page = max_per_page
+            except (TypeError, ValueError):
+                per_page = max_per_page
+
+        return per_page
+
+    @staticmethod
+    def get_count_mode(request_args: dict, **kwargs) -> str:
+        """Returns how the total is computed: exact (COUNT(*)), estimate (planner statistics) or none."""
+        default_count_mode = current_app.config.get("SQLALCHEMY_DEFAULT_COUNT_MODE", COUNT_EXACT)
+
+        count_mode = request_args.get("count") or kwargs.get("count") or default_count_mode
+
+        return count_mode if count_mode in COUNT_MODES else default_count_mode
+
+    @classmethod
+    def keyset_paginate(cls, query, **kwargs) -> Tuple:
+        """Returns a Tuple(resultset, KeysetPagination) using the cursor given in args or kwargs."""
+        try:
+            request_args = request.args.to_dict()
+        except Exception:
+            request_args = kwargs
+
+        cursor = request_args.get("cursor") or kwargs.get("cursor")
+
+        pagination = keyset_paginate(
+            query,
+            cls.keyset_keys(**kwargs),
+            cls.get_per_page(request_args, **kwargs),
+            cursor,
+        )
+
+        return pagination.items, pagination
+
     @staticmethod
     def paginate(query, **kwargs) -> Tuple:
         pagination = None
         result = query
 
         max_per_page = current_app.config.get("SQLALCHEMY_DEFAULT_MAX_PER_PAGE", 100)
-        default_per_page = current_app.config.get("SQLALCHEMY_DEFAULT_PER_PAGE", 25)
 
         try:
             request_args = request.args.to_dict()
@@ -313,56 +364,32 @@ class BaseRepository:
 
         if not ("all" in request_args or "all" in kwargs):
             page = 1
-            per_page = default_per_page
+            per_page = BaseRepository.get_per_page(request_args, **kwargs)
             if kwargs.get("page", None):
                 try:
                     page = int(request_args.get("page", 1))
                 except (TypeError, ValueError):
                     page = 1
 
-            if kwargs.get("per_page", None):
-                try:
-                    per_page = int(request_args.get("per_page", default_per_page))
-                    if per_page > max_per_page:
-                        per_page = max_per_page
-                except (TypeError, ValueError):
-                    per_page = max_per_page
+            count_mode = BaseRepository.get_count_mode(request_args, **kwargs)
 
             pagination = query.paginate(
                 page=page,
                 per_page=per_page,
                 error_out=False,
                 max_per_page=max_per_page,
+                count=count_mode == COUNT_EXACT,
             )
+
+            if count_mode == COUNT_ESTIMATE:
+                pagination.total = estimate_count(query)
+
+            pagination.count_mode = count_mode
             result = pagination.items
 
         return result, pagination
 
-    @staticmethod
-    def fuzzyboolean(value):
-        if isinstance(value, bool):
-            return value
-
-        if not value:
-            raise ValueError("boolean type must be non-null")
-        value = value.lower()
-        if value in (
-            "false",
-            "no",
-            "off",
-            "n",
-            "0",
-        ):
-            return False
-        if value in (
-            "true",
-            "yes",
-            "on",
-            "y",
-            "1",
-        ):
-            return True
-        raise ValueError("Invalid literal for boolean(): {}".format(value))
+    fuzzyboolean = staticmethod(fuzzyboolean)
 
     @classmethod
     def run_query(cls, sql: str):
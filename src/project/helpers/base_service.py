@@ -3,7 +3,7 @@ from typing import List, Union
 from flask import request
 from flask_jwt_extended import get_jwt
 
-from src.project.app import schema, db
+from src.project.app import db, near, responses, schema
 from src.project.exceptions import CustomException
 
 
@@ -62,6 +62,7 @@ class BaseService:
         payload = payload or request.get_json()
         obj = cls.deserialize(payload, **kwargs)
         obj.before_post()
+        cls.invalidate_cache()
 
         if commit:
             db.session.commit()
@@ -81,6 +82,7 @@ class BaseService:
         payload = payload or request.get_json()
         obj = cls.deserialize(payload, instance=instance, **kwargs)
         obj.before_put()
+        cls.invalidate_cache()
 
         if commit:
             db.session.commit()
@@ -100,6 +102,7 @@ class BaseService:
 
         obj = cls.deserialize(payload, instance=instance, partial=True, unknown="exclude", **kwargs)
         obj.before_patch()
+        cls.invalidate_cache()
 
         if commit:
             cls.commit()
@@ -113,6 +116,8 @@ class BaseService:
         :param instance: An object instance
         """
         instance.delete()
+        cls.invalidate_cache()
+
         if commit:
             db.session.commit()
 
@@ -208,12 +213,30 @@ class BaseService:
 
     @classmethod
     def references_dict(cls, field="name") -> Union[dict, None]:
-        """Gets a dictionary."""
-        if hasattr(cls.repository.model, field):
-            items, _ = cls.repository.get_all(all=True, is_active=True)
-            return {item.id: getattr(item, field) for item in items.all()}
+        """Gets a dictionary of the active rows {id: field}, from the near cache."""
+        model = cls.get_model()
 
-        return None
+        if not hasattr(model, field):
+            return None
+
+        def load():
+            # built from the model alone, the request args must not leak into a shared entry
+            query = model.query.with_entities(model.id, getattr(model, field))
+
+            if hasattr(model, "is_active"):
+                query = query.filter(model.is_active.is_(True))
+
+            if hasattr(model, "is_deleted"):
+                query = query.filter(model.is_deleted.is_(False))
+
+            return dict(query.all())
+
+        return dict(near.get_or_set(f"references:{model.__name__}:{field}", load, tags=(model,)))
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Invalidates the cached responses tagged with the model once the session commits."""
+        responses.invalidate_on_commit(db.session, cls.get_model())
 
     @staticmethod
     def commit():
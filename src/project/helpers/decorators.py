@@ -1,11 +1,13 @@
 from functools import wraps
-from flask import request, abort
+from flask import request, g
+from src.project.app import apikeys
 from src.project.exceptions import CustomException
 
 
 def requires_api_key(f):
     """
-    Checks if a X_API_KEY is present in headers and it has a valid value.
+    Checks if a X_API_KEY is present in headers and it is an active key of the api_keys table.
+    The id and permissions of the key are available in `g.api_key`.
     """
 
     @wraps(f)
@@ -13,8 +15,12 @@ def requires_api_key(f):
         api_key = request.headers.get("X_API_KEY")
         if not api_key:
             raise CustomException("Api key is missing", code="MissingApiKey", status_code=401)
-        if api_key not in ("9aebf6ca-246d-4c8f-ae16-7c1746e79d6d",):
+
+        identity = apikeys.authenticate(api_key)
+        if identity is None:
             raise CustomException("Api key is not valid", code="InvalidApiKey", status_code=403)
+
+        g.api_key = identity
         return f(*args, **kwargs)
 
     return decorated
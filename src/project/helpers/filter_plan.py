@@ -0,0 +1,206 @@
+"""
+Compiled filter plans for BaseRepository.filter.
+
+A model declares its filters as a list of tuples (column, operator, value, source).
+Parsing those tuples, resolving the columns and probing the operator methods is the same
+work on every request, so it is done once per model and cached. Each request only binds
+the values coming from the request args, the kwargs or the declaration itself.
+"""
+
+from threading import Lock
+
+OPERATOR_PATTERNS = ("%s", "%s_", "__%s__")
+
+_plans = {}
+_plans_lock = Lock()
+
+
+def fuzzyboolean(value):
+    """
+    Converts a string representation of truth to a boolean.
+
+    :param value: A boolean or a string like true/false, yes/no, on/off, y/n, 1/0
+    :raise ValueError: When the value is empty or it is not a valid literal
+    :return: bool
+    """
+    if isinstance(value, bool):
+        return value
+
+    if not value:
+        raise ValueError("boolean type must be non-null")
+    value = value.lower()
+    if value in (
+        "false",
+        "no",
+        "off",
+        "n",
+        "0",
+    ):
+        return False
+    if value in (
+        "true",
+        "yes",
+        "on",
+        "y",
+        "1",
+    ):
+        return True
+    raise ValueError("Invalid literal for boolean(): {}".format(value))
+
+
+class FilterStep:
+    """
+    A single precompiled condition.
+
+    The column and the operator method are resolved when the step is compiled. Invalid
+    declarations are kept as an error which is raised only when the step is bound, the
+    same way the condition would fail when it was parsed on each request.
+    """
+
+    __slots__ = ("key", "operator", "value", "source", "column", "method", "error")
+
+    def __init__(self, model_class, key: str, operator: str, value, source: str):
+        self.key = key
+        self.operator = operator
+        self.value = value
+        self.source = source
+        self.column = None
+        self.method = None
+        self.error = None
+
+        column_name = key.replace("__", ".") if source == "kwargs" else key
+        column = getattr(model_class, column_name, None)
+
+        if column is None:
+            self.error = "Invalid filter column: %s" % column_name
+            return
+
+        self.column = column
+
+        if operator == "in":
+            return
+
+        for pattern in OPERATOR_PATTERNS:
+            if hasattr(column, pattern % operator):
+                self.method = getattr(column, pattern % operator)
+                return
+
+        self.error = "Invalid filter operator(): %s" % operator
+
+    def bind(self, request_args: dict, kwargs: dict):
+        """
+        Returns the SQLAlchemy expression for the current values or None when the
+        condition does not apply.
+
+        :param request_args: The request query string as a flat dictionary
+        :param kwargs: The keyword arguments given to the repository
+        :raise Exception: When the condition applies and its declaration is invalid
+        """
+        if self.source == "args":
+            value = request_args.get(self.value)
+            if value is None:
+                return None
+            if self.operator == "is":
+                value = fuzzyboolean(value)
+        elif self.source == "kwargs":
+            if kwargs.get(self.key) is None:
+                return None
+            value = kwargs.get(self.value)
+        else:
+            value = self.value
+
+        if self.error:
+            raise Exception(self.error)
+
+        if self.operator == "in":
+            return self.column.in_(value if isinstance(value, list) else value.split(","))
+
+        if value == "null":
+            value = None
+
+        return self.method(value)
+
+
+class FilterPlan:
+    """
+    An ordered list of precompiled conditions for a model.
+    """
+
+    __slots__ = ("model_class", "steps")
+
+    def __init__(self, model_class, conditions: list):
+        self.model_class = model_class
+        self.steps = tuple(compile_step(model_class, condition) for condition in conditions or [])
+
+    def bind(self, request_args: dict = None, kwargs: dict = None) -> list:
+        """
+        Returns the list of SQLAlchemy expressions that apply for the given values.
+
+        :param request_args: The request query string as a flat dictionary
+        :param kwargs: The keyword arguments given to the repository
+        """
+        request_args = request_args or {}
+        kwargs = kwargs or {}
+        expressions = []
+
+        for step in self.steps:
+            expression = step.bind(request_args, kwargs)
+            if expression is not None:
+                expressions.append(expression)
+
+        return expressions
+
+    def apply(self, query, request_args: dict = None, kwargs: dict = None):
+        """
+        Returns the query filtered by the expressions that apply for the given values.
+        """
+        for expression in self.bind(request_args, kwargs):
+            query = query.filter(expression)
+
+        return query
+
+
+def compile_step(model_class, condition: tuple) -> FilterStep:
+    """
+    Compiles a (column, operator, value, source) tuple.
+
+    :raise Exception: When the tuple is malformed
+    """
+    try:
+        key, operator, value, source = condition
+    except ValueError:
+        raise Exception("Invalid filter: %s" % (condition,)) from ValueError
+
+    return FilterStep(model_class, key, operator, value, source)
+
+
+def compile_filter_plan(model_class, conditions: list) -> FilterPlan:
+    """
+    Compiles a list of conditions without caching it. Useful for ad-hoc conditions whose
+    declared values change on every call.
+    """
+    return FilterPlan(model_class, conditions)
+
+
+def get_filter_plan(model_class) -> FilterPlan:
+    """
+    Returns the cached plan for the model filters() declaration, compiling it on first use.
+    """
+    plan = _plans.get(model_class)
+
+    if plan is None:
+        with _plans_lock:
+            plan = _plans.get(model_class)
+            if plan is None:
+                plan = FilterPlan(model_class, model_class.filters())
+                _plans[model_class] = plan
+
+    return plan
+
+
+def clear_filter_plans():
+    """
+    Drops every cached plan.
+    """
+    with _plans_lock:
+        _plans.clear()
@@ -1,5 +1,5 @@
 from typing import Any
-from src.project.extensions import jwt, rediscache, api
+from src.project.extensions import jwt, blocklist, api
 
 
 def register_jwt_handlers():
@@ -79,10 +79,7 @@ def register_jwt_handlers():
             code=401,
         )
 
-    # Callback function to check if a JWT exists in the redis blocklist
+    # Callback function to check if a JWT exists in the blocklist (local filter + redis)
     @jwt.token_in_blocklist_loader
     def check_if_token_is_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload["jti"]
-        token_in_redis = rediscache.get(jti)
-
-        return token_in_redis is not None
+        return blocklist.is_revoked(jwt_payload["jti"])
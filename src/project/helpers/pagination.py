@@ -0,0 +1,263 @@
+"""
+Pagination helpers.
+
+Keyset (cursor) pagination: instead of OFFSET and COUNT(*) the next page is fetched with a
+WHERE clause built from the ordering values of the last row, so deep pages cost the same as
+the first one. The position is handed to the client as an opaque, signed cursor.
+
+Count modes: the total of an OFFSET paginated query can be exact (COUNT(*)), estimated from
+the planner statistics, or skipped.
+"""
+
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from flask import current_app
+from itsdangerous import BadData, URLSafeSerializer
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators, text
+from sqlalchemy.sql.elements import BinaryExpression, False_
+
+from src.project.exceptions import CustomException
+
+CURSOR_SALT = "keyset-cursor"
+CURSOR_NEXT = "next"
+CURSOR_PREV = "prev"
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+
+class KeysetPagination:
+    """
+    The result of a keyset paginated query.
+
+    Attributes:
+        items (list): The rows of the current page.
+        per_page (int): The page size.
+        next_cursor (str): Cursor of the following page or None.
+        prev_cursor (str): Cursor of the previous page or None.
+    """
+
+    def __init__(self, items: list, per_page: int, next_cursor: str = None, prev_cursor: str = None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def get_serializer() -> URLSafeSerializer:
+    return URLSafeSerializer(current_app.config.get("SECRET_KEY"), salt=CURSOR_SALT)
+
+
+def encode_value(value):
+    """
+    Makes an ordering value JSON serializable.
+    """
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+
+    return value
+
+
+def decode_value(value):
+    """
+    Restores an ordering value encoded by encode_value.
+    """
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+
+    return value
+
+
+def encode_cursor(direction: str, keys: list, item: object) -> str:
+    """
+    Builds a signed cursor pointing at the given row.
+
+    Args:
+        direction (str): next or prev
+        keys (list): list of (name, column, order) tuples
+        item (object): the row the cursor points at
+
+    Returns:
+        str: an url safe cursor
+    """
+    return get_serializer().dumps(
+        {
+            "d": direction,
+            "k": [name for name, _, _ in keys],
+            "v": [encode_value(getattr(item, column.key)) for _, column, _ in keys],
+        }
+    )
+
+
+def decode_cursor(cursor: str, keys: list) -> Tuple[str, list]:
+    """
+    Validates a cursor and returns its direction and ordering values.
+
+    Raises:
+        CustomException: InvalidCursorError when the cursor was altered or the ordering changed.
+    """
+    try:
+        data = get_serializer().loads(cursor)
+    except BadData as error:
+        raise CustomException(f"Invalid cursor ({error.__class__.__name__})", "InvalidCursorError") from error
+
+    if (
+        data.get("k") != [name for name, _, _ in keys]
+        or len(data.get("v", [])) != len(keys)
+        or data.get("d") not in (CURSOR_NEXT, CURSOR_PREV)
+    ):
+        raise CustomException("The cursor does not match the requested order", "InvalidCursorError")
+
+    return data["d"], [decode_value(value) for value in data["v"]]
+
+
+def keyset_condition(keys: list, values: list, backwards: bool = False):
+    """
+    Builds the row comparison (a, b) > (x, y) supporting mixed directions:
+    a > x OR (a = x AND b > y)
+    """
+    clauses = []
+
+    for index, (_, column, order) in enumerate(keys):
+        after = (order == "asc") != backwards
+        comparison = column > values[index] if after else column < values[index]
+        equalities = [keys[i][1] == values[i] for i in range(index)]
+        clauses.append(and_(*equalities, comparison) if equalities else comparison)
+
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys: list, per_page: int, cursor: Optional[str] = None) -> KeysetPagination:
+    """
+    Fetches a page of rows after (or before) the given cursor.
+
+    Args:
+        query (Query): SQLAlchemy query without ordering
+        keys (list): list of (name, column, order) tuples, the last one must be unique
+        per_page (int): page size
+        cursor (str, optional): cursor returned by a previous page. Defaults to the first page.
+
+    Returns:
+        KeysetPagination: the page
+    """
+    direction, values = (CURSOR_NEXT, None)
+
+    if cursor:
+        direction, values = decode_cursor(cursor, keys)
+
+    backwards = direction == CURSOR_PREV
+
+    if values is not None:
+        query = query.filter(keyset_condition(keys, values, backwards))
+
+    ordering: List = []
+    for _, column, order in keys:
+        ordering.append(column.asc() if (order == "asc") != backwards else column.desc())
+
+    items = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if backwards:
+        items.reverse()
+
+    # walking backwards there is always a next page: the one the cursor came from
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else values is not None
+
+    next_cursor = None
+    prev_cursor = None
+
+    if items and has_next:
+        next_cursor = encode_cursor(CURSOR_NEXT, keys, items[-1])
+
+    if items and has_prev:
+        prev_cursor = encode_cursor(CURSOR_PREV, keys, items[0])
+
+    return KeysetPagination(items, per_page, next_cursor, prev_cursor)
+
+
+def estimate_count(query) -> int:
+    """
+    Returns the number of rows of a query according to the database planner statistics.
+
+    PostgreSQL uses pg_class.reltuples for unfiltered queries and the EXPLAIN row estimate
+    otherwise. SQLite uses sqlite_stat1 for unfiltered queries when ANALYZE has been run. Any
+    other case falls back to an exact count.
+
+    A query filtered only by the soft delete condition (`is_deleted IS false`, added by every
+    listing) counts as unfiltered: the estimate then includes the soft deleted rows.
+
+    Args:
+        query (Query): SQLAlchemy query
+
+    Returns:
+        int: estimated number of rows
+    """
+    query = query.order_by(None)
+    statement = query.statement
+    session = query.session
+    dialect = session.get_bind().dialect
+    table = query.column_descriptions[0]["entity"].__table__.name
+    unfiltered = is_unfiltered(statement.whereclause)
+    estimate = None
+
+    if dialect.name == "postgresql":
+        if unfiltered:
+            estimate = session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {"table": table},
+            ).scalar()
+
+        if estimate is None or estimate < 0:
+            compiled = statement.compile(dialect=dialect)
+            plan = session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+            estimate = plan[0]["Plan"]["Plan Rows"]
+
+    elif dialect.name == "sqlite" and unfiltered:
+        try:
+            stat = session.execute(text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table"), {"table": table}).scalar()
+        except Exception:
+            stat = None
+
+        if stat:
+            estimate = int(stat.split(" ")[0])
+
+    if estimate is None:
+        estimate = query.count()
+
+    return int(estimate)
+
+
+def is_unfiltered(whereclause) -> bool:
+    """
+    True when a WHERE clause is empty or only excludes the soft deleted rows.
+    """
+    if whereclause is None:
+        return True
+
+    return (
+        isinstance(whereclause, BinaryExpression)
+        and getattr(whereclause.left, "key", None) == "is_deleted"
+        and whereclause.operator in (operators.is_, operators.eq)
+        and isinstance(whereclause.right, False_)
+    )
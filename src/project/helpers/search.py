@@ -0,0 +1,197 @@
+"""
+Full text search backends.
+
+A model declares the columns it is searched by with a `search_columns` classmethod and
+`apply_search` filters and ranks a query with the backend of the database:
+
+- PostgreSQL: ILIKE on the concatenated columns, served by a pg_trgm GIN expression index
+  and ranked by word_similarity. Infix matches keep working, whole words and word prefixes
+  rank first.
+- SQLite: an external content FTS5 table `<table>_search` kept in sync by triggers, queried
+  with prefix terms and ranked by bm25.
+- Anything else, or a database without the index: ILIKE '%word%' on each column.
+
+Every word of the search term must match. The indexes are created by the migrations, the
+backend of each engine and table is detected once and cached.
+"""
+
+from threading import Lock
+from typing import Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, column, func, literal_column, or_, table
+from sqlalchemy.sql import text
+
+SEARCH_AUTO = "auto"
+SEARCH_LIKE = "like"
+
+_backends = {}
+_backends_lock = Lock()
+
+
+class LikeSearch:
+    """
+    ILIKE '%word%' on any of the columns, a full scan of the table.
+    """
+
+    name = SEARCH_LIKE
+
+    def __init__(self, model, columns: list):
+        self.model = model
+        self.columns = columns
+
+    def apply(self, query, words: list) -> Tuple[object, Optional[object]]:
+        """
+        Filters the query by every word.
+
+        Returns:
+            tuple: the filtered query and an ORDER BY expression ranking the best match first, or None
+        """
+        conditions = [
+            or_(*(column_.ilike(f"%{escape_like(word)}%", escape="\\") for column_ in self.columns)) for word in words
+        ]
+        return query.filter(and_(*conditions)), None
+
+
+class TrigramSearch(LikeSearch):
+    """
+    PostgreSQL pg_trgm search. The document expression must match the one of the GIN index
+    created by the migration for the planner to use it.
+    """
+
+    name = "trigram"
+
+    def __init__(self, model, columns: list):
+        super().__init__(model, columns)
+        self.document = literal_column(document_expression(model.__table__.name, [column_.key for column_ in columns]))
+
+    def apply(self, query, words: list):
+        conditions = [self.document.ilike(f"%{escape_like(word)}%", escape="\\") for word in words]
+        rank = func.word_similarity(" ".join(words), self.document).desc()
+        return query.filter(and_(*conditions)), rank
+
+
+class Fts5Search(LikeSearch):
+    """
+    SQLite FTS5 search on the `<table>_search` external content table.
+    """
+
+    name = "fts5"
+
+    def __init__(self, model, columns: list):
+        super().__init__(model, columns)
+        self.index = table(f"{model.__table__.name}_search", column("rowid"), column("rank"))
+
+    def apply(self, query, words: list):
+        # each word is quoted, so FTS5 operators in the input are plain text, and matched as a prefix
+        expression = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+        query = query.join(self.index, self.index.c.rowid == self.model.id).filter(
+            literal_column(self.index.name).op("MATCH")(expression)
+        )
+        return query, self.index.c.rank.asc()
+
+    @staticmethod
+    def ddl(table_name: str, columns: list) -> list:
+        """
+        Statements creating the FTS5 table of a table, its sync triggers and its initial content.
+        """
+        index = f"{table_name}_search"
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{name}" for name in columns)
+        old = ", ".join(f"old.{name}" for name in columns)
+
+        return [
+            f"CREATE VIRTUAL TABLE {index} USING fts5({names}, content='{table_name}', content_rowid='id', "
+            "prefix='2 3')",
+            f"CREATE TRIGGER {index}_ai AFTER INSERT ON {table_name} BEGIN "
+            f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER {index}_ad AFTER DELETE ON {table_name} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER {index}_au AFTER UPDATE OF {names} ON {table_name} BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new}); END",
+            f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+        ]
+
+
+def document_expression(table_name: str, columns: list) -> str:
+    """
+    The searched document of a row: its columns separated by spaces.
+    coalesce and || are immutable, concat_ws is not and could not be indexed.
+    """
+    return " || ' ' || ".join(f"coalesce({table_name}.{name}, '')" for name in columns)
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def detect_backend(session, model, columns: list) -> LikeSearch:
+    """
+    Picks the backend whose index exists in the database.
+    """
+    dialect = session.get_bind().dialect.name
+    table_name = model.__table__.name
+
+    if dialect == "postgresql":
+        installed = session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+        if installed:
+            return TrigramSearch(model, columns)
+
+    elif dialect == "sqlite":
+        exists = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": f"{table_name}_search"}
+        ).scalar()
+        if exists:
+            return Fts5Search(model, columns)
+
+    return LikeSearch(model, columns)
+
+
+def get_backend(session, model) -> LikeSearch:
+    """
+    Returns the search backend of a model for the engine of the session, detected once.
+    """
+    columns = model.search_columns()
+
+    if current_app.config.get("SEARCH_BACKEND", SEARCH_AUTO) == SEARCH_LIKE:
+        return LikeSearch(model, columns)
+
+    key = (str(session.get_bind().url), model)
+    backend = _backends.get(key)
+
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                backend = _backends[key] = detect_backend(session, model, columns)
+
+    return backend
+
+
+def apply_search(query, model, term: str) -> Tuple[object, Optional[object]]:
+    """
+    Filters a query of a model by a search term.
+
+    Args:
+        query (Query): SQLAlchemy query of the model
+        model (Model): model declaring `search_columns`
+        term (str): words to search, each one must match
+
+    Returns:
+        tuple: the filtered query and an ORDER BY expression ranking the best match first, or None
+    """
+    words = term.split() if term else []
+
+    if not words:
+        return query, None
+
+    return get_backend(query.session, model).apply(query, words)
+
+
+def cache_clear() -> None:
+    """
+    Forgets the detected backends, ie: after creating or dropping an index.
+    """
+    with _backends_lock:
+        _backends.clear()
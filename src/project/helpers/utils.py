@@ -94,16 +94,14 @@ def get_ip_address(localhost: str = "54.232.165.254"):
     """
     Gets the real ip address.
 
+    X-Forwarded-For is not read here: the client controls its first entries. Behind proxies set
+    PROXY_FIX_X_FOR and ProxyFix puts the address seen by the outermost trusted one in remote_addr.
+
     > Se more details [here](https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/X-Forwarded-For)
     """
-    if "X-Forwarded-For" in request.headers:
-        proxy_data = request.headers["X-Forwarded-For"]
-        ip_list = proxy_data.split(",")
-        return ip_list[0]  # first address in list is User IP
-    else:
-        if request.remote_addr == "127.0.0.1":
-            return localhost
-        return request.remote_addr  # For local development
+    if request.remote_addr == "127.0.0.1":
+        return localhost  # For local development
+    return request.remote_addr
 
 
 def is_ip_private(ipv4: str):
@@ -1,11 +1,218 @@
+import atexit
+import logging
+import os
+import time
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+
 import requests
 from flask import current_app
+from requests.adapters import HTTPAdapter
+
+# https://discord.com/developers/docs/resources/webhook#execute-webhook
+DISCORD_MAX_CONTENT_LENGTH = 2000
+
+logger = logging.getLogger(__name__)
+
+
+class DiscordNotifier:
+    """
+    Sends Discord webhook messages from a background thread.
+
+    Messages posted within DISCORD_FLUSH_INTERVAL seconds are coalesced into as few requests as
+    the 2000 characters content limit allows. Requests share a pooled session, have a timeout
+    and honour the 429 Retry-After and X-RateLimit-* headers. The thread and the session are
+    created lazily once per process, so gunicorn workers never share them after a fork.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pid = None
+        self.queue = None
+        self.thread = None
+        self.session = None
+        self.flush_interval = 1.0
+        self.timeout = 5
+        self.max_retries = 3
+        self.max_queue_size = 1000
+        self.blocked_until = 0.0
+
+        atexit.register(self.flush)
+
+    def configure(self, config: dict):
+        """Read the notifier settings from the app config."""
+        self.flush_interval = config.get("DISCORD_FLUSH_INTERVAL", 1.0)
+        self.timeout = config.get("DISCORD_TIMEOUT", 5)
+        self.max_retries = config.get("DISCORD_MAX_RETRIES", 3)
+        self.max_queue_size = config.get("DISCORD_MAX_QUEUE_SIZE", 1000)
+
+    def start(self):
+        """Create the queue, the session and the flusher thread for the current process."""
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.session = requests.Session()
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+            self.queue = Queue(maxsize=self.max_queue_size)
+            self.thread = Thread(target=self.worker, name="discord-notifier", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def send(self, url: str, message: str) -> bool:
+        """
+        Queues a message.
+
+        Returns:
+            bool: False if the queue is full and the message was dropped
+        """
+        self.start()
+
+        try:
+            self.queue.put_nowait((url, message))
+        except Full:
+            logger.error("Discord queue is full, message dropped")
+            return False
+
+        return True
+
+    def worker(self):
+        """Flusher loop: waits for a message, collects the following ones and posts them."""
+        while True:
+            try:
+                self.post_batch(self.collect(block=True))
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Discord batch failed, messages dropped")
+
+    def collect(self, block: bool = True) -> dict:
+        """Drain the queue for up to flush_interval seconds, grouping the messages by webhook."""
+        batch = {}
+
+        try:
+            url, message = self.queue.get(block=block)
+        except Empty:
+            return batch
+
+        batch.setdefault(url, []).append(message)
+        deadline = time.monotonic() + (self.flush_interval if block else 0)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                url, message = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except Empty:
+                return batch
+            batch.setdefault(url, []).append(message)
+
+    def flush(self):
+        """Post every queued message from the calling thread, ie: at exit."""
+        if self.queue is None or self.pid != os.getpid():
+            return
+
+        while not self.queue.empty():
+            self.post_batch(self.collect(block=False))
+
+    def post_batch(self, batch: dict):
+        for url, messages in batch.items():
+            for content in chunk_messages(messages):
+                self.post(url, content)
+
+    def post(self, url: str, content: str) -> bool:
+        """
+        Posts a single message waiting for the rate limit windows.
+
+        Returns:
+            bool: True if success
+        """
+        if self.session is None:
+            self.start()
+
+        for _ in range(self.max_retries):
+            wait = self.blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                response = self.session.post(url, json={"content": content}, timeout=self.timeout)
+            except requests.RequestException as error:
+                logger.error(f"Discord webhook request failed: {error}")
+                return False
+
+            if response.status_code == 429:
+                self.blocked_until = time.monotonic() + retry_after(response)
+                continue
+
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                self.blocked_until = time.monotonic() + reset_after(response)
+
+            return response.status_code in (200, 204)
+
+        logger.error("Discord webhook rate limit retries exhausted, message dropped")
+        return False
+
+
+def retry_after(response) -> float:
+    """Seconds to wait after a 429 response, from the Retry-After header or the json body."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        pass
+
+    try:
+        return float(response.json().get("retry_after", 1))
+    except (ValueError, AttributeError):
+        return 1.0
+
+
+def reset_after(response) -> float:
+    """Seconds until the rate limit window resets, from the X-RateLimit-Reset-After header."""
+    try:
+        return float(response.headers.get("X-RateLimit-Reset-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def chunk_messages(messages: list, limit: int = DISCORD_MAX_CONTENT_LENGTH) -> list:
+    """Joins messages with new lines in chunks no longer than the Discord content limit."""
+    chunks = []
+    current = ""
+
+    for message in messages:
+        message = str(message)
+
+        while len(message) > limit:
+            chunks.append(message[:limit])
+            message = message[limit:]
+
+        if not message:
+            continue
+
+        if current and len(current) + 1 + len(message) > limit:
+            chunks.append(current)
+            current = message
+        else:
+            current = f"{current}\n{message}" if current else message
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+notifier = DiscordNotifier()
 
 
 def post_discord_message(message: str):
     """
     Sends a message through Discord Webhooks
 
+    The message is queued and posted in batch by the notifier thread unless
+    DISCORD_BATCHING is disabled.
+
     Args:
         message: String to send
     Responses:
@@ -14,18 +221,15 @@ def post_discord_message(message: str):
 
     # TODO: Revisar este link: https://discord.com/moderation/4405223159703-322-using-webhooks-and-embeds
 
-    payload = {"content": message}
-
     base_url = current_app.config.get("DISCORD_WEBHOOK_URL")
 
     if not base_url:
         current_app.logger.error("DISCORD_WEBHOOK_URL is missing in .env")
         return False
 
-    headers = {
-        "Content-Type": "application/json",
-    }
+    notifier.configure(current_app.config)
 
-    response = requests.post(base_url, headers=headers, json=payload)
+    if not current_app.config.get("DISCORD_BATCHING", True):
+        return notifier.post(base_url, message)
 
-    return response.status_code == 204
+    return notifier.send(base_url, message)
@@ -1,16 +1,362 @@
+import atexit
 import json
-from src.project.app import aws
-from botocore.exceptions import ClientError
+import logging
+import os
+import random
+import time
+from threading import Event, Lock, Thread
+
+from botocore.exceptions import BotoCoreError, ClientError, ConnectTimeoutError, EndpointConnectionError
+from celery import shared_task
+from flask import current_app
+
+from src.project.app import aws, emails
+
+FROM_ADDRESS = "Morfi <no-reply@morfi.pro>"
+REPLY_ADDRESS = "no-reply@morfi.pro"
+RETURN_PATH = "no-reply@morfi.pro"
+
+# https://docs.aws.amazon.com/ses/latest/APIReference/API_SendBulkTemplatedEmail.html
+SES_MAX_BULK_DESTINATIONS = 50
+
+# Destination statuses (and request error codes) worth another attempt
+RETRYABLE_STATUSES = {
+    "TransientFailure",
+    "Failed",
+    "AccountThrottled",
+    "Throttling",
+    "ThrottlingException",
+    "ServiceUnavailable",
+}
+
+# SES templates sent by send_templated_email, created or updated by `flask email templates`.
+# Values use the SES (Handlebars) syntax: {{name}} is replaced with the template data.
+SES_TEMPLATES = {
+    "welcome": {
+        "SubjectPart": "Welcome to Morfi, {{name}}",
+        "HtmlPart": "<p>Hi {{name}},</p><p>Your Morfi account is ready.</p>",
+        "TextPart": "Hi {{name}},\n\nYour Morfi account is ready.",
+    },
+    "login": {
+        "SubjectPart": "New sign in to your Morfi account",
+        "HtmlPart": "<p>Hi {{name}},</p><p>You have signed in {{sign_in_count}} times.</p>",
+        "TextPart": "Hi {{name}},\n\nYou have signed in {{sign_in_count}} times.",
+    },
+    "password_reset": {
+        "SubjectPart": "Password Reset",
+        "HtmlPart": "<p>Hi {{name}},</p><p>Use this token to reset your password:</p><p>{{token}}</p>",
+        "TextPart": "Hi {{name}},\n\nUse this token to reset your password:\n\n{{token}}",
+    },
+}
+
+logger = logging.getLogger(__name__)
 
 
 def send_email(name: str, address: str, subject: str, body: str):
+    """
+    Sends a plain text email.
+
+    With EMAIL_BACKEND = "ses" the email is sent by a Celery task, otherwise it is printed.
+    """
+    if current_app.config.get("EMAIL_BACKEND", "console") == "ses":
+        send_email_task.delay(address, subject, body)
+        return
+
     print("==================================-")
-    print("Sending email to {name} ({address})")
+    print(f"Sending email to {name} ({address})")
     print("==================================-")
     print(f"Subject: {subject}")
     print(body)
 
 
+def send_templated_email(template_name: str, name: str, address: str, data: dict = None):
+    """
+    Sends an email rendered from a SES template.
+
+    With EMAIL_BACKEND = "ses" the destination is queued and sent with the other destinations
+    of the same template by a send_bulk_templated_email task (see BulkEmailQueue), otherwise
+    it is printed.
+    """
+    if current_app.config.get("EMAIL_BACKEND", "console") == "ses":
+        bulk_queue.configure(current_app.config)
+        bulk_queue.add(template_name, address, data)
+        return
+
+    print("==================================-")
+    print(f"Sending email to {name} ({address})")
+    print("==================================-")
+    print(f"Template: {template_name}")
+    print(json.dumps(data or {}, default=str))
+
+
+@shared_task(name="email.send_email", ignore_result=True)
+def send_email_task(address: str, subject: str, body: str):
+    """Celery task that sends a plain text email through SES."""
+    email = EmailService(address, subject)
+    email.body(html=body, plain=body)
+    email.send()
+
+
+class BulkEmail:
+    """
+    Accumulates the destinations of a SES template and sends them with send_bulk_templated_email.
+
+    Destinations are sent in chunks of up to 50 (the SES limit) and the ones that fail with a
+    transient status are retried with an exponential backoff. `send` returns the status of
+    every destination, `enqueue` hands the whole batch to a Celery task instead.
+
+    Args:
+        template_name: SES template name
+        default_data: Template data used when a destination does not define a value
+    """
+
+    def __init__(self, template_name: str, default_data: dict = None):
+        self.template_name = template_name
+        self.default_data = default_data or {}
+        self.destinations = []
+
+        self.from_address = FROM_ADDRESS
+        self.reply_address = REPLY_ADDRESS
+
+    def __len__(self):
+        return len(self.destinations)
+
+    def add(self, address: str, data: dict = None):
+        """Adds a destination with its own template data."""
+        self.destinations.append({"address": address, "data": data or {}})
+
+    def reset(self):
+        self.destinations = []
+
+    def enqueue(self):
+        """
+        Sends the accumulated destinations from a Celery worker.
+
+        Returns:
+            AsyncResult: Celery result with the per destination status
+        """
+        if not self.destinations:
+            return None
+
+        result = send_bulk_templated_email.delay(
+            self.template_name,
+            self.destinations,
+            self.default_data,
+            self.from_address,
+            self.reply_address,
+        )
+        self.reset()
+        return result
+
+    def send(self, client=None, max_attempts: int = None, backoff: float = None) -> list:
+        """
+        Sends the accumulated destinations.
+
+        Args:
+            client: SES client, defaults to the AWSManager one
+            max_attempts: Attempts per destination, defaults to EMAIL_BULK_MAX_ATTEMPTS
+            backoff: Seconds to wait before the first retry, doubled on every retry
+
+        Returns:
+            list: One dict per destination with address, status, message_id, error and attempts
+        """
+        ses = client or aws.get_client("ses")
+        max_attempts = max_attempts or current_app.config.get("EMAIL_BULK_MAX_ATTEMPTS", 3)
+        backoff = current_app.config.get("EMAIL_BULK_BACKOFF", 0.5) if backoff is None else backoff
+        chunk_size = min(current_app.config.get("EMAIL_BULK_CHUNK_SIZE", 50), SES_MAX_BULK_DESTINATIONS)
+
+        results = [None] * len(self.destinations)
+        pending = list(enumerate(self.destinations))
+
+        for attempt in range(1, max_attempts + 1):
+            retry = []
+
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start : start + chunk_size]
+
+                for (index, destination), status in zip(chunk, self.send_chunk(ses, chunk)):
+                    results[index] = {
+                        "address": destination["address"],
+                        "status": status.get("Status"),
+                        "message_id": status.get("MessageId"),
+                        "error": status.get("Error"),
+                        "attempts": attempt,
+                    }
+                    if status.get("Status") in RETRYABLE_STATUSES:
+                        retry.append((index, destination))
+
+            if not retry or attempt == max_attempts:
+                break
+
+            pending = retry
+            time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+        self.reset()
+        return results
+
+    def send_chunk(self, ses, chunk: list) -> list:
+        """
+        Sends up to 50 destinations in a single request.
+
+        Returns:
+            list: SES BulkEmailDestinationStatus for every destination, request errors are
+            reported as the status of each destination of the chunk
+        """
+        try:
+            response = ses.send_bulk_templated_email(
+                Source=self.from_address,
+                ReplyToAddresses=[self.reply_address],
+                Template=self.template_name,
+                DefaultTemplateData=json.dumps(self.default_data),
+                Destinations=[
+                    {
+                        "Destination": {"ToAddresses": [destination["address"]]},
+                        "ReplacementTemplateData": json.dumps(destination["data"]),
+                    }
+                    for _, destination in chunk
+                ],
+            )
+        except ClientError as error:
+            code = error.response.get("Error", {}).get("Code", "Failed")
+            message = error.response.get("Error", {}).get("Message", str(error))
+            return [{"Status": code, "Error": message}] * len(chunk)
+        except (EndpointConnectionError, ConnectTimeoutError) as error:
+            # the request never reached SES, the chunk may be sent again
+            return [{"Status": "TransientFailure", "Error": f"{type(error).__name__}: {error}"}] * len(chunk)
+        except BotoCoreError as error:
+            # ie: a read timeout, SES may have sent the chunk already and a retry would duplicate it
+            return [{"Status": type(error).__name__, "Error": str(error)}] * len(chunk)
+
+        return response["Status"]
+
+
+class BulkEmailQueue:
+    """
+    Coalesces the templated emails sent by the requests of a process.
+
+    Destinations are grouped by template and handed to a send_bulk_templated_email task when a
+    template reaches EMAIL_BULK_CHUNK_SIZE destinations or, from a background thread, every
+    EMAIL_BULK_FLUSH_INTERVAL seconds. Each SES request then carries up to 50 recipients
+    instead of one. The thread is created lazily once per process, queued destinations of a
+    killed process are lost.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = 1.0
+        self.chunk_size = SES_MAX_BULK_DESTINATIONS
+
+        self.pending = {}
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.pid = None
+        self.thread = None
+
+        atexit.register(self.flush)
+
+    def configure(self, config: dict):
+        """Read the queue settings from the app config."""
+        self.flush_interval = config.get("EMAIL_BULK_FLUSH_INTERVAL", 1.0)
+        self.chunk_size = min(config.get("EMAIL_BULK_CHUNK_SIZE", 50), SES_MAX_BULK_DESTINATIONS)
+
+    def start(self):
+        """Start the flusher thread once per process (threads do not survive a fork)."""
+        if self.pid == os.getpid():
+            return
+
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+
+            self.app = current_app._get_current_object()  # pylint: disable=protected-access
+            self.pending = {}
+            self.thread = Thread(target=self.worker, name="bulk-email", daemon=True)
+            self.thread.start()
+            self.pid = os.getpid()
+
+    def add(self, template_name: str, address: str, data: dict = None):
+        """Queues a destination of a template, full chunks are enqueued right away."""
+        self.start()
+
+        with self.lock:
+            destinations = self.pending.setdefault(template_name, [])
+            destinations.append({"address": address, "data": data or {}})
+
+            if len(destinations) < self.chunk_size:
+                return
+
+            del self.pending[template_name]
+
+        self.enqueue(template_name, destinations)
+
+    def size(self) -> int:
+        return sum(len(destinations) for destinations in self.pending.values())
+
+    def worker(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Bulk email flush failed")
+
+    def flush(self) -> int:
+        """
+        Enqueues every queued destination.
+
+        Returns:
+            int: Number of destinations enqueued
+        """
+        if self.app is None or self.pid != os.getpid():
+            return 0
+
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        for template_name, destinations in pending.items():
+            self.enqueue(template_name, destinations)
+
+        return sum(len(destinations) for destinations in pending.values())
+
+    def enqueue(self, template_name: str, destinations: list):
+        with self.app.app_context():
+            email = BulkEmail(template_name)
+            email.destinations = destinations
+            email.enqueue()
+
+
+bulk_queue = BulkEmailQueue()
+
+
+@shared_task(name="email.send_bulk_templated_email")
+def send_bulk_templated_email(
+    template_name: str,
+    destinations: list,
+    default_data: dict = None,
+    from_address: str = FROM_ADDRESS,
+    reply_address: str = REPLY_ADDRESS,
+) -> list:
+    """Celery task that sends a BulkEmail and logs the destinations that could not be delivered."""
+    email = BulkEmail(template_name, default_data)
+    email.from_address = from_address
+    email.reply_address = reply_address
+
+    for destination in destinations:
+        email.add(destination["address"], destination.get("data"))
+
+    results = email.send()
+
+    for result in results:
+        if result["status"] != "Success":
+            current_app.logger.error(
+                f"Bulk email {template_name} to {result['address']} failed: {result['status']} {result['error']}"
+            )
+
+    return results
+
+
 class EmailService:
     def __init__(self, to_address: str, subject: str):
         self._to = []
@@ -22,9 +368,9 @@ class EmailService:
         self._html = None
         self._text = None
 
-        self._from_address = "Morfi <no-reply@morfi.pro>"
-        self._reply_address = "no-reply@morfi.pro"
-        self._return_path = "no-reply@morfi.pro"
+        self._from_address = FROM_ADDRESS
+        self._reply_address = REPLY_ADDRESS
+        self._return_path = RETURN_PATH
 
     def add_to(self, email: str):
         self._to.append(email)
@@ -42,8 +388,11 @@ class EmailService:
         self._html = html
         self._text = plain
 
-    def template(self, filename: str, context: dict):
-        self._html = self._render(filename, context)
+    def template(self, filename: str, context: dict, locale: str = None):
+        self._html = self._render(filename, context, locale)
+
+    def _render(self, filename: str, context: dict, locale: str = None) -> str:
+        return emails.render(filename, context, locale)
 
     def reset(self):
         self._subject = None
@@ -120,3 +469,31 @@ class SesTemplates:
     def get_templates(cls):
         ses = aws.get_client("ses")
         return ses.list_templates()
+
+    @classmethod
+    def create(cls, template_name: str) -> str:
+        """
+        Creates a template of SES_TEMPLATES, or updates it when it already exists.
+
+        Returns:
+            str: "created" or "updated"
+        """
+        ses = aws.get_client("ses")
+        template = {"TemplateName": template_name, **SES_TEMPLATES[template_name]}
+
+        try:
+            ses.create_template(Template=template)
+            return "created"
+        except ses.exceptions.AlreadyExistsException:
+            ses.update_template(Template=template)
+            return "updated"
+
+    @classmethod
+    def sync(cls) -> dict:
+        """
+        Creates or updates every template of SES_TEMPLATES.
+
+        Returns:
+            dict: "created" or "updated" per template name
+        """
+        return {template_name: cls.create(template_name) for template_name in SES_TEMPLATES}
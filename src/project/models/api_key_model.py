@@ -6,9 +6,12 @@ class ApiKey(db.Model):
     __tablename__ = "api_keys"
 
     id = db.Column(db.Integer, primary_key=True)
-    key = db.Column(db.String(50), unique=True)
+    # SHA-256 hex digest of the key, the key itself is never stored
+    key = db.Column(db.String(64), unique=True)
     is_active = db.Column(db.Boolean, default=False, index=True)
     permissions = db.Column(db.Integer)
+    request_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_used_at = db.Column(db.DateTime(timezone=True))
 
     @classmethod
     def mappings(cls):
@@ -1,4 +1,5 @@
-from src.project.app import db
+from src.project.app import db, near
+from src.project.extensions.flask_near_cache import detached
 
 
 class Permission:
@@ -37,10 +38,14 @@ class Role(db.Model):
     @classmethod
     def get_default_role(cls):
         """
-        Returns the default role entity.
+        Returns the default role entity, from the near cache.
 
-        :param email: Email
-        :type email: str
-        :return: User instance
+        :return: Role instance of the current session
         """
-        return cls.query.filter(cls.default.is_(True)).first()
+        role = near.get_or_set(
+            "default-role",
+            lambda: detached(cls.query.filter(cls.default.is_(True)).first()),
+            tags=(cls,),
+        )
+
+        return db.session.merge(role, load=False) if role is not None else None
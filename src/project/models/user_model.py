@@ -1,13 +1,13 @@
 from datetime import datetime
 import pytz
 
-from sqlalchemy import and_, or_
-from sqlalchemy.orm.attributes import flag_modified
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import and_, func
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
 
-from src.project.app import db
+from src.project.app import activity, db, passwords
 from src.project.exceptions import CustomException
 from src.project.helpers import random_num, encode_object, decode_string, get_ip_address
+from src.project.helpers.search import apply_search
 
 
 class User(db.Model):
@@ -20,7 +20,7 @@ class User(db.Model):
     first_name = db.Column(db.String(50))
     last_name = db.Column(db.String(50))
     email = db.Column(db.String(150), nullable=False, unique=True, index=True)
-    password = db.Column(db.String(128))
+    password = db.Column(db.String(255))
     activation_code = db.Column(db.String(10))
     role_id = db.Column(db.Integer, db.ForeignKey("roles.id"))
 
@@ -54,51 +54,57 @@ class User(db.Model):
     @classmethod
     def get_data(cls, search: str = None, start: int = 0, length: int = 10, sort: str = None, **kwargs):
         query = cls.query
+        rank = None
 
-        # search filter
+        # search filter, served by the full text index of the database (see helpers/search.py)
         if search:
-            query = query.filter(
-                or_(
-                    cls.first_name.ilike(f"%{search}%"),
-                    cls.last_name.ilike(f"%{search}%"),
-                    cls.email.ilike(f"%{search}%"),
-                )
-            )
-
-        total = query.count()
+            query, rank = apply_search(query, cls, search)
 
+        order = []
         if sort:
-            order = []
             for s in sort.split(","):
                 if s.startswith("-"):
                     order.append(getattr(cls, s[1:]).desc())
                 else:
-                    order.append(getattr(cls, s[1:]).asc())
-            if order:
-                query = query.order_by(*order)
+                    order.append(getattr(cls, s.lstrip("+")).asc())
+
+        # best matches first unless the table is sorted by a column
+        if not order and rank is not None:
+            order = [rank, cls.id.asc()]
+
+        if order:
+            query = query.order_by(*order)
 
-        query = query.offset(start).limit(length)
+        # the total comes with the page rows instead of a second COUNT query
+        rows = query.add_columns(func.count().over().label("total")).offset(start).limit(length).all()
+        total = rows[0].total if rows else (query.order_by(None).count() if start else 0)
 
         return {
-            "data": [cls.to_dict(user) for user in query.all()],
+            "data": [cls.to_dict(user) for user, _ in rows],
             "total": total,
             "per_page": length,
         }
 
+    @classmethod
+    def search_columns(cls):
+        return [cls.first_name, cls.last_name, cls.email]
+
+    @staticmethod
+    def event_fields():
+        """Columns copied to async event subscribers, never the password hash or the activation code."""
+        return ["id", "first_name", "last_name", "email", "role_id", "sign_in_count", "is_active", "created_at"]
+
     @staticmethod
     def encrypt_password(password: str):
         """
-        Hash a plaintext string using PBKDF2. This is good enough according
-        to the NIST (National Institute of Standards and Technology).
-
-        In other words while bcrypt might be superior in practice, if you use
-        PBKDF2 properly (which we are), then your passwords are safe.
+        Hash a plaintext string with the PASSWORD_HASHER scheme (scrypt by
+        default, pbkdf2 or argon2).
 
         :param password: Password in plain text
         :type password: str
         :return: str
         """
-        return generate_password_hash(password) if password else None
+        return passwords.hash(password) if password else None
 
     @classmethod
     def find_by_email(cls, email: str):
@@ -141,9 +147,19 @@ class User(db.Model):
         """
         Compare clean and hashed password.
 
+        When the password matches a hash made with an outdated scheme or cost,
+        the password is hashed again. The new hash is stored on the next save,
+        ie: by update_activity_tracking on login.
+
         Returns `True` if the password matched, `False` otherwise.
         """
-        return check_password_hash(self.password, password)
+        if not passwords.verify(self.password, password):
+            return False
+
+        if passwords.needs_rehash(self.password):
+            self.password = self.encrypt_password(password)
+
+        return True
 
     def activation_code_expired(self) -> bool:
         """
@@ -175,10 +191,31 @@ class User(db.Model):
         Update various fields on the user that's related to meta data on their
         account, such as the sign in count and ip address, etc..
 
+        With ACTIVITY_TRACKING_BUFFERED the row is updated later in bulk by the
+        activity tracker, the instance only reflects the new values.
+
         :param ip_address: IP address
         :type ip_address: str
         :return: SQLAlchemy commit results
         """
+        if activity.buffered:
+            now = datetime.utcnow()
+            ip_address = ip_address or get_ip_address()
+            activity.track(self.__table__, self.id, now, ip_address)
+
+            # Committed values so a later commit does not write the columns again
+            set_committed_value(self, "sign_in_count", self.sign_in_count + 1)
+            set_committed_value(self, "last_sign_in_at", self.current_sign_in_at)
+            set_committed_value(self, "last_sign_in_ip", self.current_sign_in_ip)
+            set_committed_value(self, "current_sign_in_at", now)
+            set_committed_value(self, "current_sign_in_ip", ip_address)
+
+            # Other pending changes, ie: a password rehashed on login, are still saved
+            if db.session.is_modified(self):
+                return self.save()
+
+            return None
+
         self.sign_in_count += 1
         self.last_sign_in_at = self.current_sign_in_at
         self.last_sign_in_ip = self.current_sign_in_ip
@@ -1,17 +1,20 @@
 from flask import Blueprint, request
+from src.project.app import responses
 from src.project.models import User
 
 api_bp = Blueprint("users", __name__, url_prefix="/api")
 
 
 @api_bp.get("/users")
+@responses.cached(tags=(User,), per_identity=False)
 def get_data():
     """
     Get data for the DataTables table.
     """
     search = request.args.get("search", None)
     sort = request.args.get("sort", None)
-    start = request.args.get("start", type=int, default=-1)
-    length = request.args.get("length", type=int, default=-1)
+    start = request.args.get("start", type=int, default=0)
+    length = request.args.get("length", type=int, default=10)
 
-    return User.get_data(**request.args)
+    # DataTables sends length -1 to show every row
+    return User.get_data(search=search, start=max(start, 0), length=length if length >= 0 else None, sort=sort)
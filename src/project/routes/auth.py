@@ -1,13 +1,14 @@
 from flask import Blueprint, current_app, render_template
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
-from src.project.app import api, schema, validator
+from src.project.app import api, limiter, schema, validator
 from src.project.services import AuthService
 
 auth_bp = Blueprint("auth", __name__)
 
 
 @auth_bp.post("/auth/registrations")
+@limiter.limit("auth.registrations", ip=(10, 3600), api_key=(600, 60))
 @validator(
     "json",
     {
@@ -55,6 +56,7 @@ def activate_registration():
 
 
 @auth_bp.post("/auth/tokens")
+@limiter.limit("auth.tokens", ip=(20, 60), email=(5, 300), api_key=(600, 60))
 def create_token():
     """
     Creates an access token for a give pair of credentials.
@@ -84,6 +86,7 @@ def delete_token():
 
 
 @auth_bp.post("/auth/passwords/reset")
+@limiter.limit("auth.passwords.reset", ip=(10, 3600), email=(3, 3600), api_key=(600, 60))
 @validator(
     "json",
     {"email": ["required", "max:150"]},
@@ -1,4 +1,6 @@
-from flask import Blueprint, request
+from flask import Blueprint, Response, abort, request
+
+from src.project.extensions import healthcheck, metrics
 
 health_bp = Blueprint("health", __name__)
 
@@ -6,3 +8,23 @@ health_bp = Blueprint("health", __name__)
 @health_bp.get("/health")
 def health_check():
     return {"status": True}, 200
+
+
+@health_bp.get("/health/live")
+def liveness_check():
+    return healthcheck.liveness(), 200
+
+
+@health_bp.get("/health/ready")
+def readiness_check():
+    report = healthcheck.check()
+    return report, 200 if report["status"] == "ok" else 503
+
+
+@health_bp.get("/metrics")
+def prometheus_metrics():
+    if not metrics.enabled:
+        abort(404)
+
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
@@ -1,13 +1,9 @@
-from flask import Blueprint, current_app
-from jinja2 import Environment, PackageLoader
+from flask import Blueprint
 
-from src.project.app import api
-from src.project.helpers import get_default_email_template_params
+from src.project.app import api, emails
 
 toolbox_bp = Blueprint("toolbox", __name__)
 
-env = Environment(loader=PackageLoader("src.project", "templates"))
-
 
 @toolbox_bp.get("/toolbox")
 def toolbox():
@@ -22,16 +18,13 @@ def email_templates():
     """
     Returns a list of available email templates.
     """
-    template = env.get_template("emails/base.html")
-
     # GREEN "PRIMARY_COLOR": "#1ca72c",
 
     context = {
-        **get_default_email_template_params(),
         "TITLE": "Activate your account",
         "BODY": "Hello,<br>please activate your account inmediatly.",
         "CTA_TEXT": "Activate account",
         "CTA_LINK": "https://app.morfi.pro",
     }
 
-    return template.render(context)
+    return emails.render("emails/base.html", context)
@@ -1,4 +1,8 @@
+import secrets
+
+from src.project.app import apikeys, db, near
 from src.project.exceptions import CustomException
+from src.project.extensions.flask_near_cache import detached
 from src.project.helpers.base_service import BaseService
 from src.project.repositories import ApiKeyRepository
 
@@ -12,4 +16,28 @@ class ApiKeyService(BaseService):
 
     @classmethod
     def get_actives_keys(cls):
-        return cls.get_model().query.filter(cls.get_model().is_active.is_(True)).all()
+        model = cls.get_model()
+        keys = near.get_or_set(
+            "active-api-keys",
+            lambda: [detached(key) for key in model.query.filter(model.is_active.is_(True)).all()],
+            tags=(model,),
+        )
+
+        return [db.session.merge(key, load=False) for key in keys]
+
+    @classmethod
+    def create_key(cls, permissions: int = 0, commit: bool = True) -> tuple:
+        """
+        Creates an active api key. Only its digest is stored, the key can not be read again.
+
+        Returns:
+            tuple: the ApiKey instance and the key
+        """
+        key = secrets.token_urlsafe(32)
+        instance = cls.get_model()(key=apikeys.digest(key), is_active=True, permissions=permissions)
+        db.session.add(instance)
+
+        if commit:
+            db.session.commit()
+
+        return instance, key
@@ -8,7 +8,7 @@ from flask_jwt_extended import (
 )
 
 from src.project.exceptions import CustomException
-from src.project.extensions import event, rediscache, schema
+from src.project.extensions import blocklist, event, schema
 from src.project.helpers import decode_string
 from src.project.helpers.base_service import BaseService
 from src.project.models import Role
@@ -158,15 +158,15 @@ class AuthService(BaseService):
     def logout(cls):
         """
         Gets the unique identifier of an encoded JWT,
-        and sets it in a rediscache service.
+        and revokes it in the blocklist (rediscache + pub/sub).
         """
 
         token = get_jwt()
         jti = token.get("jti")
         rjti = token.get("rjti")
 
-        rediscache.set(jti, "", timeout=current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES"))
-        rediscache.set(rjti, "", timeout=current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES"))
+        blocklist.revoke(jti, current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES"))
+        blocklist.revoke(rjti, current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES"))
 
     @classmethod
     def request_password_reset(cls, payload: dict = None):
@@ -1,9 +1,10 @@
 from src.project.libs.discord import post_discord_message
 from src.project.app import event
+from src.project.extensions.flask_event_manager import DISPATCH_ASYNC
 
 
 def handle_user_register_event(user):
-    post_discord_message(f"{user.first_name} has registered with email address {user.email} ({user.activation_code})")
+    post_discord_message(f"{user.first_name} has registered with email address {user.email}")
 
 
 def handle_user_activation_event(user):
@@ -15,5 +16,5 @@ def handle_user_login_event(user):
 
 
 def setup_discord_event_handlers():
-    event.subscribe("user_registered", handle_user_register_event)
-    event.subscribe("user_activated", handle_user_activation_event)
+    event.subscribe("user_registered", handle_user_register_event, dispatch=DISPATCH_ASYNC)
+    event.subscribe("user_activated", handle_user_activation_event, dispatch=DISPATCH_ASYNC)
@@ -1,24 +1,27 @@
-from src.project.libs.email import send_email
+from src.project.libs.email import send_templated_email
 from src.project.app import event
 from src.project.helpers import generate_url
 
 
 def handle_user_register_event(user):
-    # TODO: sends the email using Amazon SES
-    send_email(user.first_name, user.email, "Welcome", "Your password is PEPE")
+    send_templated_email("welcome", user.first_name, user.email, {"name": user.first_name})
 
 
 def handle_user_login_event(user):
-    # TODO: sends the email using Amazon SES
-    send_email(user.first_name, user.email, "Login Data", f"Login Counts {user.sign_in_count}")
+    send_templated_email(
+        "login",
+        user.first_name,
+        user.email,
+        {"name": user.first_name, "sign_in_count": user.sign_in_count},
+    )
 
 
 def handle_user_password_reset(user):
-    send_email(
+    send_templated_email(
+        "password_reset",
         user.first_name,
         user.email,
-        "Password Reset",
-        f"{user.encode()}",
+        {"name": user.first_name, "token": user.encode()},
     )
 
 
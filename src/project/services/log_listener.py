@@ -1,5 +1,6 @@
 from src.project.libs.log import log_message
 from src.project.app import event
+from src.project.extensions.flask_event_manager import DISPATCH_ASYNC
 
 
 def handle_user_register_event(user):
@@ -11,5 +12,5 @@ def handle_user_login_event(user):
 
 
 def setup_log_event_handlers():
-    event.subscribe("user_registered", handle_user_login_event)
-    event.subscribe("user_login", handle_user_login_event)
+    event.subscribe("user_registered", handle_user_login_event, dispatch=DISPATCH_ASYNC)
+    event.subscribe("user_login", handle_user_login_event, dispatch=DISPATCH_ASYNC)